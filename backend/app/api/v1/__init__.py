@@ -3,8 +3,11 @@ from fastapi import APIRouter
 from app.api.v1 import (
     admin_audit_logs,
     admin_billing,
+    admin_metrics,
     admin_notifications,
     admin_settings,
+    admin_users,
+    auth,
     enrollments,
     levels,
     notifications,
@@ -17,6 +20,7 @@ from app.api.v1 import (
 api_router = APIRouter()
 
 api_router.include_router(system.router)
+api_router.include_router(auth.router)
 api_router.include_router(profile.router)
 api_router.include_router(trainings.router)
 api_router.include_router(enrollments.router)
@@ -28,6 +32,8 @@ api_router.include_router(admin_billing.router)
 api_router.include_router(admin_notifications.router)
 api_router.include_router(admin_settings.router)
 api_router.include_router(admin_audit_logs.router)
+api_router.include_router(admin_metrics.router)
+api_router.include_router(admin_users.router)
 
 # stage9
 api_router.include_router(notifications.router)
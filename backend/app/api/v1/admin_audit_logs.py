@@ -21,7 +21,7 @@ async def admin_audit_logs_list(
     db: AsyncSession = Depends(get_db),
     _admin=Depends(require_admin),
 ):
-    items, total = await list_audit_logs(
+    items, total, total_mode = await list_audit_logs(
         db,
         limit=limit,
         offset=offset,
@@ -34,6 +34,6 @@ async def admin_audit_logs_list(
     dto_items = [AuditLogResponse(**x).model_dump() for x in items]
     return {
         "ok": True,
-        "result": AuditLogListResponse(items=[AuditLogResponse(**x) for x in items], total=total, limit=limit, offset=offset).model_dump(),
+        "result": AuditLogListResponse(items=[AuditLogResponse(**x) for x in items], total=total, total_mode=total_mode, limit=limit, offset=offset).model_dump(),
         "error": None,
     }
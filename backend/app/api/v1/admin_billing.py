@@ -2,22 +2,23 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_current_user
+from app.core.auth import AuthIdentity
+from app.core.deps import get_current_identity, get_db
 from app.core.exceptions import AppException, ErrorCode
 from app.core.responses import success_response
-from app.db.session import get_db
-from app.models.user import User
 from app.schemas.ban import BanCreateRequest, BanListResponse, BanResponse
 from app.schemas.debt import DebtListResponse, DebtResponse
 from app.services.ban_service import (
+    count_bans,
     list_bans,
     manual_ban_user,
     manual_unban_user,
     unban_user_if_no_open_debts,
 )
-from app.services.debt_service import close_debt, list_debts
+from app.services.debt_service import close_debt, count_debts, list_debts
 
 router = APIRouter(prefix="/admin", tags=["admin-billing"])
 
@@ -35,8 +36,8 @@ def _validate(model_cls, obj):
 
 
 async def get_current_admin(
-    current_user: User | None = Depends(get_current_user),
-) -> User:
+    current_user: AuthIdentity | None = Depends(get_current_identity),
+) -> AuthIdentity:
     if current_user is None:
         raise AppException(
             ErrorCode.UNAUTHORIZED,
@@ -60,8 +61,8 @@ async def list_debts_admin(
     is_closed: bool | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+    _: AuthIdentity = Depends(get_current_admin),
 ):
     status = None
     if is_closed is True:
@@ -69,7 +70,7 @@ async def list_debts_admin(
     elif is_closed is False:
         status = "OPEN"
 
-    debts = list_debts(
+    debts = await list_debts(
         db,
         user_id=user_id,
         training_id=training_id,
@@ -77,11 +78,13 @@ async def list_debts_admin(
         limit=limit,
         offset=offset,
     )
+    total, total_mode = await count_debts(db, user_id=user_id, training_id=training_id, status=status)
     dto_items = [_validate(DebtResponse, d) for d in debts]
 
     dto = DebtListResponse(
         items=dto_items,
-        total=len(dto_items),
+        total=total,
+        total_mode=total_mode,
         limit=limit,
         offset=offset,
     )
@@ -91,11 +94,11 @@ async def list_debts_admin(
 @router.post("/debts/{debt_id}/close")
 async def close_debt_admin(
     debt_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+    _: AuthIdentity = Depends(get_current_admin),
 ):
     # close_debt может вернуть int  нам это не важно, мы перечитаем долг из БД
-    close_debt(
+    await close_debt(
         db,
         debt_id=debt_id,
         auto_unban_callback=unban_user_if_no_open_debts,
@@ -103,7 +106,7 @@ async def close_debt_admin(
 
     from app.models.debt import Debt
 
-    debt = db.get(Debt, debt_id)
+    debt = await db.get(Debt, debt_id)
     if debt is None:
         raise AppException(ErrorCode.INTERNAL_SERVER_ERROR, "Долг не найден после закрытия")
 
@@ -120,17 +123,18 @@ async def list_bans_admin(
     is_active: bool | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+    _: AuthIdentity = Depends(get_current_admin),
 ):
     # Совместимость: list_bans может ждать active или only_active
     try:
-        bans = list_bans(db, user_id=user_id, active=is_active, limit=limit, offset=offset)
+        bans = await list_bans(db, user_id=user_id, active=is_active, limit=limit, offset=offset)
     except TypeError:
-        bans = list_bans(db, user_id=user_id, only_active=is_active, limit=limit, offset=offset)
+        bans = await list_bans(db, user_id=user_id, only_active=is_active, limit=limit, offset=offset)
+    total, total_mode = await count_bans(db, user_id=user_id, active=is_active)
 
     dto_items = [_validate(BanResponse, b) for b in bans]
-    dto = BanListResponse(items=dto_items, total=len(dto_items), limit=limit, offset=offset)
+    dto = BanListResponse(items=dto_items, total=total, total_mode=total_mode, limit=limit, offset=offset)
     return success_response(_dump(dto))
 
 
@@ -138,10 +142,10 @@ async def list_bans_admin(
 async def manual_ban_admin(
     user_id: int,
     body: BanCreateRequest,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+    _: AuthIdentity = Depends(get_current_admin),
 ):
-    ban = manual_ban_user(db, user_id=user_id, reason=body.reason)
+    ban = await manual_ban_user(db, user_id=user_id, reason=body.reason)
     dto = _validate(BanResponse, ban)
     return success_response(_dump(dto))
 
@@ -149,27 +153,27 @@ async def manual_ban_admin(
 @router.post("/bans/{user_id}/unban")
 async def manual_unban_admin(
     user_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+    _: AuthIdentity = Depends(get_current_admin),
 ):
     # Чтобы не зависеть от того, возвращает manual_unban_user список или int:
     # 1) запомним активные баны
     try:
-        active_before = list_bans(db, user_id=user_id, active=True, limit=10_000, offset=0)
+        active_before = await list_bans(db, user_id=user_id, active=True, limit=10_000, offset=0)
     except TypeError:
-        active_before = list_bans(db, user_id=user_id, only_active=True, limit=10_000, offset=0)
+        active_before = await list_bans(db, user_id=user_id, only_active=True, limit=10_000, offset=0)
 
     ids = [b.id for b in active_before]
 
     # 2) снимем бан (что бы ни вернуло  нам ок)
-    manual_unban_user(db, user_id=user_id)
+    await manual_unban_user(db, user_id=user_id)
 
     # 3) перечитаем те же записи по ids
     bans = []
     if ids:
         from app.models.ban import Ban
 
-        bans = db.query(Ban).filter(Ban.id.in_(ids)).all()
+        bans = (await db.execute(select(Ban).where(Ban.id.in_(ids)))).scalars().all()
 
     dto_items = [_validate(BanResponse, b) for b in bans]
     dto = BanListResponse(items=dto_items, total=len(dto_items), limit=len(dto_items), offset=0)
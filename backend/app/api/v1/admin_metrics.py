@@ -0,0 +1,84 @@
+# app/api/v1/admin_metrics.py
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.core.activity import activity_tracker
+from app.core.admission import admission_controller
+from app.core.auth import auth_failure_log_limiter, auth_failures
+from app.core.auth_cache import rejected_init_data_cache, verified_init_data_cache
+from app.core.deadlines import deadline_monitor
+from app.core.deps import require_admin
+from app.core.identity_cache import identity_cache
+from app.core.rate_limit import rate_limiter
+from app.core.schedule_cache import schedule_cache
+from app.core.session_tokens import revoked_sessions
+from app.db.query_stats import query_stats_monitor
+from app.db.counts import total_counter
+from app.db.read_routing import read_router
+from app.db.session import registry
+from app.db.slow_queries import slow_query_log
+from app.db.unit_of_work import unit_of_work_stats
+
+router = APIRouter(prefix="/admin/metrics", tags=["admin-metrics"])
+
+
+@router.get("", response_model=dict)
+async def admin_metrics(
+    _admin=Depends(require_admin),
+):
+    """
+    Внутренние счётчики процесса (кэши, пулы и т.п.) — для диагностики.
+    Значения локальны для конкретного воркера.
+    """
+    return {
+        "ok": True,
+        "result": {
+            "auth_cache": verified_init_data_cache.stats(),
+            "auth_rejections": {
+                "by_stage": dict(auth_failures),
+                "rejected_cache": rejected_init_data_cache.stats(),
+                "log_limiter": auth_failure_log_limiter.stats(),
+            },
+            "identity_cache": identity_cache.stats(),
+            "activity": activity_tracker.stats(),
+            "db_pools": registry.pool_stats(),
+            "read_routing": read_router.stats(),
+            "db_queries": query_stats_monitor.stats(),
+            "list_totals": total_counter.stats(),
+            "schedule_cache": schedule_cache.stats(),
+            "slow_queries": slow_query_log.stats(),
+            "deadlines": deadline_monitor.stats(),
+            "admission": admission_controller.stats(),
+            "unit_of_work": unit_of_work_stats.stats(),
+            "rate_limits": rate_limiter.stats(),
+            "session_tokens": {"revoked_users": len(revoked_sessions)},
+        },
+        "error": None,
+    }
+
+
+@router.get("/slow-queries", response_model=dict)
+async def admin_slow_queries(
+    _admin=Depends(require_admin),
+):
+    """
+    Последние медленные запросы этого воркера (новые первыми),
+    с планом EXPLAIN, если включён SLOW_QUERY_EXPLAIN.
+    """
+    return {
+        "ok": True,
+        "result": {
+            "stats": slow_query_log.stats(),
+            "items": slow_query_log.entries(),
+        },
+        "error": None,
+    }
+
+
+@router.delete("/slow-queries", response_model=dict)
+async def admin_clear_slow_queries(
+    _admin=Depends(require_admin),
+):
+    slow_query_log.clear()
+    return {"ok": True, "result": True, "error": None}
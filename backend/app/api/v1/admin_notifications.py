@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -25,6 +27,11 @@ async def admin_broadcast(
         url=payload.url,
         entity_type=payload.entity_type,
         entity_id=payload.entity_id,
+        seen_within=(
+            timedelta(days=payload.active_within_days)
+            if payload.active_within_days
+            else None
+        ),
     )
 
     # audit
@@ -39,6 +46,7 @@ async def admin_broadcast(
             "title": payload.title,
             "entity_type": payload.entity_type,
             "entity_id": payload.entity_id,
+            "active_within_days": payload.active_within_days,
             "count": count,
         },
         commit=True,
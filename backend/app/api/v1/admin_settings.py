@@ -18,12 +18,13 @@ async def admin_settings_list(
     db: AsyncSession = Depends(get_db),
     _admin=Depends(require_admin),
 ):
-    items, total = await list_settings(db, limit=limit, offset=offset)
+    items, total, total_mode = await list_settings(db, limit=limit, offset=offset)
     return {
         "ok": True,
         "result": SettingListResponse(
             items=[SettingResponse.model_validate(x) for x in items],
             total=total,
+            total_mode=total_mode,
             limit=limit,
             offset=offset,
         ).model_dump(),
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import get_db, require_admin
+from app.schemas.user import UserAdminFlagUpdate
+from app.services.audit_log_service import write_audit_log
+from app.services.user_service import set_user_admin_flag
+
+router = APIRouter(prefix="/admin/users", tags=["admin-users"])
+
+
+@router.patch("/{user_id}/admin", response_model=dict)
+async def admin_set_user_admin_flag(
+    user_id: int,
+    payload: UserAdminFlagUpdate,
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_admin),
+):
+    user = await set_user_admin_flag(db, user_id=user_id, is_admin=payload.is_admin)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await write_audit_log(
+        db,
+        user_id=getattr(admin, "id", None),
+        action="ADMIN_USER_SET_ADMIN",
+        entity="user",
+        entity_id=user_id,
+        data={"is_admin": payload.is_admin},
+        commit=True,
+    )
+
+    return {
+        "ok": True,
+        "result": {"id": user.id, "telegram_id": user.telegram_id, "is_admin": user.is_admin},
+        "error": None,
+    }
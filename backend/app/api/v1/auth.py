@@ -0,0 +1,50 @@
+# app/api/v1/auth.py
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, Request
+
+from app.core.deps import get_current_user
+from app.core.exceptions import AppException, ErrorCode
+from app.core.responses import success_response
+from app.core.session_tokens import issue_session_token
+from app.core.identity_cache import UserSnapshot
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.post("/session")
+async def create_session_token(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_user),
+) -> dict:
+    """
+    POST /api/v1/auth/session
+    Обмен валидного X-Telegram-Init-Data на короткоживущий сессионный токен.
+
+    Дальше клиент шлёт Authorization: Bearer <token> — такой запрос
+    проверяется одним HMAC, без разбора initData и без БД.
+    """
+    auth = getattr(request.state, "auth", None)
+    if auth is None or auth.method != "init_data":
+        # Продлевать токен токеном нельзя — только через свежую проверку initData
+        raise AppException(
+            ErrorCode.UNAUTHORIZED,
+            "Для получения токена нужен заголовок X-Telegram-Init-Data",
+            status_code=401,
+        )
+
+    token, claims = issue_session_token(
+        user_id=current_user.id,
+        telegram_id=current_user.telegram_id,
+        is_admin=bool(current_user.is_admin),
+    )
+    return success_response(
+        {
+            "token": token,
+            "token_type": "Bearer",
+            "expires_at": datetime.fromtimestamp(claims.expires_at, tz=timezone.utc),
+            "expires_in": claims.expires_at - claims.issued_at,
+        }
+    )
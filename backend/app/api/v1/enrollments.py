@@ -2,12 +2,11 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.middleware import get_current_user
+from app.core.deps import get_current_user, get_db, get_read_db, rate_limited
 from app.core.responses import success_response
-from app.db.session import get_db
-from app.models.user import User
+from app.core.identity_cache import UserSnapshot
 from app.schemas.enrollment import (
     EnrollmentCreateRequest,
     EnrollmentResponse,
@@ -21,17 +20,17 @@ from app.services.enrollment_service import (
 router = APIRouter(prefix="/enrollments", tags=["enrollments"])
 
 
-@router.post("")
+@router.post("", dependencies=[Depends(rate_limited("enrollments.create"))])
 async def enroll_to_training(
     data: EnrollmentCreateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ) -> dict:
     """
     POST /api/v1/enrollments
     Записаться на тренировку.
     """
-    enrollment = enroll_user_to_training(
+    enrollment = await enroll_user_to_training(
         db,
         user=current_user,
         training_id=data.training_id,
@@ -40,17 +39,20 @@ async def enroll_to_training(
     return success_response(dto.model_dump())
 
 
-@router.post("/{enrollment_id}/cancel")
+@router.post(
+    "/{enrollment_id}/cancel",
+    dependencies=[Depends(rate_limited("enrollments.cancel"))],
+)
 async def cancel_enrollment(
     enrollment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ) -> dict:
     """
     POST /api/v1/enrollments/{id}/cancel
     Отменить свою запись.
     """
-    enrollment = cancel_enrollment_for_user(
+    enrollment = await cancel_enrollment_for_user(
         db,
         user=current_user,
         enrollment_id=enrollment_id,
@@ -62,14 +64,14 @@ async def cancel_enrollment(
 @router.get("/training/{training_id}")
 async def get_training_enrollments(
     training_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ) -> dict:
     """
     GET /api/v1/enrollments/training/{training_id}
     Получить состав тренировки (основа и резерв).
     """
-    main, reserve = get_training_roster(db, training_id)
+    main, reserve = await get_training_roster(db, training_id)
 
     main_dtos = [
         EnrollmentResponse.model_validate(e, from_attributes=True).model_dump()
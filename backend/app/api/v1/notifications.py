@@ -4,7 +4,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_current_user, get_db
+from app.core.deps import get_current_user, get_db, get_read_db
 from app.schemas.notification import NotificationListOut
 from app.services.notification_service import list_user_notifications, mark_notification_read
 
@@ -15,11 +15,15 @@ router = APIRouter(prefix="/notifications", tags=["notifications"])
 async def get_notifications(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
-    items, total = await list_user_notifications(db, user_id=current_user.id, limit=limit, offset=offset)
-    return {"ok": True, "result": NotificationListOut(items=items, total=total, limit=limit, offset=offset), "error": None}
+    items, total, total_mode = await list_user_notifications(db, user_id=current_user.id, limit=limit, offset=offset)
+    return {
+        "ok": True,
+        "result": NotificationListOut(items=items, total=total, total_mode=total_mode, limit=limit, offset=offset),
+        "error": None,
+    }
 
 
 @router.post("/{notification_id}/read", response_model=dict)
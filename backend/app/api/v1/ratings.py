@@ -1,13 +1,16 @@
 # app/api/v1/ratings.py
 from __future__ import annotations
 
+from datetime import timedelta
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.middleware import get_current_user
+from app.core.deps import get_current_user, get_read_db
 from app.core.responses import success_response
-from app.db.session import get_db
 from app.core.exceptions import AppException
+from app.core.identity_cache import UserSnapshot
 from app.models.user import User
 from app.schemas.rating import (
     RatingUserDTO,
@@ -25,18 +28,25 @@ router = APIRouter(prefix="/ratings", tags=["ratings"])
 
 @router.get("/leaderboard")
 async def get_leaderboard(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    active_within_days: Optional[int] = Query(None, ge=1),
 ) -> dict:
     """
     Таблица лидеров.
 
-    GET /api/v1/ratings/leaderboard?limit=...&offset=...
+    GET /api/v1/ratings/leaderboard?limit=...&offset=...&active_within_days=...
 
     Возвращает пользователей, отсортированных по rating, cups.
+    С active_within_days — только тех, кто заходил за последние N дней.
     """
-    users, total = get_leaderboard_service(db, limit=limit, offset=offset)
+    users, total, total_mode = await get_leaderboard_service(
+        db,
+        limit=limit,
+        offset=offset,
+        seen_within=timedelta(days=active_within_days) if active_within_days else None,
+    )
 
     items: list[RatingUserDTO] = []
     for idx, user in enumerate(users):
@@ -56,6 +66,7 @@ async def get_leaderboard(
     response = RatingLeaderboardResponse(
         items=items,
         total=total,
+        total_mode=total_mode,
         limit=limit,
         offset=offset,
     ).model_dump()
@@ -65,16 +76,16 @@ async def get_leaderboard(
 
 @router.get("/me")
 async def get_my_rating(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserSnapshot = Depends(get_current_user),
 ) -> dict:
     """
     Информация о рейтинге ТЕКУЩЕГО пользователя.
 
     GET /api/v1/ratings/me
     """
-    position = get_user_position(db, current_user)
-    total = get_total_active_users(db)
+    position = await get_user_position(db, current_user)
+    total = await get_total_active_users(db)
 
     dto = RatingUserInfoDTO(
         user_id=current_user.id,
@@ -91,22 +102,22 @@ async def get_my_rating(
 @router.get("/user/{user_id}")
 async def get_user_rating(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> dict:
     """
     Информация о рейтинге произвольного игрока по ID.
 
     GET /api/v1/ratings/user/{user_id}
     """
-    user = db.query(User).filter(User.id == user_id).one_or_none()
+    user = await db.get(User, user_id)
     if user is None:
         raise AppException(
             error_code="NOT_FOUND",
             message="Пользователь не найден",
         )
 
-    position = get_user_position(db, user)
-    total = get_total_active_users(db)
+    position = await get_user_position(db, user)
+    total = await get_total_active_users(db)
 
     dto = RatingUserInfoDTO(
         user_id=user.id,
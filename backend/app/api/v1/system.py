@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Request, Depends
 
-from app.core.middleware import get_current_user
+from app.core.deps import get_current_user
 from app.core.responses import success_response
 
 router = APIRouter()
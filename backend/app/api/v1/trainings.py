@@ -4,14 +4,15 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.middleware import get_current_user
+from app.core.auth import AuthIdentity
+from app.core.deps import get_current_identity, get_db, read_session
 from app.core.responses import success_response
-from app.core.exceptions import AppException
-from app.db.session import get_db
-from app.models.user import User
+from app.core.exceptions import AppException, ErrorCode
+from app.core.schedule_cache import schedule_cache
 from app.schemas.training import TrainingCreate, TrainingUpdate, TrainingPublic
 from app.services.training_service import (
     create_training,
@@ -20,6 +21,8 @@ from app.services.training_service import (
     cancel_training,
     get_training_or_404,
     list_trainings,
+    list_trainings_after,
+    training_cursor,
 )
 
 router = APIRouter(
@@ -28,7 +31,7 @@ router = APIRouter(
 )
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin(current_user: AuthIdentity = Depends(get_current_identity)) -> AuthIdentity:
     """
     Простейшая проверка "админ / не админ".
     """
@@ -40,12 +43,76 @@ def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
+async def _trainings_page(
+    request: Request,
+    *,
+    cursor: Optional[str],
+    offset: int,
+    limit: int,
+    **filters,
+) -> Response:
+    """
+    Страница расписания в offset- или курсорном режиме.
+
+    Offset-режим (как раньше) тоже отдаёт next_cursor: клиент может взять
+    первую страницу с total, а дальше листать курсором.
+
+    Готовое тело ответа кэшируется (app/core/schedule_cache.py): при
+    попадании сессия БД не открывается и pydantic не вызывается.
+    """
+    if cursor is not None and offset:
+        raise AppException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="Нельзя передавать cursor и offset одновременно",
+            status_code=422,
+            details={"field": "cursor"},
+        )
+
+    key = (cursor, offset, limit, tuple(filters.items()))
+    body = schedule_cache.get(key)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    token = schedule_cache.token()
+
+    async with read_session(request) as db:
+        if cursor is not None:
+            trainings, next_cursor, has_more = await list_trainings_after(
+                db,
+                cursor=cursor,
+                limit=limit,
+                **filters,
+            )
+            page = {"limit": limit}
+        else:
+            trainings, total, total_mode = await list_trainings(db, limit=limit, offset=offset, **filters)
+            # total может быть оценкой — о следующей странице судим и по её заполненности
+            has_more = len(trainings) == limit and (offset + len(trainings) < total or total_mode == "estimate")
+            next_cursor = training_cursor(trainings[-1]) if has_more else None
+            page = {"total": total, "total_mode": total_mode, "limit": limit, "offset": offset}
+
+    items: List[dict] = [
+        TrainingPublic.model_validate(t, from_attributes=True).model_dump()
+        for t in trainings
+    ]
+
+    response = success_response(
+        {
+            "items": items,
+            **page,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+    )
+    schedule_cache.put(key, token, response.body)
+    return response
+
+
 # ---------- Публичные эндпоинты (пользовательское расписание) ----------
 
 
 @router.get("")
 async def list_public_trainings(
-    db: Session = Depends(get_db),
+    request: Request,
     date_from: Optional[datetime] = Query(
         default=None,
         description="Фильтр: с даты (start_at >= date_from)",
@@ -72,15 +139,25 @@ async def list_public_trainings(
     ),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-) -> dict:
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Курсор следующей страницы (next_cursor из предыдущего ответа) вместо offset",
+    ),
+) -> Response:
     """
     Публичное расписание тренировок для пользователей.
     По умолчанию:
       * скрываем отменённые (is_cancelled = false)
       * можно фильтровать по дате, тренеру, уровню, локации
+
+    Пагинация: offset/limit (с total) или курсор — next_cursor из ответа
+    передаётся в cursor, следующая страница читается без OFFSET и COUNT.
     """
-    trainings, total = list_trainings(
-        db,
+    return await _trainings_page(
+        request,
+        cursor=cursor,
+        offset=offset,
+        limit=limit,
         date_from=date_from,
         date_to=date_to,
         location_id=location_id,
@@ -88,35 +165,20 @@ async def list_public_trainings(
         min_level_name=min_level_name,
         max_level_name=max_level_name,
         include_cancelled=False,
-        limit=limit,
-        offset=offset,
     )
 
-    items: List[dict] = [
-        TrainingPublic.model_validate(t, from_attributes=True).model_dump()
-        for t in trainings
-    ]
-
-    return success_response(
-        {
-            "items": items,
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-        }
-    )
 
-
-@router.get("/{training_id}")
+# :int — иначе этот маршрут (объявлен раньше) перехватывал бы GET /trainings/admin
+@router.get("/{training_id:int}")
 async def get_training_detail(
     training_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Детальная информация по конкретной тренировке.
     Подходит как для мини-аппа, так и для админки.
     """
-    training = get_training_or_404(db, training_id)
+    training = await get_training_or_404(db, training_id)
     dto = TrainingPublic.model_validate(training, from_attributes=True)
     return success_response(dto.model_dump())
 
@@ -126,7 +188,7 @@ async def get_training_detail(
 
 @router.get("/admin", dependencies=[Depends(get_current_admin)])
 async def list_admin_trainings(
-    db: Session = Depends(get_db),
+    request: Request,
     date_from: Optional[datetime] = Query(
         default=None,
         description="Фильтр: с даты (start_at >= date_from)",
@@ -157,12 +219,20 @@ async def list_admin_trainings(
     ),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-) -> dict:
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Курсор следующей страницы (next_cursor из предыдущего ответа) вместо offset",
+    ),
+) -> Response:
     """
     Список тренировок для админ-панели (с возможностью видеть отменённые).
+    Пагинация — как у публичного расписания: offset/limit или cursor.
     """
-    trainings, total = list_trainings(
-        db,
+    return await _trainings_page(
+        request,
+        cursor=cursor,
+        offset=offset,
+        limit=limit,
         date_from=date_from,
         date_to=date_to,
         location_id=location_id,
@@ -170,34 +240,18 @@ async def list_admin_trainings(
         min_level_name=min_level_name,
         max_level_name=max_level_name,
         include_cancelled=include_cancelled,
-        limit=limit,
-        offset=offset,
-    )
-
-    items: List[dict] = [
-        TrainingPublic.model_validate(t, from_attributes=True).model_dump()
-        for t in trainings
-    ]
-
-    return success_response(
-        {
-            "items": items,
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-        }
     )
 
 
 @router.post("", dependencies=[Depends(get_current_admin)])
 async def create_training_admin(
     data: TrainingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Создание тренировки (админ).
     """
-    training = create_training(db, data)
+    training = await create_training(db, data)
     dto = TrainingPublic.model_validate(training, from_attributes=True)
     return success_response(dto.model_dump())
 
@@ -206,13 +260,13 @@ async def create_training_admin(
 async def update_training_admin(
     training_id: int,
     data: TrainingUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Редактирование тренировки (админ).
     """
-    training = get_training_or_404(db, training_id)
-    training = update_training(db, training, data)
+    training = await get_training_or_404(db, training_id)
+    training = await update_training(db, training, data)
     dto = TrainingPublic.model_validate(training, from_attributes=True)
     return success_response(dto.model_dump())
 
@@ -220,27 +274,27 @@ async def update_training_admin(
 @router.delete("/{training_id}", dependencies=[Depends(get_current_admin)])
 async def delete_training_admin(
     training_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Удаление тренировки (админ).
     При необходимости, вместо физического удаления можно было бы
     просто ставить is_cancelled или отдельный флаг.
     """
-    training = get_training_or_404(db, training_id)
-    delete_training(db, training)
+    training = await get_training_or_404(db, training_id)
+    await delete_training(db, training)
     return success_response({"deleted_id": training_id})
 
 
 @router.post("/{training_id}/cancel", dependencies=[Depends(get_current_admin)])
 async def cancel_training_admin(
     training_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> dict:
     """
     Отмена тренировки (ставим is_cancelled = true).
     """
-    training = get_training_or_404(db, training_id)
-    training = cancel_training(db, training)
+    training = await get_training_or_404(db, training_id)
+    training = await cancel_training(db, training)
     dto = TrainingPublic.model_validate(training, from_attributes=True)
     return success_response(dto.model_dump())
@@ -0,0 +1,203 @@
+# app/core/activity.py
+"""
+Учёт последней активности пользователей (users.last_seen_at) без записи в БД
+на каждый запрос.
+
+Слой авторизации при успешном определении пользователя вызывает
+activity_tracker.touch(user_id) — это только запись в словарь процесса.
+Фоновая задача раз в ACTIVITY_FLUSH_INTERVAL_SECONDS сбрасывает накопленное
+одним UPDATE ... FROM (VALUES ...): по строке на пользователя, сколько бы
+запросов он ни сделал за интервал.
+
+last_seen_at обновляется через GREATEST, поэтому несколько воркеров
+и повторная отправка после ошибки не откатывают время назад.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import DateTime, Integer, column, func, update, values
+
+from app.core.config import settings
+from app.db.session import async_session_maker
+from app.models.user import User
+
+logger = logging.getLogger("app.activity")
+
+# Сколько строк отправлять в одном UPDATE (2 параметра на строку)
+FLUSH_CHUNK_SIZE = 5000
+
+
+class ActivityTracker:
+    """
+    Буфер user_id -> время последнего запроса с периодическим сбросом в БД.
+    """
+
+    def __init__(self, *, flush_interval_seconds: float = 60.0, max_pending: int = 50_000) -> None:
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+
+        self._pending: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.touches = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+
+    # ---- горячий путь ----
+
+    def touch(self, user_id: int, seen_at: Optional[float] = None) -> None:
+        """
+        Отмечает активность пользователя. Никакого I/O.
+        """
+        ts = time.time() if seen_at is None else seen_at
+        with self._lock:
+            prev = self._pending.get(user_id)
+            if prev is None or ts > prev:
+                self._pending[user_id] = ts
+            pending = len(self._pending)
+        self.touches += 1
+
+        # Буфер переполнен — просим фоновую задачу сбросить его досрочно
+        if pending >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    # ---- сброс в БД ----
+
+    def _take(self) -> Dict[int, float]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore(self, pending: Dict[int, float]) -> None:
+        # Неудачную пачку возвращаем в буфер, не затирая более свежие отметки
+        with self._lock:
+            for user_id, ts in pending.items():
+                prev = self._pending.get(user_id)
+                if prev is None or ts > prev:
+                    self._pending[user_id] = ts
+
+    async def flush(self) -> int:
+        """
+        Записывает накопленные отметки в БД. Возвращает число отправленных строк.
+        """
+        pending = self._take()
+        if not pending:
+            return 0
+
+        rows = [
+            (user_id, datetime.fromtimestamp(ts, tz=timezone.utc))
+            for user_id, ts in pending.items()
+        ]
+
+        start = time.perf_counter()
+        committed = False
+        try:
+            async with async_session_maker() as db:
+                for i in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                    await db.execute(_build_update(rows[i:i + FLUSH_CHUNK_SIZE]))
+                await db.commit()
+            committed = True
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to flush last_seen_at for %d users", len(rows))
+            return 0
+        finally:
+            # И при ошибке, и при отмене задачи посреди UPDATE пачка возвращается
+            # в буфер (повтор безопасен — GREATEST)
+            if not committed:
+                self._restore(pending)
+
+        self.flushes += 1
+        self.rows_written += len(rows)
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.debug("Flushed last_seen_at for %d users (%.2f ms)", len(rows), self.last_flush_ms)
+        return len(rows)
+
+    # ---- фоновая задача ----
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is not None or self.flush_interval_seconds <= 0:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="activity-flush")
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновую задачу и дописывает остаток буфера.
+
+        Задачу не отменяем, а будим и ждём: начатый сброс доходит до COMMIT,
+        после него цикл выходит.
+        """
+        if self._task is not None:
+            assert self._wakeup is not None
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "touches": self.touches,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+def _build_update(rows: list[tuple[int, datetime]]):
+    """
+    UPDATE users SET last_seen_at = GREATEST(users.last_seen_at, v.seen_at)
+    FROM (VALUES ...) AS v(id, seen_at) WHERE users.id = v.id
+    """
+    seen = values(
+        column("id", Integer),
+        column("seen_at", DateTime(timezone=True)),
+        name="v",
+    ).data(rows)
+
+    return (
+        update(User)
+        .where(User.id == seen.c.id)
+        .values(
+            last_seen_at=func.greatest(User.last_seen_at, seen.c.seen_at),
+            # Активность — не изменение профиля: не даём onupdate трогать updated_at
+            updated_at=User.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Глобальный трекер процесса
+activity_tracker = ActivityTracker(
+    flush_interval_seconds=settings.activity_flush_interval_seconds,
+    max_pending=settings.activity_max_pending,
+)
@@ -0,0 +1,213 @@
+# app/core/admission.py
+"""
+Admission control: при перегрузке пула первыми отказываем запросам,
+которые могут подождать.
+
+Когда открывается запись, все воркеры разом упираются в пул соединений,
+и растёт задержка у всех — в том числе у дешёвых /health и расписания.
+AdmissionControlMiddleware (app/core/middleware.py) до начала обработки
+делит запросы по приоритету:
+
+  critical  /health, /api/v1/ping, запись/отмена записи на тренировку,
+            чтения без авторизации (расписание, уровни)        — не отбрасываются
+  low       админские списки (GET под /admin) и рассылки       — первыми
+  normal    всё остальное                                      — только сверх
+                                                                 ADMISSION_MAX_IN_FLIGHT
+
+и смотрит на сигналы перегрузки процесса:
+- запросов в работе >= ADMISSION_LOW_MAX_IN_FLIGHT;
+- пул исчерпан (выданы все pool_size + max_overflow соединений);
+- сглаженное ожидание соединения из пула >= ADMISSION_POOL_WAIT_MS
+  (PoolMetrics.recent_wait_ms, app/db/session.py).
+
+Запрос низкого приоритета при перегрузке ждёт в очереди до
+ADMISSION_QUEUE_MS (не больше ADMISSION_MAX_QUEUED ожидающих), и если
+перегрузка не прошла — получает 503 OVERLOADED с Retry-After.
+Решения считаются в admission_controller.stats() (/admin/metrics).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.exceptions import AppException, ErrorCode
+from app.core.logger import LogRateLimiter
+from app.db.session import registry
+
+logger = logging.getLogger("app.admission")
+
+PRIORITIES = ("critical", "normal", "low")
+
+_READ_METHODS = frozenset({"GET", "HEAD"})
+_CRITICAL_PATHS = frozenset({"/health", "/api/v1/ping"})
+# Запись на тренировку и отмена записи
+_ENROLLMENT_WRITE = re.compile(r"^/api/v1/enrollments(/\d+/cancel)?/?$")
+# Чтения без авторизации: расписание, карточка тренировки, уровни
+_PUBLIC_READ = re.compile(r"^/api/v1/(trainings(/\d+)?|levels)/?$")
+_ADMIN_PREFIXES = ("/api/v1/admin", "/api/v1/trainings/admin")
+# Админские операции, которые можно отложить, кроме списков
+_LOW_WRITES = frozenset({"/api/v1/admin/notifications/broadcast"})
+# Метрики нужны как раз во время перегрузки — их не откладываем
+_ADMIN_METRICS = "/api/v1/admin/metrics"
+
+# Шаг опроса сигналов, пока запрос ждёт в очереди
+_QUEUE_POLL_S = 0.02
+
+
+def priority(method: str, path: str) -> str:
+    if path in _CRITICAL_PATHS:
+        return "critical"
+    if method in _READ_METHODS:
+        if _PUBLIC_READ.match(path):
+            return "critical"
+        if path.startswith(_ADMIN_PREFIXES) and not path.startswith(_ADMIN_METRICS):
+            return "low"
+        return "normal"
+    if method == "POST" and _ENROLLMENT_WRITE.match(path):
+        return "critical"
+    if path in _LOW_WRITES:
+        return "low"
+    return "normal"
+
+
+class AdmissionController:
+    """
+    Считает запросы в работе и решает, пускать ли новый.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._log_limiter = LogRateLimiter(interval_seconds=10.0, maxsize=100)
+        self.in_flight = 0
+        self.in_flight_peak = 0
+        self.queued = 0
+        self.admitted: "Counter[str]" = Counter()
+        self.shed: "Counter[str]" = Counter()
+        # причины отказов: in_flight / pool_saturated / pool_wait / queue_full
+        self.shed_reasons: "Counter[str]" = Counter()
+        self.queued_total = 0
+        self.queued_admitted = 0
+        self.queue_wait_ms = 0.0
+
+    def pressure(self) -> Optional[str]:
+        """
+        Причина, по которой сейчас не пускаем низкий приоритет, или None.
+        """
+        if self.in_flight >= settings.admission_low_max_in_flight:
+            return "in_flight"
+        if registry.pool_saturated():
+            return "pool_saturated"
+        if registry.metrics["async"].recent_wait_ms() >= settings.admission_pool_wait_ms:
+            return "pool_wait"
+        return None
+
+    async def acquire(self, prio: str) -> Optional[str]:
+        """
+        Пускает запрос (None) или возвращает причину отказа.
+        Пущенный запрос обязан вызвать release().
+        """
+        if prio == "normal" and 0 < settings.admission_max_in_flight <= self.in_flight:
+            return self._reject(prio, "in_flight")
+
+        if prio == "low":
+            reason = self.pressure()
+            if reason is not None:
+                reason = await self._wait_in_queue(reason)
+                if reason is not None:
+                    return self._reject(prio, reason)
+
+        with self._lock:
+            self.in_flight += 1
+            if self.in_flight > self.in_flight_peak:
+                self.in_flight_peak = self.in_flight
+            self.admitted[prio] += 1
+        return None
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    async def _wait_in_queue(self, reason: str) -> Optional[str]:
+        if self.queued >= settings.admission_max_queued:
+            return "queue_full"
+
+        start = time.monotonic()
+        deadline = start + settings.admission_queue_ms / 1000
+        with self._lock:
+            self.queued += 1
+            self.queued_total += 1
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(_QUEUE_POLL_S)
+                reason = self.pressure()
+                if reason is None:
+                    with self._lock:
+                        self.queued_admitted += 1
+                        self.queue_wait_ms += (time.monotonic() - start) * 1000
+                    return None
+            return reason
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+    def _reject(self, prio: str, reason: str) -> str:
+        with self._lock:
+            self.shed[prio] += 1
+            self.shed_reasons[reason] += 1
+        suppressed = self._log_limiter.hit((prio, reason))
+        if suppressed is not None:
+            logger.warning(
+                "Shedding %s-priority request: %s (in flight %d, queued %d%s)",
+                prio,
+                reason,
+                self.in_flight,
+                self.queued,
+                f", +{suppressed} similar suppressed" if suppressed else "",
+            )
+        return reason
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.admission_control,
+                "thresholds": {
+                    "max_in_flight": settings.admission_max_in_flight,
+                    "low_max_in_flight": settings.admission_low_max_in_flight,
+                    "pool_wait_ms": settings.admission_pool_wait_ms,
+                    "queue_ms": settings.admission_queue_ms,
+                    "max_queued": settings.admission_max_queued,
+                },
+                "in_flight": self.in_flight,
+                "in_flight_peak": self.in_flight_peak,
+                "queued": self.queued,
+                "pressure": self.pressure(),
+                "pool_wait_recent_ms": round(registry.metrics["async"].recent_wait_ms(), 3),
+                "admitted": dict(self.admitted),
+                "shed": dict(self.shed),
+                "shed_reasons": dict(self.shed_reasons),
+                "queued_total": self.queued_total,
+                "queued_admitted": self.queued_admitted,
+                "avg_queue_wait_ms": (
+                    round(self.queue_wait_ms / self.queued_admitted, 3) if self.queued_admitted else 0.0
+                ),
+            }
+
+
+admission_controller = AdmissionController()
+
+
+def overloaded(prio: str, reason: str) -> AppException:
+    return AppException(
+        error_code=ErrorCode.OVERLOADED,
+        message="Сервер перегружен, попробуйте позже",
+        status_code=503,
+        details={"priority": prio, "reason": reason},
+        headers={"Retry-After": str(settings.admission_retry_after_seconds)},
+    )
@@ -0,0 +1,365 @@
+# app/core/auth.py
+"""
+Ленивое определение пользователя по Telegram initData / сессионному токену.
+
+TelegramAuthMiddleware только кладёт RequestAuth в request.state.auth.
+Проверка подписи и загрузка/создание пользователя (UserSnapshot из
+identity cache) происходят при первом вызове
+RequestAuth.get_user() / get_identity() — то есть только на эндпоинтах,
+которые реально зависят от get_current_user / require_admin. Публичные
+ручки (расписание, лидерборд, уровни) не делают никакой работы, связанной
+с авторизацией.
+
+Поток невалидных initData обходится дёшево: сначала негативный кэш недавно
+отклонённых строк, затем структурные проверки (длина, обязательные ключи,
+свежесть auth_date) и только потом HMAC. В БД авторизация ходит общей
+сессией запроса (app/db/request_session.py) — отдельного соединения из
+пула ради неё не берётся. Предупреждения об отказах пишутся
+в лог не чаще раза в интервал на источник, остальное только считается.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from app.core.activity import activity_tracker
+from app.core.auth_cache import VerifiedInitData, rejected_init_data_cache, verified_init_data_cache
+from app.core.config import settings
+from app.core.identity_cache import UserSnapshot, identity_cache
+from app.core.logger import LogRateLimiter
+from app.core.session_tokens import (
+    SessionTokenError,
+    extract_bearer_token,
+    verify_session_token,
+)
+from app.core.telegram_auth import (
+    TelegramAuthError,
+    precheck_init_data,
+    validate_telegram_init_data,
+)
+from app.db.request_session import request_session
+from app.models.user import User
+from app.services.user_service import upsert_user_from_telegram
+
+logger = logging.getLogger("app.auth")
+
+# Не больше одного предупреждения об отказе в авторизации на источник за интервал
+auth_failure_log_limiter = LogRateLimiter(
+    interval_seconds=settings.auth_failure_log_interval_seconds,
+)
+
+# Счётчики отказов по этапам: repeated / precheck / signature / session_token
+auth_failures: "Counter[str]" = Counter()
+
+
+class AuthIdentity:
+    """
+    Минимальная «личность» запроса: кто это и админ ли он.
+    Для проверки прав этого достаточно — полный User не нужен.
+    """
+
+    __slots__ = ("id", "telegram_id", "is_admin")
+
+    def __init__(self, *, id: int, telegram_id: int, is_admin: bool) -> None:
+        self.id = id
+        self.telegram_id = telegram_id
+        self.is_admin = is_admin
+
+    def __repr__(self) -> str:
+        return f"<AuthIdentity id={self.id} tg_id={self.telegram_id} admin={self.is_admin}>"
+
+
+class RequestAuth:
+    """
+    Результат авторизации конкретного запроса (вычисляется один раз).
+
+    Два способа авторизации:
+    - Authorization: Bearer <session token> — быстрый путь, проверка одним HMAC без БД;
+    - X-Telegram-Init-Data — полная проверка initData (с кэшем) и upsert пользователя.
+    """
+
+    __slots__ = (
+        "init_data",
+        "session_token",
+        "path",
+        "source",
+        "method",
+        "_state",
+        "_token_checked",
+        "_token_identity",
+        "_init_data_checked",
+        "_init_data_entry",
+        "_identity_resolved",
+        "_identity",
+        "_resolved",
+        "_user",
+    )
+
+    def __init__(
+        self,
+        *,
+        init_data: Optional[str],
+        path: str,
+        state: Dict[str, Any],
+        session_token: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> None:
+        self.init_data = init_data
+        self.session_token = session_token
+        self.path = path
+        # адрес клиента — ключ для ограничения логов об отказах
+        self.source = source
+        # "session_token" / "init_data" / None — чем в итоге авторизовались
+        self.method: Optional[str] = None
+        self._state = state
+        self._token_checked = False
+        self._token_identity: Optional[AuthIdentity] = None
+        self._init_data_checked = False
+        self._init_data_entry: Optional[VerifiedInitData] = None
+        self._identity_resolved = False
+        self._identity: Optional[AuthIdentity] = None
+        self._resolved = False
+        self._user: Optional[UserSnapshot] = None
+
+    @property
+    def resolved(self) -> bool:
+        return self._resolved
+
+    def verified_telegram_id(self) -> Optional[int]:
+        """
+        telegram_id из проверенного токена или initData — без БД и без
+        создания пользователя (для проверок до любой записи, например
+        ограничения частоты запросов).
+        """
+        identity = self._check_session_token()
+        if identity is not None:
+            return identity.telegram_id
+        entry = self._verify_init_data()
+        return entry.telegram_id if entry is not None else None
+
+    async def get_identity(self) -> Optional[AuthIdentity]:
+        """
+        Кто делает запрос. С сессионным токеном — без обращения к БД.
+        """
+        if not self._identity_resolved:
+            identity = self._check_session_token()
+            if identity is None:
+                user = await self.get_user()
+                if user is not None:
+                    identity = AuthIdentity(
+                        id=user.id,
+                        telegram_id=user.telegram_id,
+                        is_admin=bool(user.is_admin),
+                    )
+            if identity is not None:
+                activity_tracker.touch(identity.id)
+            self._identity = identity
+            self._identity_resolved = True
+        return self._identity
+
+    async def get_user(self) -> Optional[UserSnapshot]:
+        if not self._resolved:
+            identity = self._check_session_token()
+            if identity is not None:
+                self._user = await self._load_user(identity)
+            else:
+                self._user = await self._authenticate()
+            self._resolved = True
+            if self._user is not None:
+                activity_tracker.touch(self._user.id)
+            # Совместимость: код, читающий request.state.user, продолжает работать
+            self._state["user"] = self._user
+        return self._user
+
+    def _check_session_token(self) -> Optional[AuthIdentity]:
+        if not self._token_checked:
+            self._token_checked = True
+            if self.session_token:
+                try:
+                    claims = verify_session_token(self.session_token)
+                except SessionTokenError as exc:
+                    self._log_failure("session_token", f"Session token rejected: {exc}")
+                else:
+                    self.method = "session_token"
+                    self._token_identity = AuthIdentity(
+                        id=claims.user_id,
+                        telegram_id=claims.telegram_id,
+                        is_admin=claims.is_admin,
+                    )
+        return self._token_identity
+
+    async def _load_user(self, identity: AuthIdentity) -> Optional[UserSnapshot]:
+        snapshot = identity_cache.get(identity.telegram_id)
+        if snapshot is not None:
+            return snapshot
+
+        try:
+            async with request_session(self._state) as db:
+                user = await db.get(User, identity.id)
+        except Exception:
+            logger.exception("Error while loading user %s for session token", identity.id)
+            return None
+
+        return identity_cache.put(user) if user is not None else None
+
+    def _verify_init_data(self) -> Optional[VerifiedInitData]:
+        """
+        Проверенная запись initData или None.
+        Проверка — один раз за запрос.
+        """
+        if not self._init_data_checked:
+            self._init_data_checked = True
+            self._init_data_entry = self._check_init_data()
+        return self._init_data_entry
+
+    def _check_init_data(self) -> Optional[VerifiedInitData]:
+        init_data = self.init_data
+        if not init_data:
+            # Нет Telegram-данных — запрос не авторизован,
+            # но сам эндпоинт решает, критично это или нет.
+            return None
+
+        bot_token = settings.telegram_bot_token
+        if not bot_token:
+            logger.error("TELEGRAM_BOT_TOKEN не задан, Telegram-авторизация невозможна")
+            return None
+
+        # Повторные запросы с той же initData берём из кэша (без HMAC)
+        entry = verified_init_data_cache.get(init_data)
+        if entry is None:
+            # Ту же строку уже отклоняли недавно — не проверяем заново
+            if rejected_init_data_cache.contains(init_data):
+                self._log_failure("repeated", "Telegram auth error: initData rejected recently")
+                return None
+
+            max_age_seconds = settings.telegram_auth_max_age_seconds
+
+            # Дешёвые проверки структуры, затем HMAC
+            try:
+                precheck_init_data(
+                    init_data,
+                    max_age_seconds=max_age_seconds,
+                    max_length=settings.telegram_init_data_max_length,
+                )
+            except TelegramAuthError as exc:
+                rejected_init_data_cache.add(init_data)
+                self._log_failure("precheck", f"Telegram auth error: {exc.message}")
+                return None
+
+            try:
+                tg_init = validate_telegram_init_data(
+                    init_data=init_data,
+                    bot_token=bot_token,
+                    max_age_seconds=max_age_seconds,
+                )
+            except TelegramAuthError as exc:
+                rejected_init_data_cache.add(init_data)
+                self._log_failure("signature", f"Telegram auth error: {exc.message}")
+                # Пользователь не считается авторизованным
+                return None
+            except Exception:
+                logger.exception("Unexpected error while validating Telegram initData")
+                return None
+
+            if not tg_init.user or "id" not in tg_init.user:
+                logger.warning("Telegram initData does not contain 'user.id'")
+                return None
+
+            entry = verified_init_data_cache.put(
+                tg_init,
+                max_age_seconds=max_age_seconds,
+            )
+        return entry
+
+    async def _authenticate(self) -> Optional[UserSnapshot]:
+        entry = self._verify_init_data()
+        if entry is None:
+            return None
+
+        # Пользователь из кэша, если загружали его недавно
+        snapshot = identity_cache.get(entry.telegram_id)
+        if snapshot is not None:
+            self.method = "init_data"
+            return snapshot
+
+        tg_user = entry.init_data.user
+
+        # Создаём / обновляем пользователя в БД (async, без блокировки event loop)
+        try:
+            async with request_session(self._state) as db:
+                user = await upsert_user_from_telegram(
+                    db,
+                    telegram_id=tg_user["id"],
+                    username=tg_user.get("username"),
+                    first_name=tg_user.get("first_name"),
+                    last_name=tg_user.get("last_name"),
+                )
+        except Exception:
+            logger.exception("Error while getting/creating user from Telegram initData")
+            return None
+
+        self.method = "init_data"
+        return identity_cache.put(user)
+
+    def _log_failure(self, stage: str, message: str) -> None:
+        """
+        Считает отказ и пишет предупреждение, если для источника не превышен лимит.
+        """
+        auth_failures[stage] += 1
+
+        suppressed = auth_failure_log_limiter.hit(self.source)
+        if suppressed is None:
+            return
+        if suppressed:
+            logger.warning(
+                "%s on %s from %s (+%d similar suppressed)",
+                message,
+                self.path,
+                self.source,
+                suppressed,
+            )
+        else:
+            logger.warning("%s on %s from %s", message, self.path, self.source)
+
+
+def _get_request_auth(request: Request) -> RequestAuth:
+    auth: Optional[RequestAuth] = getattr(request.state, "auth", None)
+    if auth is None:
+        auth = RequestAuth(
+            init_data=request.headers.get("X-Telegram-Init-Data"),
+            session_token=extract_bearer_token(request.headers.get("Authorization")),
+            path=request.url.path,
+            state=request.scope.setdefault("state", {}),
+            source=request.client.host if request.client else None,
+        )
+        request.state.auth = auth
+    return auth
+
+
+async def resolve_request_user(request: Request) -> Optional[UserSnapshot]:
+    """
+    Возвращает пользователя текущего запроса, при необходимости вычисляя его.
+
+    Результат общий для middleware и всех зависимостей запроса. Если middleware
+    RequestAuth не подготовил (технические пути, приложение без middleware),
+    создаём его здесь же и сохраняем в request.state.
+    """
+    return await _get_request_auth(request).get_user()
+
+
+async def resolve_request_identity(request: Request) -> Optional[AuthIdentity]:
+    """
+    То же, что resolve_request_user, но возвращает только AuthIdentity.
+    """
+    return await _get_request_auth(request).get_identity()
+
+
+def resolve_request_telegram_id(request: Request) -> Optional[int]:
+    """
+    telegram_id запроса по проверенным токену / initData, без БД.
+    """
+    return _get_request_auth(request).verified_telegram_id()
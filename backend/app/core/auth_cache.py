@@ -0,0 +1,221 @@
+# app/core/auth_cache.py
+"""
+Кэш уже провалидированных Telegram initData.
+
+Мини-апп на протяжении всей сессии шлёт одну и ту же строку initData,
+поэтому повторно считать HMAC, парсить user-JSON и ходить в БД за
+пользователем на каждый запрос не нужно.
+
+Ключ — значение параметра hash из initData. При попадании дополнительно
+сверяем исходную строку целиком (compare_digest), чтобы подмена данных при
+том же hash не проходила.
+
+Запись живёт до auth_date + max_age_seconds (как и сама валидация).
+Сам пользователь хранится отдельно — в app/core/identity_cache.py.
+
+Рядом — негативный кэш недавно отклонённых строк: клиент (или бот),
+повторяющий одну и ту же битую/просроченную initData, отсекается
+одним blake2b и поиском в словаре — без разбора и без HMAC.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.telegram_auth import TelegramInitData, extract_init_data_param
+
+
+@dataclass
+class VerifiedInitData:
+    """
+    Элемент кэша: провалидированные данные initData.
+    """
+    init_data: TelegramInitData
+    expires_at: float                 # unix timestamp, после которого запись невалидна
+    telegram_id: Optional[int] = None
+
+
+def extract_init_data_hash(init_data: str) -> str:
+    """
+    Быстро достаём значение hash без полного разбора строки.
+    """
+    return extract_init_data_param(init_data, "hash")
+
+
+class VerifiedInitDataCache:
+    """
+    Ограниченный по размеру LRU-кэш с TTL.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+
+        self._items: "OrderedDict[str, VerifiedInitData]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    # ---- основная часть ----
+
+    def get(self, init_data: str) -> Optional[VerifiedInitData]:
+        key = extract_init_data_hash(init_data)
+        if not key:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.expires_at <= time.time():
+                del self._items[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            if not hmac.compare_digest(entry.init_data.raw, init_data):
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, tg_init: TelegramInitData, *, max_age_seconds: int) -> VerifiedInitData:
+        now = time.time()
+        if tg_init.auth_date is not None and max_age_seconds > 0:
+            expires_at = float(tg_init.auth_date + max_age_seconds)
+        else:
+            expires_at = now + max(max_age_seconds, 0)
+
+        telegram_id: Optional[int] = None
+        if tg_init.user and "id" in tg_init.user:
+            try:
+                telegram_id = int(tg_init.user["id"])
+            except (TypeError, ValueError):
+                telegram_id = None
+
+        entry = VerifiedInitData(
+            init_data=tg_init,
+            expires_at=expires_at,
+            telegram_id=telegram_id,
+        )
+
+        key = extract_init_data_hash(tg_init.raw)
+        if not key or expires_at <= now or self.maxsize <= 0:
+            # Кэшировать нечего, но вызывающему коду всё равно отдаём запись
+            return entry
+
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+        return entry
+
+    # ---- служебное ----
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+class RejectedInitDataCache:
+    """
+    Негативный кэш: отпечатки недавно отклонённых initData с коротким TTL.
+
+    Ключ — blake2b от всей строки, а не параметр hash: иначе чужой мусор
+    с подставленным hash настоящего пользователя «отравил» бы его запись.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: int = 300) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+
+        # отпечаток -> момент, до которого строка считается отклонённой
+        self._items: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.added = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(init_data: str) -> bytes:
+        return hashlib.blake2b(init_data.encode("utf-8"), digest_size=16).digest()
+
+    def contains(self, init_data: str) -> bool:
+        if self.maxsize <= 0:
+            return False
+
+        key = self._key(init_data)
+        with self._lock:
+            expires_at = self._items.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._items[key]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, init_data: str) -> None:
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+
+        key = self._key(init_data)
+        with self._lock:
+            self._items[key] = time.time() + self.ttl_seconds
+            self._items.move_to_end(key)
+            self.added += 1
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "added": self.added,
+            "evictions": self.evictions,
+        }
+
+
+# Глобальные кэши процесса
+verified_init_data_cache = VerifiedInitDataCache(maxsize=settings.auth_cache_size)
+rejected_init_data_cache = RejectedInitDataCache(
+    maxsize=settings.auth_reject_cache_size,
+    ttl_seconds=settings.auth_reject_cache_ttl_seconds,
+)
@@ -44,10 +44,105 @@ class Settings(BaseModel):
 
     # БД
     database_url: str = os.getenv("DATABASE_URL", "")
+    # Реплика только для чтения (необязательно) и окно read-your-writes после записи
+    database_replica_url: str = os.getenv("DATABASE_REPLICA_URL", "")
+    replica_sticky_seconds: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # Сколько не ходить на реплику после ошибки соединения с ней
+    replica_retry_seconds: float = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+    # Пулы соединений (app/db/session.py, EngineRegistry)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Кэш скомпилированных SQLAlchemy-запросов (на движок)
+    db_query_cache_size: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+    # Серверные prepared statements: порог psycopg / размер кэша asyncpg
+    db_prepare_threshold: int = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    # За PgBouncer (transaction pooling) prepared statements отключаются
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+    # Счётчик запросов: заголовки X-DB-Queries / Server-Timing (вне production по умолчанию)
+    # и порог повторов одного statement'а, после которого ругаемся на N+1 (0 — выкл.)
+    db_query_headers: bool = os.getenv(
+        "DB_QUERY_HEADERS", "false" if os.getenv("ENVIRONMENT") == "production" else "true"
+    ).lower() in ("1", "true", "yes")
+    db_nplus1_threshold: int = int(os.getenv("DB_NPLUS1_THRESHOLD", "3"))
+    # Единица работы на запрос: сервисы делают flush, COMMIT — один перед ответом
+    db_deferred_commit: bool = os.getenv("DB_DEFERRED_COMMIT", "true").lower() in ("1", "true", "yes")
+    # total списков (app/db/counts.py): кэш COUNT(*) по фильтрам и оценка по reltuples
+    count_cache_ttl_seconds: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    count_cache_maxsize: int = int(os.getenv("COUNT_CACHE_MAXSIZE", "10000"))
+    count_estimate_min_rows: int = int(os.getenv("COUNT_ESTIMATE_MIN_ROWS", "10000"))
+    count_force_exact: bool = os.getenv("COUNT_FORCE_EXACT", "false").lower() in ("1", "true", "yes")
+    # Кэш страниц расписания (app/core/schedule_cache.py): версия растёт при изменении
+    # тренировок и расходится по воркерам через LISTEN/NOTIFY; TTL — страховка на случай
+    # потерянного соединения LISTEN. За PgBouncer LISTEN нужен прямой адрес Postgres
+    schedule_cache: bool = os.getenv("SCHEDULE_CACHE", "true").lower() in ("1", "true", "yes")
+    schedule_cache_ttl_seconds: float = float(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", "60"))
+    schedule_cache_maxsize: int = int(os.getenv("SCHEDULE_CACHE_MAXSIZE", "1000"))
+    schedule_cache_listen_url: str = os.getenv("SCHEDULE_CACHE_LISTEN_URL", "")
+    schedule_cache_resync_seconds: float = float(os.getenv("SCHEDULE_CACHE_RESYNC_SECONDS", "30"))
+
+    # Дедлайны запросов по классам маршрутов, мс (0 — без дедлайна): app/core/deadlines.py.
+    # В БД уходят как SET LOCAL statement_timeout; обработка отменяется через бюджет + grace
+    deadline_public_read_ms: int = int(os.getenv("DEADLINE_PUBLIC_READ_MS", "5000"))
+    deadline_user_write_ms: int = int(os.getenv("DEADLINE_USER_WRITE_MS", "10000"))
+    deadline_admin_report_ms: int = int(os.getenv("DEADLINE_ADMIN_REPORT_MS", "30000"))
+    deadline_grace_ms: int = int(os.getenv("DEADLINE_GRACE_MS", "500"))
+    deadline_retry_after_seconds: int = int(os.getenv("DEADLINE_RETRY_AFTER_SECONDS", "2"))
+
+    # Admission control (app/core/admission.py), пороги — на процесс (воркер).
+    # Низкий приоритет (админские списки, рассылки) ставится в очередь и
+    # отбрасывается с 503, когда запросов в работе >= ADMISSION_LOW_MAX_IN_FLIGHT,
+    # пул исчерпан или сглаженное ожидание соединения >= ADMISSION_POOL_WAIT_MS;
+    # обычные запросы — только сверх ADMISSION_MAX_IN_FLIGHT (0 — без предела)
+    admission_control: bool = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+    admission_max_in_flight: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "200"))
+    admission_low_max_in_flight: int = int(os.getenv("ADMISSION_LOW_MAX_IN_FLIGHT", "32"))
+    admission_pool_wait_ms: float = float(os.getenv("ADMISSION_POOL_WAIT_MS", "50"))
+    admission_queue_ms: int = int(os.getenv("ADMISSION_QUEUE_MS", "500"))
+    admission_max_queued: int = int(os.getenv("ADMISSION_MAX_QUEUED", "16"))
+    admission_retry_after_seconds: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+    # Лог медленных запросов (0 — выкл.) и EXPLAIN (ANALYZE, BUFFERS) для них
+    slow_query_threshold_ms: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    slow_query_sample_rate: float = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+    slow_query_log_interval_seconds: int = int(os.getenv("SLOW_QUERY_LOG_INTERVAL_SECONDS", "60"))
+    slow_query_ring_size: int = int(os.getenv("SLOW_QUERY_RING_SIZE", "50"))
+    slow_query_explain: bool = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+    slow_query_explain_timeout_ms: int = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
 
     # Telegram
     telegram_bot_token: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     telegram_webapp_url: str | None = os.getenv("TELEGRAM_WEBAPP_URL") or None
+    telegram_auth_max_age_seconds: int = int(os.getenv("TELEGRAM_AUTH_MAX_AGE_SECONDS", str(24 * 60 * 60)))
+
+    # Кэш провалидированных initData
+    auth_cache_size: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+    # Защита от потока невалидных initData
+    telegram_init_data_max_length: int = int(os.getenv("TELEGRAM_INIT_DATA_MAX_LENGTH", "4096"))
+    auth_reject_cache_size: int = int(os.getenv("AUTH_REJECT_CACHE_SIZE", "10000"))
+    auth_reject_cache_ttl_seconds: int = int(os.getenv("AUTH_REJECT_CACHE_TTL_SECONDS", "300"))
+    auth_failure_log_interval_seconds: int = int(os.getenv("AUTH_FAILURE_LOG_INTERVAL_SECONDS", "60"))
+
+    # Кэш снимков пользователей (identity cache)
+    identity_cache_size: int = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+    identity_cache_ttl_seconds: int = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+
+    # Учёт активности (users.last_seen_at)
+    activity_flush_interval_seconds: int = int(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "60"))
+    activity_max_pending: int = int(os.getenv("ACTIVITY_MAX_PENDING", "50000"))
+
+    # Ограничение частоты запросов на запись (token bucket по telegram_id)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | postgres
+    rate_limits: str = os.getenv("RATE_LIMITS", "")  # "enrollments.create=5/10,enrollments.cancel=off"
+
+    # Сессионные токены (обмен initData -> Bearer-токен)
+    session_token_secret: str = os.getenv("SESSION_TOKEN_SECRET", "")
+    session_token_ttl_seconds: int = int(os.getenv("SESSION_TOKEN_TTL_SECONDS", "900"))
 
 
 @lru_cache
@@ -0,0 +1,179 @@
+# app/core/deadlines.py
+"""
+Дедлайны запросов по классам маршрутов.
+
+Один патологический запрос (огромный offset в журнале аудита, COUNT по
+таблице лидеров) мог держать соединение пула сколько угодно, хотя клиент
+давно ушёл. Теперь у каждого HTTP-запроса есть бюджет времени по классу:
+
+  public_read   — чтения (GET и т.п.) вне админки      DEADLINE_PUBLIC_READ_MS
+  user_write    — POST/PUT/PATCH/DELETE вне админки    DEADLINE_USER_WRITE_MS
+  admin_report  — всё под /admin (списки, отчёты)      DEADLINE_ADMIN_REPORT_MS
+
+Бюджет соблюдается на двух уровнях:
+- в БД: при начале транзакции сессии выполняется
+  SET LOCAL statement_timeout = <остаток бюджета>, и Postgres сам прерывает
+  запрос (SQLSTATE 57014) — соединение остаётся рабочим и сразу
+  возвращается в пул;
+- в приложении: DeadlineMiddleware (app/core/middleware.py) отменяет
+  обработку, если она не уложилась в бюджет + DEADLINE_GRACE_MS
+  (ожидание соединения из пула, внешние вызовы, цепочки запросов).
+
+В обоих случаях клиент получает 503 DEADLINE_EXCEEDED с Retry-After.
+0 в бюджете класса — без дедлайна.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import AppException, ErrorCode
+from app.db.slow_queries import INTERNAL_QUERY
+
+logger = logging.getLogger("app.deadlines")
+
+ROUTE_CLASSES = ("public_read", "user_write", "admin_report")
+
+_WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+_ADMIN_PREFIXES = ("/api/v1/admin", "/api/v1/trainings/admin")
+# Технические эндпоинты без БД — без дедлайна
+_EXEMPT_PATHS = frozenset({"/health", "/api/v1/ping"})
+
+# SQLSTATE query_canceled: statement_timeout (или отмена запроса)
+_QUERY_CANCELED = "57014"
+
+# (класс маршрута, monotonic-время дедлайна) текущего HTTP-запроса
+_current: ContextVar[Optional[Tuple[str, float]]] = ContextVar("request_deadline", default=None)
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith(_ADMIN_PREFIXES):
+        return "admin_report"
+    if method in _WRITE_METHODS:
+        return "user_write"
+    return "public_read"
+
+
+def budget_ms(klass: str) -> int:
+    return {
+        "public_read": settings.deadline_public_read_ms,
+        "user_write": settings.deadline_user_write_ms,
+        "admin_report": settings.deadline_admin_report_ms,
+    }[klass]
+
+
+def remaining_ms() -> Optional[float]:
+    """
+    Сколько осталось от бюджета текущего запроса (None — дедлайна нет).
+    """
+    current = _current.get()
+    if current is None:
+        return None
+    return (current[1] - time.monotonic()) * 1000
+
+
+def current_route_class() -> Optional[str]:
+    current = _current.get()
+    return current[0] if current is not None else None
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == _QUERY_CANCELED
+
+
+class DeadlineMonitor:
+    """
+    Запускает/снимает дедлайн запроса и считает, сколько запросов его превысили.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests: "Counter[str]" = Counter()
+        # прервано Postgres'ом по statement_timeout / отменено в приложении
+        self.statement_timeouts: "Counter[str]" = Counter()
+        self.cancelled: "Counter[str]" = Counter()
+
+    def begin(self, method: str, path: str) -> Tuple[Optional[str], Optional[float], Any]:
+        """
+        -> (класс, бюджет в секундах, токен ContextVar); класс None — без дедлайна.
+        """
+        if path in _EXEMPT_PATHS:
+            return None, None, None
+        klass = route_class(method, path)
+        budget = budget_ms(klass)
+        if budget <= 0:
+            return None, None, None
+
+        with self._lock:
+            self.requests[klass] += 1
+        token = _current.set((klass, time.monotonic() + budget / 1000))
+        return klass, budget / 1000, token
+
+    def end(self, token: Any) -> None:
+        if token is not None:
+            _current.reset(token)
+
+    def record_statement_timeout(self, klass: Optional[str]) -> None:
+        with self._lock:
+            self.statement_timeouts[klass or "none"] += 1
+
+    def record_cancelled(self, klass: str) -> None:
+        with self._lock:
+            self.cancelled[klass] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budgets_ms": {klass: budget_ms(klass) for klass in ROUTE_CLASSES},
+                "grace_ms": settings.deadline_grace_ms,
+                "requests": dict(self.requests),
+                "statement_timeouts": dict(self.statement_timeouts),
+                "cancelled": dict(self.cancelled),
+            }
+
+
+deadline_monitor = DeadlineMonitor()
+
+
+def deadline_exceeded(klass: Optional[str]) -> AppException:
+    return AppException(
+        error_code=ErrorCode.DEADLINE_EXCEEDED,
+        message="Сервер не успел обработать запрос, попробуйте позже",
+        status_code=503,
+        details={"route_class": klass, "budget_ms": budget_ms(klass) if klass else None},
+        headers={"Retry-After": str(settings.deadline_retry_after_seconds)},
+    )
+
+
+# --------- statement_timeout для транзакций сессий --------- #
+def _after_begin(session: Session, transaction: Any, connection: Any) -> None:
+    left = remaining_ms()
+    if left is None:
+        return
+    # Бюджет уже вышел — всё равно даём запросу минимальное окно:
+    # Postgres прервёт его, и ошибка уйдёт клиенту как DEADLINE_EXCEEDED
+    timeout = max(int(left), 1)
+    # служебный запрос — не считаем его в X-DB-Queries и бюджетах эндпоинтов
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {timeout}",
+        execution_options={INTERNAL_QUERY: True},
+    )
+
+
+def install() -> None:
+    """
+    Вешает SET LOCAL statement_timeout на начало транзакции любой ORM-сессии
+    (в том числе AsyncSession, реплики); вне HTTP-запроса ничего не делает.
+    """
+    if not event.contains(Session, "after_begin", _after_begin):
+        event.listen(Session, "after_begin", _after_begin)
@@ -1,86 +1,156 @@
 # backend/app/core/deps.py
 from __future__ import annotations
 
-import os
-from typing import AsyncGenerator, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Optional
 
-from fastapi import Depends, Header, HTTPException, status
-from sqlalchemy import select
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
-from app.core.security import TelegramInitDataError, verify_telegram_init_data
-from app.db.session import async_session_maker
-from app.models.user import User
+from app.core.auth import (
+    AuthIdentity,
+    resolve_request_identity,
+    resolve_request_telegram_id,
+    resolve_request_user,
+)
+from app.core.exceptions import AppException, ErrorCode
+from app.db.read_routing import read_router
+from app.db.request_session import request_session
+from app.core.identity_cache import UserSnapshot
+from app.core.rate_limit import rate_limiter
 
 
-def _get_bot_token() -> str:
+_WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+async def _request_user_id(request: Request) -> Optional[int]:
     """
-    Берём токен максимально безопасно и совместимо со старыми конфигами:
-    1) пробуем несколько возможных имён в settings
-    2) пробуем TELEGRAM_BOT_TOKEN из env (у тебя он точно есть внутри контейнера)
+    id пользователя, если запрос вообще пришёл с авторизацией
+    (анонимные чтения расписания не трогают БД ради этого).
     """
-    for attr in ("TELEGRAM_BOT_TOKEN", "BOT_TOKEN", "TELEGRAM_TOKEN", "TG_BOT_TOKEN"):
-        if hasattr(settings, attr):
-            val = getattr(settings, attr)
-            if isinstance(val, str) and val.strip():
-                return val.strip()
+    auth = getattr(request.state, "auth", None)
+    if auth is None or not (auth.init_data or auth.session_token):
+        return None
+    identity = await resolve_request_identity(request)
+    return identity.id if identity is not None else None
 
-    env_val = os.getenv("TELEGRAM_BOT_TOKEN")
-    if env_val and env_val.strip():
-        return env_val.strip()
 
-    raise RuntimeError(
-        "Bot token not found. Expected settings.TELEGRAM_BOT_TOKEN (or BOT_TOKEN/TELEGRAM_TOKEN/TG_BOT_TOKEN) "
-        "or env TELEGRAM_BOT_TOKEN"
-    )
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия primary — общая на запрос (app/db/request_session.py): та же, что
+    у авторизации и других зависимостей. Под UnitOfWorkMiddleware она
+    присоединена к единице работы: commit() сервисов — flush, COMMIT один,
+    перед отправкой ответа (app/db/unit_of_work.py).
+    """
+    async with request_session(request.scope.get("state")) as session:
+        yield session
 
+    # Успешная запись: ближайшие чтения этого пользователя — с primary
+    if read_router.enabled and request.method in _WRITE_METHODS:
+        user_id = await _request_user_id(request)
+        if user_id is not None:
+            read_router.mark_write(user_id)
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
-        yield session
 
+@asynccontextmanager
+async def read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для тяжёлых чтений: реплика, если она задана и доступна,
+    и пользователь недавно ничего не записывал (см. app/db/read_routing.py).
+    Иначе — общая сессия запроса на primary.
+
+    Напрямую — для эндпоинтов, которым БД нужна не всегда (ответ из кэша).
+    """
+    user_id = await _request_user_id(request) if read_router.enabled else None
+    session = await read_router.open_replica_session(user_id)
+    if session is None:
+        async with request_session(request.scope.get("state")) as session:
+            yield session
+        return
+
+    async with session:
+        yield session
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    x_telegram_init_data: Optional[str] = Header(default=None, alias="X-Telegram-Init-Data"),
-) -> User:
-    if not x_telegram_init_data:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing X-Telegram-Init-Data header",
-        )
 
-    bot_token = _get_bot_token()
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI-зависимость поверх read_session().
+    """
+    async with read_session(request) as session:
+        yield session
 
-    try:
-        payload = verify_telegram_init_data(x_telegram_init_data, bot_token)
-    except TelegramInitDataError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e)) from e
 
-    user_data = payload.get("user") or {}
-    tg_id = user_data.get("id")
-    if not tg_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Telegram user id is missing")
+async def get_current_user(request: Request) -> UserSnapshot:
+    """
+    FastAPI-зависимость. Используется как Depends(get_current_user).
 
-    result = await db.execute(select(User).where(User.telegram_id == tg_id))
-    user = result.scalar_one_or_none()
+    Единая точка авторизации: берёт результат RequestAuth, который готовит
+    TelegramAuthMiddleware, поэтому подпись initData проверяется и пользователь
+    загружается максимум один раз на запрос — сколько бы зависимостей его ни ждали.
 
+    Если пользователь не авторизован через Telegram, бросаем AppException
+    с кодом UNAUTHORIZED.
+    """
+    user = await resolve_request_user(request)
     if user is None:
-        user = User(
-            telegram_id=tg_id,
-            username=user_data.get("username"),
-            first_name=user_data.get("first_name"),
-            last_name=user_data.get("last_name"),
+        raise AppException(
+            error_code="UNAUTHORIZED",
+            message="Пользователь не авторизован через Telegram",
+            status_code=401,
         )
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-
     return user
 
 
-async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_identity(request: Request) -> AuthIdentity:
+    """
+    Облегчённый вариант get_current_user: только id / telegram_id / is_admin.
+    С сессионным токеном не ходит в БД вовсе — для проверок прав этого хватает.
+    """
+    identity = await resolve_request_identity(request)
+    if identity is None:
+        raise AppException(
+            error_code="UNAUTHORIZED",
+            message="Пользователь не авторизован через Telegram",
+            status_code=401,
+        )
+    return identity
+
+
+async def require_admin(current_user: AuthIdentity = Depends(get_current_identity)) -> AuthIdentity:
     if not getattr(current_user, "is_admin", False):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
     return current_user
+
+
+def rate_limited(route: str) -> Callable[..., Awaitable[None]]:
+    """
+    Зависимость-ограничитель частоты для маршрута (лимиты — app/core/rate_limit.py).
+
+    Подключается через dependencies=[Depends(rate_limited("enrollments.create"))]:
+    такие зависимости FastAPI выполняет раньше остальных, поэтому лишний
+    запрос отсекается до работы обработчика. Ведро ищется по telegram_id из
+    проверенных initData / токена — пользователь ради этого не создаётся
+    и не обновляется; хранилище postgres ходит общей сессией запроса.
+    """
+
+    async def _check_rate_limit(request: Request) -> None:
+        telegram_id = resolve_request_telegram_id(request)
+        if telegram_id is None:
+            raise AppException(
+                error_code="UNAUTHORIZED",
+                message="Пользователь не авторизован через Telegram",
+                status_code=401,
+            )
+
+        async with request_session(request.scope.get("state")) as db:
+            retry_after = await rate_limiter.check(route, telegram_id, db)
+        if retry_after > 0:
+            raise AppException(
+                error_code=ErrorCode.RATE_LIMITED,
+                message="Слишком много запросов, попробуйте позже",
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                details={"retry_after": round(retry_after, 2)},
+                headers={"Retry-After": rate_limiter.retry_after_header(retry_after)},
+            )
+
+    return _check_rate_limit
@@ -8,6 +8,7 @@ from typing import Any
 
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
+from sqlalchemy.exc import DBAPIError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.responses import error_response
@@ -42,6 +43,11 @@ class ErrorCode(str, Enum):
     NO_OPEN_BANS = "NO_OPEN_BANS"
     DEBT_NOT_FOUND = "DEBT_NOT_FOUND"
 
+    # Ограничения нагрузки
+    RATE_LIMITED = "RATE_LIMITED"
+    DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+    OVERLOADED = "OVERLOADED"
+
 
 class AppException(Exception):
     """
@@ -59,6 +65,7 @@ class AppException(Exception):
         message: str,
         status_code: int = status.HTTP_400_BAD_REQUEST,
         details: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
     ) -> None:
         # Преобразуем ErrorCode -> строка, чтобы в ответах всегда были строки
         if isinstance(error_code, ErrorCode):
@@ -69,6 +76,8 @@ class AppException(Exception):
         self.message = message
         self.status_code = status_code
         self.details = details or {}
+        # Дополнительные заголовки ответа (например, Retry-After)
+        self.headers = headers
         super().__init__(message)
 
 
@@ -76,6 +85,8 @@ def setup_exception_handlers(app: FastAPI) -> None:
     """
     Регистрируем глобальные обработчики ошибок на FastAPI-приложении.
     """
+    # deadlines сам строит AppException — импорт здесь, чтобы не было цикла
+    from app.core.deadlines import current_route_class, deadline_exceeded, deadline_monitor, is_statement_timeout
 
     @app.exception_handler(AppException)
     async def app_exception_handler(request: Request, exc: AppException):
@@ -92,6 +103,7 @@ def setup_exception_handlers(app: FastAPI) -> None:
             message=exc.message,
             status_code=exc.status_code,
             details=exc.details,
+            headers=exc.headers,
         )
 
     @app.exception_handler(RequestValidationError)
@@ -123,6 +135,15 @@ def setup_exception_handlers(app: FastAPI) -> None:
             status_code=exc.status_code,
         )
 
+    @app.exception_handler(DBAPIError)
+    async def db_exception_handler(request: Request, exc: DBAPIError):
+        # Postgres прервал запрос по statement_timeout дедлайна (app/core/deadlines.py)
+        if not is_statement_timeout(exc):
+            raise exc
+        klass = current_route_class()
+        deadline_monitor.record_statement_timeout(klass)
+        return await app_exception_handler(request, deadline_exceeded(klass))
+
     @app.exception_handler(Exception)
     async def unhandled_exception_handler(request: Request, exc: Exception):
         logger.exception(
@@ -0,0 +1,197 @@
+# app/core/identity_cache.py
+"""
+Процессный кэш «снимков» пользователей.
+
+Вместо detached ORM-объекта User (из уже закрытой сессии) обработчики
+получают неизменяемый UserSnapshot на __slots__. Снимок:
+- кладётся при авторизации (initData / сессионный токен);
+- перезаписывается при изменении профиля (write-through);
+- сбрасывается при изменении банов и флага администратора.
+
+Так /profile/me, /me и /ratings/me получают пользователя без обращения к БД.
+TTL страхует от изменений, сделанных мимо приложения (руками в БД, другим воркером).
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class UserSnapshot:
+    """
+    Неизменяемый компактный снимок пользователя.
+    Совместим с UserProfile.model_validate(..., from_attributes=True).
+    """
+
+    __slots__ = (
+        "id",
+        "telegram_id",
+        "username",
+        "first_name",
+        "last_name",
+        "phone",
+        "level_id",
+        "rating",
+        "cups",
+        "gender",
+        "birth_date",
+        "is_telegram_public",
+        "payer_id",
+        "card_last4",
+        "is_active",
+        "is_admin",
+    )
+
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone: Optional[str]
+    level_id: Optional[int]
+    rating: int
+    cups: int
+    gender: Optional[str]
+    birth_date: Optional[date]
+    is_telegram_public: bool
+    payer_id: Optional[str]
+    card_last4: Optional[str]
+    is_active: bool
+    is_admin: bool
+
+    def __init__(self, **values: Any) -> None:
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    @classmethod
+    def from_user(cls, user: Any) -> "UserSnapshot":
+        return cls(**{name: getattr(user, name, None) for name in cls.__slots__})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("UserSnapshot is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("UserSnapshot is immutable")
+
+    def __repr__(self) -> str:
+        return f"<UserSnapshot id={self.id} tg_id={self.telegram_id}>"
+
+    def footprint_bytes(self) -> int:
+        """
+        Примерный размер снимка в памяти (сам объект + значения полей).
+        Общие объекты (малые int, True/False, None) тоже считаем — оценка сверху.
+        """
+        return sys.getsizeof(self) + sum(
+            sys.getsizeof(getattr(self, name)) for name in self.__slots__
+        )
+
+
+class IdentityCache:
+    """
+    LRU-кэш telegram_id -> UserSnapshot с TTL и индексом по user.id.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: int = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+
+        # telegram_id -> (snapshot, loaded_at, footprint)
+        self._items: "OrderedDict[int, Tuple[UserSnapshot, float, int]]" = OrderedDict()
+        self._by_user_id: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, telegram_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            item = self._items.get(telegram_id)
+            if item is None:
+                self.misses += 1
+                return None
+
+            snapshot, loaded_at, _ = item
+            if time.time() - loaded_at >= self.ttl_seconds:
+                self._drop(telegram_id)
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(telegram_id)
+            self.hits += 1
+            return snapshot
+
+    def put(self, user: Any) -> UserSnapshot:
+        """
+        Кладёт снимок пользователя (User или готовый UserSnapshot) и возвращает его.
+        """
+        snapshot = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+        if self.maxsize <= 0:
+            return snapshot
+
+        size = snapshot.footprint_bytes()
+        with self._lock:
+            if snapshot.telegram_id in self._items:
+                self._drop(snapshot.telegram_id)
+            self._items[snapshot.telegram_id] = (snapshot, time.time(), size)
+            self._by_user_id[snapshot.id] = snapshot.telegram_id
+            self._bytes += size
+            while len(self._items) > self.maxsize:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate(self, telegram_id: int) -> None:
+        with self._lock:
+            if telegram_id in self._items:
+                self._drop(telegram_id)
+                self.invalidations += 1
+
+    def invalidate_user_id(self, user_id: int) -> None:
+        telegram_id = self._by_user_id.get(user_id)
+        if telegram_id is not None:
+            self.invalidate(telegram_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._by_user_id.clear()
+            self._bytes = 0
+
+    def _drop(self, telegram_id: int) -> None:
+        snapshot, _, size = self._items.pop(telegram_id)
+        self._by_user_id.pop(snapshot.id, None)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        size = len(self._items)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "total_bytes": self._bytes,
+            "bytes_per_user": round(self._bytes / size, 1) if size else 0.0,
+        }
+
+
+# Глобальный кэш процесса
+identity_cache = IdentityCache(
+    maxsize=settings.identity_cache_size,
+    ttl_seconds=settings.identity_cache_ttl_seconds,
+)
@@ -4,6 +4,10 @@ from __future__ import annotations
 
 import logging
 import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
 
 from app.core.config import get_settings
 
@@ -29,5 +33,57 @@ def configure_logging() -> None:
     handler.setFormatter(formatter)
     root_logger.addHandler(handler)
 
-    # уменьшим шум от SQLAlchemy
-    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    # Каждый statement не логируем: медленные запросы пишет app.db.slow
+    # (app/db/slow_queries.py), сам SQLAlchemy — только предупреждения
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+
+class LogRateLimiter:
+    """
+    Ограничитель частоты однотипных сообщений в лог.
+
+    Для каждого ключа (например, IP-адрес источника) пропускает не больше
+    одного сообщения за interval_seconds, остальные только считает.
+    Число ключей ограничено maxsize (LRU), чтобы поток с множества
+    адресов не раздувал память.
+    """
+
+    def __init__(self, interval_seconds: float = 60.0, maxsize: int = 10_000) -> None:
+        self.interval_seconds = interval_seconds
+        self.maxsize = maxsize
+
+        # ключ -> (время последней записи в лог, сколько подавлено с тех пор)
+        self._items: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.emitted = 0
+        self.suppressed = 0
+
+    def hit(self, key: Hashable) -> Optional[int]:
+        """
+        Возвращает число подавленных с прошлой записи сообщений, если сейчас
+        можно писать в лог, иначе None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] < self.interval_seconds:
+                item[1] += 1
+                self.suppressed += 1
+                return None
+
+            skipped = item[1] if item is not None else 0
+            self._items[key] = [now, 0]
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            self.emitted += 1
+            return skipped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sources": len(self._items),
+            "interval_seconds": self.interval_seconds,
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+        }
@@ -1,157 +1,312 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
-from typing import Callable, Awaitable
 
-from fastapi import Request
-from fastapi.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core import deadlines
+from app.core.admission import admission_controller, overloaded, priority
+from app.core.auth import RequestAuth
 from app.core.config import settings
-from app.core.exceptions import AppException
-from app.core.telegram_auth import (
-    TelegramAuthError,
-    validate_telegram_init_data,
-)
-from app.db.session import SessionLocal
-from app.models.user import User
-from app.services.user_service import get_or_create_user_from_telegram
+from app.core.deadlines import deadline_exceeded, deadline_monitor
+from app.core.exceptions import ErrorCode
+from app.core.responses import error_response
+from app.core.session_tokens import extract_bearer_token
+from app.db.query_stats import endpoint_of, query_stats_monitor
+from app.db.request_session import RequestSession
+from app.db.unit_of_work import UnitOfWork
 
 logger = logging.getLogger("app.middleware")
 
 
 # --------- Логирование запросов --------- #
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware:
     """
     Простое логирование запросов/ответов:
     метод, путь, статус, время обработки.
+
+    Чистый ASGI-middleware (без BaseHTTPMiddleware): не создаёт отдельную
+    задачу на запрос и не перекладывает тело ответа через memory stream.
     """
 
     def __init__(self, app: ASGIApp) -> None:
-        super().__init__(app)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:  # type: ignore[override]
         start = time.perf_counter()
-        path = request.url.path
+        method = scope["method"]
+        path = scope["path"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception:
-            logger.exception("Unhandled error for %s %s", request.method, path)
+            logger.exception("Unhandled error for %s %s", method, path)
             raise
 
         duration_ms = (time.perf_counter() - start) * 1000
         logger.info(
             "%s %s -> %s (%.2f ms)",
-            request.method,
+            method,
             path,
-            response.status_code,
+            status_code,
             duration_ms,
         )
-        return response
 
 
-# --------- Telegram WebApp авторизация --------- #
-class TelegramAuthMiddleware(BaseHTTPMiddleware):
+# --------- Счётчик запросов к БД --------- #
+class QueryStatsMiddleware:
     """
-    Middleware, который:
-    - читает заголовок X-Telegram-Init-Data
-    - валидирует подпись Telegram
-    - создаёт/обновляет пользователя в БД
-    - кладёт User в request.state.user
+    Считает SQL-запросы и время БД в рамках HTTP-запроса (app/db/query_stats.py).
+
+    Перед отправкой ответа проверяет бюджет эндпоинта и повторы statement'ов
+    (N+1) и, если включено DB_QUERY_HEADERS, добавляет заголовки:
+        X-DB-Queries: 4
+        Server-Timing: db;dur=3.21;desc="4 queries"
     """
 
     def __init__(self, app: ASGIApp) -> None:
-        super().__init__(app)
+        self.app = app
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:  # type: ignore[override]
-        # По умолчанию пользователя нет
-        request.state.user = None
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        path = request.url.path
+        stats, token = query_stats_monitor.begin(scope)
 
-        # Разрешаем технические эндпоинты без авторизации
-        if path in ("/health", "/api/v1/ping"):
-            return await call_next(request)
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                extra = query_stats_monitor.check(stats, endpoint_of(scope))
+                if settings.db_query_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Queries", str(stats.count))
+                    headers.append("Server-Timing", stats.server_timing())
+                    for name, value in extra.items():
+                        headers.append(name, value)
+            await send(message)
 
-        init_data = request.headers.get("X-Telegram-Init-Data")
-        if not init_data:
-            # Нет Telegram-данных — запрос не авторизован,
-            # но сам эндпоинт решает, критично это или нет.
-            return await call_next(request)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats_monitor.end(token)
+
+
+# --------- Дедлайн запроса --------- #
+class DeadlineMiddleware:
+    """
+    Бюджет времени на запрос по классу маршрута (app/core/deadlines.py).
 
-        bot_token = settings.telegram_bot_token
-        if not bot_token:
-            logger.error("TELEGRAM_BOT_TOKEN не задан, Telegram-авторизация невозможна")
-            return await call_next(request)
+    Выставляет дедлайн (по нему сессии делают SET LOCAL statement_timeout)
+    и отменяет обработку, если ответ не начался за бюджет + DEADLINE_GRACE_MS:
+    ожидание соединения из пула и ожидающие запросы прерываются, соединения
+    возвращаются в пул, клиент получает 503 DEADLINE_EXCEEDED.
+    Начавшийся ответ не обрываем.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        deadlines.install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        klass, budget, token = deadline_monitor.begin(scope["method"], scope["path"])
+        if klass is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = False
+        timeout = asyncio.timeout(budget + settings.deadline_grace_ms / 1000)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                timeout.reschedule(None)
+            await send(message)
 
-        # Валидируем initData
         try:
-            tg_init = validate_telegram_init_data(
-                init_data=init_data,
-                bot_token=bot_token,
-                max_age_seconds=24 * 60 * 60,
-            )
-        except TelegramAuthError as exc:
+            async with timeout:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            deadline_monitor.record_cancelled(klass)
             logger.warning(
-                "Telegram auth error on %s: %s",
-                path,
-                exc.message,
+                "Deadline exceeded for %s %s (%s, %d ms)",
+                scope["method"],
+                scope["path"],
+                klass,
+                budget * 1000,
             )
-            # Пользователь не считается авторизованным
-            return await call_next(request)
-        except Exception:
-            logger.exception("Unexpected error while validating Telegram initData")
-            return await call_next(request)
+            if not started:
+                exc = deadline_exceeded(klass)
+                response = error_response(
+                    error_code=exc.error_code,
+                    message=exc.message,
+                    status_code=exc.status_code,
+                    details=exc.details,
+                    headers=exc.headers,
+                )
+                await response(scope, receive, send)
+        finally:
+            deadline_monitor.end(token)
+
+
+# --------- Сессия и единица работы (один COMMIT на запрос) --------- #
+class UnitOfWorkMiddleware:
+    """
+    Кладёт в request.state.db ленивую сессию запроса (app/db/request_session.py),
+    общую для авторизации и всех зависимостей, и открывает на запрос
+    UnitOfWork (app/db/unit_of_work.py, request.state.uow), к которому эта
+    сессия присоединяется.
+
+    Фиксирует изменения перед отправкой ответа, а не после: клиент получает
+    2xx только для уже закоммиченной записи и следующим запросом её увидит.
+    Ответ со статусом >= 400 — ROLLBACK всего, что сервисы успели сделать.
+    Если COMMIT не прошёл, вместо подготовленного ответа уходит 500.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        if not tg_init.user or "id" not in tg_init.user:
-            logger.warning("Telegram initData does not contain 'user.id'")
-            return await call_next(request)
+        state = scope.setdefault("state", {})
+        if not settings.db_deferred_commit:
+            state["db"] = db = RequestSession()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                await db.close()
+            return
 
-        tg_user = tg_init.user
+        uow = UnitOfWork()
+        state["uow"] = uow
+        state["db"] = db = RequestSession(uow)
+        failed = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal failed
+            if failed:
+                return
+            if message["type"] == "http.response.start":
+                if message["status"] >= 400:
+                    await uow.rollback()
+                else:
+                    try:
+                        await uow.commit()
+                    except Exception:
+                        logger.exception("Commit failed for %s %s", scope["method"], scope["path"])
+                        failed = True
+                        response = error_response(
+                            error_code=ErrorCode.INTERNAL_SERVER_ERROR.value,
+                            message="Не удалось сохранить изменения",
+                            status_code=500,
+                        )
+                        await response(scope, receive, send)
+                        return
+            await send(message)
 
-        # Создаём / обновляем пользователя в БД
         try:
-            with SessionLocal() as db:
-                user = get_or_create_user_from_telegram(
-                    db=db,
-                    telegram_id=tg_user["id"],
-                    username=tg_user.get("username"),
-                    first_name=tg_user.get("first_name"),
-                    last_name=tg_user.get("last_name"),
-                    phone=None,  # на будущее, если решим брать телефон
-                )
-                request.state.user = user
-        except Exception:
-            logger.exception("Error while getting/creating user from Telegram initData")
-            request.state.user = None
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # ответ так и не начался (необработанное исключение) — откатываем
+            await uow.rollback()
+            await db.close()
+
+
+# --------- Admission control --------- #
+class AdmissionControlMiddleware:
+    """
+    Пускает запрос в обработку по приоритету и нагрузке
+    (app/core/admission.py). Отказ — 503 OVERLOADED с Retry-After
+    до авторизации и обращения к БД: отброшенный запрос ничего не стоит.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.admission_control:
+            await self.app(scope, receive, send)
+            return
 
+        prio = priority(scope["method"], scope["path"])
+        reason = await admission_controller.acquire(prio)
+        if reason is not None:
+            exc = overloaded(prio, reason)
+            response = error_response(
+                error_code=exc.error_code,
+                message=exc.message,
+                status_code=exc.status_code,
+                details=exc.details,
+                headers=exc.headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release()
 
-# --------- Зависимость для эндпоинтов --------- #
-async def get_current_user(request: Request) -> User:
+
+# --------- Telegram WebApp авторизация --------- #
+class TelegramAuthMiddleware:
     """
-    FastAPI-зависимость. Используется как Depends(get_current_user).
+    Middleware, который:
+    - читает заголовки X-Telegram-Init-Data и Authorization: Bearer
+    - кладёт в request.state.auth ленивый RequestAuth
+    - по первому обращению RequestAuth валидирует подпись Telegram,
+      создаёт/обновляет пользователя в БД и кладёт User в request.state.user
 
-    Если пользователь не авторизован через Telegram, бросаем AppException
-    с кодом UNAUTHORIZED.
+    Реализован как чистый ASGI-middleware: request.state — это scope["state"],
+    поэтому пишем пользователя прямо туда.
     """
-    user = getattr(request.state, "user", None)
-    if user is None:
-        raise AppException(
-            error_code="UNAUTHORIZED",
-            message="Пользователь не авторизован через Telegram",
-            status_code=401,
-        )
-    return user
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        # По умолчанию пользователя нет
+        state["user"] = None
+
+        path = scope["path"]
+
+        # Разрешаем технические эндпоинты без авторизации.
+        # Для остальных только готовим ленивый RequestAuth: подпись и БД
+        # трогаем, когда эндпоинт реально зависит от get_current_user.
+        if path not in ("/health", "/api/v1/ping"):
+            headers = Headers(scope=scope)
+            state["auth"] = RequestAuth(
+                init_data=headers.get("X-Telegram-Init-Data"),
+                session_token=extract_bearer_token(headers.get("Authorization")),
+                path=path,
+                state=state,
+                source=scope["client"][0] if scope.get("client") else None,
+            )
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,60 @@
+# app/core/pagination.py
+"""
+Непрозрачные курсоры для keyset-пагинации.
+
+Курсор — base64url от JSON-списка значений ключа сортировки последней
+отданной строки (например, [start_at, id]). Следующая страница читается
+условием (start_at, id) > (:start_at, :id) по индексу: без OFFSET, который
+заставляет Postgres пролистать все предыдущие строки, и без COUNT(*).
+Клиент курсор не разбирает, а просто передаёт обратно.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from app.core.exceptions import AppException, ErrorCode
+
+# Курсор длиннее этого — заведомо не наш
+_MAX_CURSOR_LENGTH = 512
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Значения ключа из курсора; size — сколько их должно быть.
+    Битый курсор — 422 VALIDATION_ERROR, как и прочие некорректные параметры.
+    """
+    try:
+        if len(cursor) > _MAX_CURSOR_LENGTH:
+            raise ValueError("cursor too long")
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("unexpected cursor shape")
+    except (ValueError, binascii.Error):
+        raise invalid_cursor() from None
+    return values
+
+
+def invalid_cursor() -> AppException:
+    return AppException(
+        error_code=ErrorCode.VALIDATION_ERROR,
+        message="Некорректный курсор пагинации",
+        status_code=422,
+        details={"field": "cursor"},
+    )
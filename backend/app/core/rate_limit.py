@@ -0,0 +1,282 @@
+# app/core/rate_limit.py
+"""
+Ограничение частоты запросов (token bucket) по проверенному telegram_id.
+
+На открытии записи один и тот же пользователь долбит POST /enrollments и
+/cancel, а каждая попытка — несколько запросов в БД. Зависимость
+rate_limited(<имя>) (app/core/deps.py) отсекает лишние вызовы до работы
+обработчика и до создания/обновления пользователя (telegram_id берётся из
+проверенных initData / токена) и отвечает 429 с заголовком Retry-After.
+
+Лимиты задаются по именам маршрутов: RATE_LIMITS="enrollments.create=5/10,..."
+(«ёмкость/секунды»: столько запросов подряд, полностью восстанавливается
+за указанное время). "off" отключает лимит для маршрута.
+
+Хранилище вёдер:
+- memory (по умолчанию) — словарь процесса, без I/O;
+- postgres — общая UNLOGGED-таблица rate_limit_buckets, одно атомарное
+  INSERT ... ON CONFLICT на попытку. Нужна, когда воркеров несколько.
+  Идёт общей сессией запроса (второе соединение из пула не берётся) и
+  фиксируется сразу: списанный токен не возвращается, даже если запрос
+  потом закончится ошибкой. При ошибке БД пропускаем запрос (fail open)
+  и считаем ошибку.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.rate_limit")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+    capacity запросов подряд, ведро наполняется за period_seconds.
+    """
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+    def __str__(self) -> str:
+        return f"{self.capacity}/{self.period_seconds:g}s"
+
+
+# Лимиты по умолчанию; RATE_LIMITS переопределяет и дополняет их
+DEFAULT_LIMITS: Dict[str, Optional[RateLimit]] = {
+    "enrollments.create": RateLimit(capacity=5, period_seconds=10),
+    "enrollments.cancel": RateLimit(capacity=5, period_seconds=10),
+}
+
+
+def parse_limits(raw: str) -> Dict[str, Optional[RateLimit]]:
+    """
+    "name=5/10,other=off" -> {"name": RateLimit(5, 10), "other": None}
+    """
+    limits: Dict[str, Optional[RateLimit]] = {}
+    for chunk in raw.split(","):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+
+        name, sep, value = chunk.partition("=")
+        name, value = name.strip(), value.strip()
+        if not sep or not name:
+            raise ValueError(f"Некорректный лимит в RATE_LIMITS: {chunk!r}")
+
+        if value.lower() == "off":
+            limits[name] = None
+            continue
+
+        capacity, sep, period = value.partition("/")
+        try:
+            limit = RateLimit(capacity=int(capacity), period_seconds=float(period))
+        except ValueError:
+            raise ValueError(f"Некорректный лимит в RATE_LIMITS: {chunk!r}") from None
+        if not sep or limit.capacity <= 0 or limit.period_seconds <= 0:
+            raise ValueError(f"Некорректный лимит в RATE_LIMITS: {chunk!r}")
+        limits[name] = limit
+    return limits
+
+
+# --------- Хранилища вёдер --------- #
+class MemoryBuckets:
+    """
+    (маршрут, telegram_id) -> [токены, время обновления]. LRU по числу ключей.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Tuple[str, int], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def acquire(
+        self, route: str, telegram_id: int, limit: RateLimit, db: Optional[AsyncSession] = None
+    ) -> float:
+        """
+        Возвращает 0, если запрос разрешён, иначе через сколько секунд повторить.
+        """
+        key = (route, telegram_id)
+        now = time.monotonic()
+        rate = limit.refill_per_second
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                item = [float(limit.capacity), now]
+                self._items[key] = item
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(key)
+                item[0] = min(float(limit.capacity), item[0] + (now - item[1]) * rate)
+                item[1] = now
+
+            if item[0] >= 1.0:
+                item[0] -= 1.0
+                return 0.0
+            return (1.0 - item[0]) / rate
+
+    def size(self) -> int:
+        return len(self._items)
+
+
+_PG_ACQUIRE = text(
+    """
+    INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+    VALUES (:key, :capacity - 1, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = LEAST(
+            :capacity,
+            b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate
+        ) - 1,
+        updated_at = clock_timestamp()
+    WHERE LEAST(
+        :capacity,
+        b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate
+    ) >= 1
+    RETURNING b.tokens
+    """
+)
+
+_PG_PEEK = text(
+    """
+    SELECT LEAST(
+        :capacity,
+        tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated_at) * :rate
+    )
+    FROM rate_limit_buckets
+    WHERE key = :key
+    """
+)
+
+
+class PostgresBuckets:
+    """
+    Общие для всех воркеров вёдра в таблице rate_limit_buckets.
+
+    Разрешённая попытка — один INSERT ... ON CONFLICT DO UPDATE ... WHERE
+    (пополнение и списание атомарно, под блокировкой строки).
+    Отказ — плюс один SELECT, чтобы посчитать Retry-After.
+
+    db — общая сессия запроса; проверка идёт до обработчика, поэтому в её
+    транзакции ещё нет чужих изменений и COMMIT здесь фиксирует только
+    списание (а блокировка строки ведра не держится весь запрос).
+    """
+
+    name = "postgres"
+
+    async def acquire(
+        self, route: str, telegram_id: int, limit: RateLimit, db: Optional[AsyncSession] = None
+    ) -> float:
+        if db is None:
+            raise RuntimeError("Postgres rate limit backend needs the request session")
+        params = {
+            "key": f"{route}:{telegram_id}",
+            "capacity": float(limit.capacity),
+            "rate": limit.refill_per_second,
+        }
+        try:
+            row = (await db.execute(_PG_ACQUIRE, params)).first()
+            if row is not None:
+                await db.commit()
+                return 0.0
+            tokens = (await db.execute(_PG_PEEK, params)).scalar()
+        finally:
+            # при отказе и при ошибке обработчику достаётся чистая сессия
+            if db.in_transaction():
+                await db.rollback()
+
+        if tokens is None:
+            # Строку удалили между запросами — не мешаем пользователю
+            return 0.0
+        return max((1.0 - float(tokens)) / limit.refill_per_second, 0.0)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+# --------- Лимитер --------- #
+class RateLimiter:
+    def __init__(
+        self,
+        *,
+        limits: Dict[str, Optional[RateLimit]],
+        backend: Any,
+    ) -> None:
+        self.limits = limits
+        self.backend = backend
+
+        self.allowed: "Counter[str]" = Counter()
+        self.rejected: "Counter[str]" = Counter()
+        self.backend_errors = 0
+
+    def limit_for(self, route: str) -> Optional[RateLimit]:
+        return self.limits.get(route)
+
+    async def check(self, route: str, telegram_id: int, db: Optional[AsyncSession] = None) -> float:
+        """
+        0 — запрос разрешён, иначе число секунд до следующей попытки.
+        db — сессия запроса (нужна хранилищу postgres).
+        """
+        limit = self.limit_for(route)
+        if limit is None:
+            return 0.0
+
+        try:
+            retry_after = await self.backend.acquire(route, telegram_id, limit, db)
+        except Exception:
+            self.backend_errors += 1
+            logger.exception("Rate limit backend %s failed, request allowed", self.backend.name)
+            retry_after = 0.0
+
+        if retry_after > 0:
+            self.rejected[route] += 1
+        else:
+            self.allowed[route] += 1
+        return retry_after
+
+    @staticmethod
+    def retry_after_header(retry_after: float) -> str:
+        return str(max(1, math.ceil(retry_after)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "limits": {name: str(limit) if limit else "off" for name, limit in self.limits.items()},
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+            "backend_errors": self.backend_errors,
+            "buckets": self.backend.size(),
+        }
+
+
+def _make_backend(name: str) -> Any:
+    if name == "postgres":
+        return PostgresBuckets()
+    if name != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND=%r, using in-process buckets", name)
+    return MemoryBuckets()
+
+
+# Глобальный лимитер процесса
+rate_limiter = RateLimiter(
+    limits={**DEFAULT_LIMITS, **parse_limits(settings.rate_limits)},
+    backend=_make_backend(settings.rate_limit_backend),
+)
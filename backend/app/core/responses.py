@@ -36,6 +36,7 @@ def error_response(
     message: str,
     status_code: int,
     details: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
 ) -> JSONResponse:
     """
     Обёртка для ошибок:
@@ -63,4 +64,5 @@ def error_response(
     return JSONResponse(
         status_code=status_code,
         content=jsonable_encoder(payload),
+        headers=headers,
     )
@@ -0,0 +1,253 @@
+# app/core/schedule_cache.py
+"""
+Кэш готовых страниц расписания в памяти воркера.
+
+Расписание читают чаще всего остального, а меняется оно только через
+create/update/cancel/delete_training. Поэтому страница списка тренировок
+(GET /trainings и /trainings/admin) кэшируется целиком — уже
+сериализованным JSON-телом ответа, ключ — фильтры и параметры пагинации.
+Попадание не трогает ни БД (даже сессию не открывает), ни pydantic.
+
+Актуальность держится на версии расписания — последовательности
+schedule_version_seq в Postgres:
+- сервис, меняющий тренировку, в той же транзакции берёт nextval и делает
+  pg_notify('schedule_changed', <версия>) — уведомление уходит только
+  после COMMIT, откат его отменяет;
+- после COMMIT свой воркер сразу переходит на новую версию, остальные —
+  получив уведомление по LISTEN (фоновая задача, отдельное соединение
+  вне пула);
+- каждая новая версия сбрасывает кэш воркера (даже если пришла не по
+  порядку: транзакции фиксируются не в порядке nextval), а страница,
+  чтение которой началось до сброса, в кэш уже не попадёт.
+
+Если соединение LISTEN рвётся, воркер переподключается и догоняет версию
+по last_value последовательности (её же сверяет раз в
+SCHEDULE_CACHE_RESYNC_SECONDS); TTL записей — последняя страховка.
+С репликой страницу не кладём в кэш REPLICA_STICKY_SECONDS после смены
+версии: реплика могла ещё не получить изменение.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logger import LogRateLimiter
+from app.db.counts import total_counter
+from app.db.read_routing import read_router
+from app.db.session import SQLALCHEMY_DATABASE_URL
+
+logger = logging.getLogger("app.schedule_cache")
+
+CHANNEL = "schedule_changed"
+
+# Новая версия и уведомление о ней — одним запросом в транзакции изменения
+_BUMP_SQL = text(
+    f"SELECT v, pg_notify('{CHANNEL}', v::text) FROM nextval('schedule_version_seq') AS v"
+)
+_CURRENT_SQL = "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM schedule_version_seq"
+
+# Пауза перед повторным подключением LISTEN после ошибки
+_RECONNECT_S = 5.0
+# Сколько последних применённых версий помнить: своё же уведомление,
+# вернувшееся по LISTEN, кэш второй раз не сбрасывает
+_SEEN_VERSIONS = 256
+
+
+class ScheduleCache:
+    """
+    LRU страниц расписания с TTL; сбрасывается при каждой новой версии.
+    """
+
+    def __init__(self, *, ttl_seconds: float, maxsize: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+
+        # старшая известная версия расписания
+        self.version = 0
+        # поколение кэша воркера: растёт при каждом сбросе
+        self._generation = 0
+        self._seen: "deque[int]" = deque(maxlen=_SEEN_VERSIONS)
+        # ключ -> (поколение, monotonic-время заполнения, тело ответа)
+        self._items: "OrderedDict[Hashable, Tuple[int, float, bytes]]" = OrderedDict()
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._log_limiter = LogRateLimiter(interval_seconds=60.0, maxsize=10)
+
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        # не положили: кэш сброшен во время чтения / реплика могла отставать
+        self.skipped: "Counter[str]" = Counter()
+        # причины сбросов: local / notify / resync / reconnect
+        self.invalidations: "Counter[str]" = Counter()
+        self.listen_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.schedule_cache and self.ttl_seconds > 0 and self.maxsize > 0
+
+    # ---- страницы ----
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != self._generation or now - item[1] >= self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def token(self) -> int:
+        """
+        Берётся до чтения страницы из БД и передаётся в put().
+        """
+        return self._generation
+
+    def put(self, key: Hashable, token: int, body: bytes) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if token != self._generation:
+                self.skipped["invalidated"] += 1
+                return
+            if read_router.enabled and now - self._changed_at < settings.replica_sticky_seconds:
+                self.skipped["replica_lag"] += 1
+                return
+            self._items[key] = (token, now, body)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            self.fills += 1
+
+    # ---- версия ----
+
+    async def bump(self, db: AsyncSession) -> int:
+        """
+        Новая версия расписания в транзакции db (NOTIFY уйдёт с её COMMIT).
+        После COMMIT вызывающий переводит на неё свой воркер: advance(version).
+        """
+        return int(await db.scalar(_BUMP_SQL))
+
+    def advance(self, version: int, source: str = "local") -> None:
+        """
+        Применяет версию: source — local (COMMIT этого воркера), notify
+        (уведомление), resync (last_value больше известной версии) или
+        reconnect (после обрыва LISTEN сбрасываем в любом случае).
+        """
+        with self._lock:
+            if source in ("local", "notify"):
+                if version in self._seen:
+                    return
+                self._seen.append(version)
+            elif source == "resync" and version <= self.version:
+                return
+            self.version = max(self.version, version)
+            self._generation += 1
+            self._changed_at = time.monotonic()
+            self._items.clear()
+            self.invalidations[source] += 1
+        # total расписания из кэша COUNT'ов этого воркера тоже устарел
+        if source != "local":
+            total_counter.invalidate("trainings")
+
+    # ---- LISTEN ----
+
+    def start(self) -> None:
+        if self._task is not None or not self.enabled:
+            return
+        if settings.db_pgbouncer and not settings.schedule_cache_listen_url:
+            logger.warning(
+                "Schedule cache: LISTEN does not work through PgBouncer, set SCHEDULE_CACHE_LISTEN_URL; "
+                "other workers' changes are picked up only by TTL (%ss)",
+                self.ttl_seconds,
+            )
+            return
+        self._task = asyncio.create_task(self._listen(), name="schedule-cache-listen")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _conninfo(self) -> str:
+        url = make_url(settings.schedule_cache_listen_url or SQLALCHEMY_DATABASE_URL)
+        # libpq не знает суффиксов драйверов SQLAlchemy (+psycopg, +psycopg_async)
+        return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._conninfo(), autocommit=True) as conn:
+                    # сначала LISTEN, потом сверка: уведомление между ними не потеряется
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    await self._resync(conn, "reconnect")
+                    self.listening = True
+                    while True:
+                        async for notify in conn.notifies(timeout=settings.schedule_cache_resync_seconds):
+                            self.advance(int(notify.payload), "notify")
+                        # заодно проверка, что соединение живо
+                        await self._resync(conn, "resync")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.listen_errors += 1
+                suppressed = self._log_limiter.hit("listen")
+                if suppressed is not None:
+                    logger.warning(
+                        "Schedule cache LISTEN failed, reconnecting in %ss: %s%s",
+                        _RECONNECT_S,
+                        exc,
+                        f" (+{suppressed} similar suppressed)" if suppressed else "",
+                    )
+            finally:
+                self.listening = False
+            await asyncio.sleep(_RECONNECT_S)
+
+    async def _resync(self, conn: psycopg.AsyncConnection, source: str) -> None:
+        cur = await conn.execute(_CURRENT_SQL)
+        row = await cur.fetchone()
+        self.advance(int(row[0]), source)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self.version,
+                "listening": self.listening,
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "fills": self.fills,
+                "skipped": dict(self.skipped),
+                "invalidations": dict(self.invalidations),
+                "listen_errors": self.listen_errors,
+            }
+
+
+schedule_cache = ScheduleCache(
+    ttl_seconds=settings.schedule_cache_ttl_seconds,
+    maxsize=settings.schedule_cache_maxsize,
+)
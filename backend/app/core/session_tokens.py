@@ -0,0 +1,200 @@
+# app/core/session_tokens.py
+"""
+Короткоживущие подписанные сессионные токены.
+
+Мини-апп один раз обменивает X-Telegram-Init-Data на токен
+(POST /api/v1/auth/session) и дальше шлёт его в заголовке
+Authorization: Bearer <token>. Проверка токена — один HMAC и
+compare_digest, без разбора initData и без БД.
+
+Формат: v1.<base64url(payload)>.<base64url(hmac_sha256(payload))>,
+payload = "user_id:telegram_id:is_admin:iat:exp".
+
+Отзыв: в процессе держим небольшой словарь user_id -> секунда отзыва.
+Все токены пользователя, выпущенные в эту секунду или раньше, считаются
+недействительными (iat в токене — целые секунды, и выпущенный до отзыва в
+ту же секунду токен иначе не отличить). Токен, выпускаемый после отзыва,
+получает iat на секунду позже отзыва, чтобы повторный вход сразу после
+снятия админки не получал 401. Запись живёт не дольше TTL токена, поэтому
+словарь не растёт. Отзыв локален для воркера — межпроцессную «дыру» закрывает
+короткий TTL.
+"""
+
+from __future__ import annotations
+
+import base64
+import hmac
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import sha256
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+TOKEN_VERSION = "v1"
+
+
+class SessionTokenError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SessionTokenClaims:
+    user_id: int
+    telegram_id: int
+    is_admin: bool
+    issued_at: int
+    expires_at: int
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+@lru_cache(maxsize=8)
+def _signing_key(secret: str, bot_token: str) -> bytes:
+    """
+    Ключ подписи: явный SESSION_TOKEN_SECRET или производный от токена бота.
+    """
+    if secret:
+        return secret.encode("utf-8")
+    if not bot_token:
+        raise SessionTokenError("Не задан ни SESSION_TOKEN_SECRET, ни TELEGRAM_BOT_TOKEN")
+    return hmac.new(b"SessionToken", bot_token.encode("utf-8"), sha256).digest()
+
+
+def _get_key() -> bytes:
+    return _signing_key(settings.session_token_secret, settings.telegram_bot_token)
+
+
+def _sign(payload_b64: str) -> str:
+    return _b64encode(hmac.new(_get_key(), payload_b64.encode("ascii"), sha256).digest())
+
+
+# --------- Отзыв --------- #
+class RevocationSet:
+    """
+    user_id -> unix-время отзыва (целые секунды, как iat токена).
+    Старые записи вычищаем по TTL токенов.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._revoked: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id: int) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._revoked[int(user_id)] = now
+            self._purge(now)
+
+    def revoked_at(self, user_id: int) -> Optional[int]:
+        return self._revoked.get(user_id)
+
+    def is_revoked(self, user_id: int, issued_at: int) -> bool:
+        revoked_at = self._revoked.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def _purge(self, now: int) -> None:
+        border = now - self.ttl_seconds
+        stale = [uid for uid, ts in self._revoked.items() if ts < border]
+        for uid in stale:
+            del self._revoked[uid]
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revoked_sessions = RevocationSet(ttl_seconds=settings.session_token_ttl_seconds)
+
+
+def revoke_user_tokens(user_id: int) -> None:
+    """
+    Отзываем все выпущенные ранее токены пользователя (бан, снятие админки).
+    """
+    revoked_sessions.revoke(user_id)
+
+
+# --------- Выпуск / проверка --------- #
+def issue_session_token(
+    *,
+    user_id: int,
+    telegram_id: int,
+    is_admin: bool,
+    ttl_seconds: Optional[int] = None,
+) -> tuple[str, SessionTokenClaims]:
+    issued_at = int(time.time())
+    # Выпуск после отзыва в ту же секунду: токен не должен попасть под отзыв
+    revoked_at = revoked_sessions.revoked_at(int(user_id))
+    if revoked_at is not None and issued_at <= revoked_at:
+        issued_at = revoked_at + 1
+
+    ttl = settings.session_token_ttl_seconds if ttl_seconds is None else ttl_seconds
+    claims = SessionTokenClaims(
+        user_id=int(user_id),
+        telegram_id=int(telegram_id),
+        is_admin=bool(is_admin),
+        issued_at=issued_at,
+        expires_at=issued_at + ttl,
+    )
+
+    payload = (
+        f"{claims.user_id}:{claims.telegram_id}:{int(claims.is_admin)}:"
+        f"{claims.issued_at}:{claims.expires_at}"
+    )
+    payload_b64 = _b64encode(payload.encode("ascii"))
+    return f"{TOKEN_VERSION}.{payload_b64}.{_sign(payload_b64)}", claims
+
+
+def verify_session_token(token: str) -> SessionTokenClaims:
+    """
+    Проверка подписи (compare_digest), срока действия и отзыва.
+    """
+    try:
+        version, payload_b64, signature = token.split(".")
+    except ValueError:
+        raise SessionTokenError("Некорректный формат токена") from None
+
+    if version != TOKEN_VERSION:
+        raise SessionTokenError("Неизвестная версия токена")
+
+    if not hmac.compare_digest(_sign(payload_b64), signature):
+        raise SessionTokenError("Подпись токена недействительна")
+
+    try:
+        user_id, telegram_id, is_admin, issued_at, expires_at = (
+            _b64decode(payload_b64).decode("ascii").split(":")
+        )
+        claims = SessionTokenClaims(
+            user_id=int(user_id),
+            telegram_id=int(telegram_id),
+            is_admin=is_admin == "1",
+            issued_at=int(issued_at),
+            expires_at=int(expires_at),
+        )
+    except (ValueError, UnicodeDecodeError):
+        raise SessionTokenError("Некорректное содержимое токена") from None
+
+    if claims.expires_at <= time.time():
+        raise SessionTokenError("Срок действия токена истёк")
+
+    if revoked_sessions.is_revoked(claims.user_id, claims.issued_at):
+        raise SessionTokenError("Токен отозван")
+
+    return claims
+
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, value = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not value:
+        return None
+    return value.strip()
@@ -5,8 +5,9 @@ import json
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from hashlib import sha256
-from hmac import new as hmac_new
+from hmac import compare_digest, new as hmac_new
 from typing import Any, Dict, Optional
 from urllib.parse import unquote
 
@@ -46,6 +47,19 @@ def _build_data_check_string(data: Dict[str, str]) -> str:
     return "\n".join(f"{key}={data[key]}" for key in sorted(data.keys()))
 
 
+@lru_cache(maxsize=8)
+def _get_secret_key(bot_token: str) -> bytes:
+    """
+    Секретный ключ HMAC = HMAC_SHA256("WebAppData", bot_token).
+    Зависит только от токена бота, поэтому считаем его один раз.
+    """
+    return hmac_new(
+        "WebAppData".encode("utf-8"),
+        bot_token.encode("utf-8"),
+        sha256,
+    ).digest()
+
+
 def _compute_hash(data: Dict[str, str], bot_token: str) -> str:
     """
     Вычисляем hash так же, как описано в документации Telegram Web Apps.
@@ -57,21 +71,75 @@ def _compute_hash(data: Dict[str, str], bot_token: str) -> str:
 
     data_check_string = _build_data_check_string(data)
 
-    # секретный ключ HMAC
-    secret_key = hmac_new(
-        "WebAppData".encode("utf-8"),
-        bot_token.encode("utf-8"),
-        sha256,
-    ).digest()
-
     # финальный hash
     return hmac_new(
-        secret_key,
+        _get_secret_key(bot_token),
         data_check_string.encode("utf-8"),
         sha256,
     ).hexdigest()
 
 
+def extract_init_data_param(init_data: str, key: str) -> str:
+    """
+    Быстро достаём сырое (не декодированное) значение параметра
+    без полного разбора строки. Если параметра нет — пустая строка.
+    """
+    prefix = f"{key}="
+    if init_data.startswith(prefix):
+        start = len(prefix)
+    else:
+        pos = init_data.find(f"&{prefix}")
+        if pos < 0:
+            return ""
+        start = pos + len(prefix) + 1
+
+    end = init_data.find("&", start)
+    return init_data[start:] if end < 0 else init_data[start:end]
+
+
+# Границы длины initData. Настоящая строка от Telegram — несколько сотен
+# символов; всё, что заметно длиннее, не стоит даже разбирать.
+INIT_DATA_MIN_LENGTH = 80
+INIT_DATA_MAX_LENGTH = 4096
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def precheck_init_data(
+    init_data: str,
+    *,
+    max_age_seconds: int = 24 * 60 * 60,
+    max_length: int = INIT_DATA_MAX_LENGTH,
+) -> None:
+    """
+    Дешёвые структурные проверки initData до разбора и HMAC.
+
+    Отсекает мусор и заведомо просроченные строки: длина, наличие
+    hash / auth_date / user, формат hash (64 hex-символа) и свежесть auth_date.
+    Ничего не возвращает, при проблеме бросает TelegramAuthError.
+    """
+
+    length = len(init_data)
+    if length < INIT_DATA_MIN_LENGTH or length > max_length:
+        raise TelegramAuthError("Некорректная длина initData")
+
+    hash_value = extract_init_data_param(init_data, "hash")
+    if len(hash_value) != 64 or not _HEX_DIGITS.issuperset(hash_value):
+        raise TelegramAuthError("В initData отсутствует или повреждён параметр hash")
+
+    if not extract_init_data_param(init_data, "user"):
+        raise TelegramAuthError("В initData отсутствует параметр user")
+
+    auth_date = extract_init_data_param(init_data, "auth_date")
+    if not auth_date.isdigit():
+        raise TelegramAuthError("В initData отсутствует или повреждён параметр auth_date")
+
+    if max_age_seconds > 0:
+        now_ts = int(datetime.now(tz=timezone.utc).timestamp())
+        if now_ts - int(auth_date) > max_age_seconds:
+            raise TelegramAuthError("Сессия Telegram истекла")
+
+
 def validate_telegram_init_data(
     init_data: str,
     bot_token: str,
@@ -116,7 +184,7 @@ def validate_telegram_init_data(
 
     # Проверяем подпись
     expected_hash = _compute_hash(data_dict, bot_token)
-    if expected_hash != hash_value:
+    if not compare_digest(expected_hash, hash_value):
         raise TelegramAuthError("Подпись Telegram недействительна")
 
     # Проверяем "возраст" auth_date
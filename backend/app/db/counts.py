@@ -0,0 +1,217 @@
+# app/db/counts.py
+"""
+total для постраничных списков без COUNT(*) на каждый запрос.
+
+Списки (расписание, таблица лидеров, уведомления, аудит, настройки, долги,
+баны) отдают total рядом со страницей, и точный COUNT(*) по отфильтрованной
+выборке часто стоит дороже самой страницы. total_counter.total() считает
+его одним из трёх способов и сообщает, каким (total_mode в ответе):
+
+  exact     COUNT(*) прямо сейчас;
+  cached    COUNT(*), посчитанный не раньше COUNT_CACHE_TTL_SECONDS назад
+            для той же таблицы и того же набора фильтров (ключ — сигнатура
+            фильтров); промах — exact, результат кладётся в кэш;
+  estimate  оценка планировщика: pg_class.reltuples таблицы — только для
+            списков без фильтров; сама оценка тоже кэшируется на TTL.
+            Таблицы меньше COUNT_ESTIMATE_MIN_ROWS строк (и без статистики)
+            считаются как cached — точный COUNT(*) по ним дешёвый.
+
+Кэш сбрасывается по таблице после COMMIT любой сессии этого процесса,
+которая писала в неё (ORM-объекты и INSERT/UPDATE/DELETE через
+session.execute; запись сырым SQL отмечается через mark_written());
+изменения из других воркеров видны не позже чем через TTL.
+COUNT_FORCE_EXACT=true — всегда exact.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+
+COUNT_MODES = ("exact", "cached", "estimate")
+
+_ESTIMATE_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)")
+
+# ключ в Session.info: таблицы, в которые сессия писала в текущей транзакции
+_INFO_KEY = "count_tables"
+
+
+class TotalCounter:
+    """
+    LRU-кэш total с TTL по (таблица, сигнатура фильтров) и счётчики режимов.
+    """
+
+    def __init__(self, *, ttl_seconds: float, maxsize: int, estimate_min_rows: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.estimate_min_rows = estimate_min_rows
+        self.force_exact = settings.count_force_exact
+
+        # (таблица, ключ) -> (total, monotonic-время подсчёта)
+        self._items: "OrderedDict[Tuple[str, Hashable], Tuple[int, float]]" = OrderedDict()
+        # поколение таблицы: растёт при каждой инвалидации, чтобы COUNT,
+        # начатый до чужого COMMIT, не положил в кэш устаревшее значение
+        self._generations: Dict[str, int] = {}
+        # таблица -> (reltuples, monotonic-время запроса)
+        self._estimates: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+        self.modes: "Counter[str]" = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def total(
+        self,
+        db: AsyncSession,
+        count_stmt: Any,
+        *,
+        table: str,
+        mode: str = "cached",
+        key: Hashable = None,
+        params: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[int, str]:
+        """
+        -> (total, режим, которым он получен).
+
+        count_stmt — запрос COUNT(*) с теми же фильтрами, что у страницы;
+        key — сигнатура фильтров (для cached); table — таблица списка
+        (для estimate и сброса кэша).
+        """
+        if self.force_exact:
+            mode = "exact"
+
+        if mode == "estimate":
+            estimate = await self._estimate(db, table)
+            if estimate >= self.estimate_min_rows:
+                return self._done("estimate", estimate)
+            mode = "cached"
+
+        if mode == "cached":
+            cache_key = (table, key)
+            now = time.monotonic()
+            with self._lock:
+                item = self._items.get(cache_key)
+                if item is not None and now - item[1] < self.ttl_seconds:
+                    self._items.move_to_end(cache_key)
+                    self.hits += 1
+                    return self._done("cached", item[0])
+                self.misses += 1
+                generation = self._generations.get(table, 0)
+
+            value = int(await db.scalar(count_stmt, params) or 0)
+            with self._lock:
+                if self._generations.get(table, 0) == generation:
+                    self._items[cache_key] = (value, now)
+                    self._items.move_to_end(cache_key)
+                    while len(self._items) > self.maxsize:
+                        self._items.popitem(last=False)
+            return self._done("exact", value)
+
+        return self._done("exact", int(await db.scalar(count_stmt, params) or 0))
+
+    async def _estimate(self, db: AsyncSession, table: str) -> int:
+        now = time.monotonic()
+        item = self._estimates.get(table)
+        if item is not None and now - item[1] < self.ttl_seconds:
+            return item[0]
+        # -1 — таблицу ещё ни разу не анализировали
+        estimate = int(await db.scalar(_ESTIMATE_SQL, {"table": table}) or -1)
+        self._estimates[table] = (estimate, now)
+        return estimate
+
+    def _done(self, mode: str, value: int) -> Tuple[int, str]:
+        self.modes[mode] += 1
+        return value, mode
+
+    def invalidate(self, table: str) -> None:
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [cache_key for cache_key in self._items if cache_key[0] == table]
+            for cache_key in stale:
+                del self._items[cache_key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for table in {cache_key[0] for cache_key in self._items}:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._items.clear()
+            self._estimates.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "estimate_min_rows": self.estimate_min_rows,
+                "force_exact": self.force_exact,
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "modes": dict(self.modes),
+            }
+
+
+total_counter = TotalCounter(
+    ttl_seconds=settings.count_cache_ttl_seconds,
+    maxsize=settings.count_cache_maxsize,
+    estimate_min_rows=settings.count_estimate_min_rows,
+)
+
+
+# --------- Сброс кэша после записи --------- #
+def _written_tables(session: Session) -> set:
+    return session.info.setdefault(_INFO_KEY, set())
+
+
+def mark_written(db: AsyncSession, table: str) -> None:
+    """
+    Для записей через text(): по ним таблицу не определить автоматически.
+    """
+    _written_tables(db.sync_session).add(table)
+
+
+def _after_flush(session: Session, flush_context: Any) -> None:
+    tables = _written_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table is not None:
+            tables.add(table)
+
+
+def _do_orm_execute(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        name = getattr(table, "name", None)
+        if name is not None:
+            _written_tables(state.session).add(name)
+
+
+def _after_commit(session: Session) -> None:
+    for table in session.info.pop(_INFO_KEY, ()):
+        total_counter.invalidate(table)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+# Кэш и его сброс живут вместе: кто импортировал total_counter, у того
+# и инвалидация по COMMIT подключена
+for _name, _fn in (
+    ("after_flush", _after_flush),
+    ("do_orm_execute", _do_orm_execute),
+    ("after_commit", _after_commit),
+    ("after_rollback", _after_rollback),
+):
+    if not event.contains(Session, _name, _fn):
+        event.listen(Session, _name, _fn)
@@ -0,0 +1,253 @@
+# app/db/query_stats.py
+"""
+Счётчик SQL-запросов: сколько statement'ов выполнил запрос и сколько времени
+они заняли.
+
+Хуки SQLAlchemy (before/after_cursor_execute) вешаются на каждый движок из
+EngineRegistry. Статистика текущего HTTP-запроса лежит в ContextVar,
+его выставляет QueryStatsMiddleware (app/core/middleware.py). В ответ
+добавляются заголовки X-DB-Queries и Server-Timing.
+
+N+1: если один и тот же SQL (с точностью до параметров) повторился в рамках
+запроса DB_NPLUS1_THRESHOLD раз и больше, пишем предупреждение и считаем.
+
+Бюджеты: QUERY_BUDGETS задаёт максимум запросов для эндпоинта
+("METHOD /шаблон/пути"). Превышение логируется и отражается в заголовке
+X-DB-Query-Budget; в тестах удобнее count_queries() / assert_max_queries().
+
+Те же хуки передают медленные запросы в app/db/slow_queries.py.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.slow_queries import INTERNAL_QUERY, slow_query_log
+
+logger = logging.getLogger("app.db.queries")
+
+
+# Максимум statement'ов на эндпоинт. Учитывается и авторизация (upsert
+# пользователя при холодном кэше); COMMIT/ROLLBACK в счёт не идут.
+QUERY_BUDGETS: Dict[str, int] = {
+    "GET /api/v1/trainings": 3,
+    "GET /api/v1/trainings/{training_id}": 2,
+    "GET /api/v1/profile/me": 1,
+    "PATCH /api/v1/profile/me": 3,
+    "GET /api/v1/ratings/leaderboard": 3,
+    "GET /api/v1/ratings/me": 3,
+    "POST /api/v1/enrollments": 8,
+    "POST /api/v1/enrollments/{enrollment_id}/cancel": 5,
+    "GET /api/v1/enrollments/training/{training_id}": 4,
+}
+
+
+class QueryStats:
+    """
+    Статистика запросов к БД в одном контексте (HTTP-запрос или блок кода).
+    """
+
+    __slots__ = ("count", "total_ms", "shapes", "scope")
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None) -> None:
+        self.scope = scope
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: "Counter[str]" = Counter()
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """
+        Повторяющиеся statement'ы (кандидаты в N+1).
+        """
+        return {sql: n for sql, n in self.shapes.items() if n >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.2f};desc="{self.count} queries"'
+
+
+def endpoint_of(scope: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    "METHOD /шаблон/пути" по ASGI scope. FastAPI кладёт найденный маршрут
+    в scope["route"]; до роутинга (или без маршрута) — None.
+    """
+    if not scope:
+        return None
+    path_format = getattr(scope.get("route"), "path_format", None)
+    if path_format is None:
+        return None
+    return f"{scope.get('method')} {path_format}"
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Сборщики count_queries(): видят запросы всего процесса, в том числе из
+# других потоков (TestClient крутит приложение в отдельном потоке).
+_collectors: List[QueryStats] = []
+_collectors_lock = threading.Lock()
+
+
+# --------- Хуки движков --------- #
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+
+    if context is not None:
+        if context.execution_options.get(INTERNAL_QUERY):
+            return
+        # попал ли statement в кэш компиляции движка (CACHE_HIT / CACHE_MISS / ...)
+        query_stats_monitor.compiled_cache[context.cache_hit.name] += 1
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+
+    if duration_ms >= slow_query_log.threshold_ms:
+        slow_query_log.observe(
+            statement,
+            parameters,
+            duration_ms,
+            endpoint_of(stats.scope) if stats is not None else None,
+            conn.engine,
+        )
+
+    if _collectors:
+        with _collectors_lock:
+            for collector in _collectors:
+                collector.record(statement, duration_ms)
+
+
+def install(engine: Engine) -> None:
+    """
+    Вешает счётчик на движок (для AsyncEngine — на .sync_engine).
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --------- Запрос --------- #
+class QueryStatsMonitor:
+    """
+    Итоги по HTTP-запросам: нарушения бюджетов и найденные N+1 по эндпоинтам.
+    """
+
+    def __init__(self, nplus1_threshold: int) -> None:
+        self.nplus1_threshold = nplus1_threshold
+        self.requests = 0
+        self.budget_violations: "Counter[str]" = Counter()
+        self.nplus1: "Counter[str]" = Counter()
+        self.compiled_cache: "Counter[str]" = Counter()
+
+    def begin(self, scope: Optional[Dict[str, Any]] = None) -> tuple[QueryStats, Any]:
+        stats = QueryStats(scope)
+        return stats, _current.set(stats)
+
+    def end(self, token: Any) -> None:
+        _current.reset(token)
+
+    def check(self, stats: QueryStats, endpoint: Optional[str]) -> Dict[str, str]:
+        """
+        Проверяет бюджет и N+1, возвращает дополнительные заголовки ответа.
+        endpoint — "METHOD /шаблон/пути" (None, если маршрут не найден).
+        """
+        self.requests += 1
+        headers: Dict[str, str] = {}
+
+        budget = QUERY_BUDGETS.get(endpoint) if endpoint else None
+        if budget is not None and stats.count > budget:
+            self.budget_violations[endpoint] += 1
+            headers["X-DB-Query-Budget"] = f"exceeded {stats.count}/{budget}"
+            logger.warning("Query budget exceeded on %s: %d > %d", endpoint, stats.count, budget)
+
+        repeated = stats.repeated(self.nplus1_threshold) if self.nplus1_threshold > 0 else {}
+        if repeated:
+            self.nplus1[endpoint or "?"] += 1
+            headers["X-DB-N-Plus-One"] = str(len(repeated))
+            for sql, n in repeated.items():
+                logger.warning(
+                    "Possible N+1 on %s: statement repeated %d times: %s",
+                    endpoint,
+                    n,
+                    " ".join(sql.split())[:200],
+                )
+
+        return headers
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.compiled_cache["CACHE_HIT"]
+        lookups = hits + self.compiled_cache["CACHE_MISS"]
+        return {
+            "requests": self.requests,
+            "nplus1_threshold": self.nplus1_threshold,
+            "budget_violations": dict(self.budget_violations),
+            "nplus1": dict(self.nplus1),
+            "compiled_cache": {
+                **dict(self.compiled_cache),
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            },
+        }
+
+
+query_stats_monitor = QueryStatsMonitor(nplus1_threshold=settings.db_nplus1_threshold)
+
+
+# --------- Для тестов и скриптов --------- #
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Считает все statement'ы процесса, выполненные внутри блока:
+
+        with count_queries() as q:
+            client.post("/api/v1/enrollments", ...)
+        assert q.count <= QUERY_BUDGETS["POST /api/v1/enrollments"]
+    """
+    stats = QueryStats()
+    with _collectors_lock:
+        _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _collectors_lock:
+            _collectors.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """
+    Как count_queries(), но падает QueryBudgetExceeded, если запросов больше limit.
+    """
+    with count_queries() as stats:
+        yield stats
+
+    if stats.count > limit:
+        listing = "\n".join(
+            f"  {n}x {' '.join(sql.split())[:200]}" for sql, n in stats.shapes.most_common()
+        )
+        raise QueryBudgetExceeded(
+            f"Expected at most {limit} queries, got {stats.count}:\n{listing}"
+        )
@@ -0,0 +1,135 @@
+# app/db/read_routing.py
+"""
+Маршрутизация тяжёлых чтений на реплику (DATABASE_REPLICA_URL).
+
+Расписание, рейтинг, состав тренировки и список уведомлений читают через
+зависимость get_read_db (app/core/deps.py), остальное — через get_db на primary.
+
+Реплика отстаёт, поэтому пользователь, который только что что-то записал
+(POST/PATCH/PUT/DELETE через get_db), ещё REPLICA_STICKY_SECONDS читает
+с primary и видит свою запись (read-your-writes). Отметки о записях живут
+в памяти воркера.
+
+Если реплика не задана или недоступна, читаем с primary; после ошибки
+соединения реплику не трогаем REPLICA_RETRY_SECONDS.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import registry
+
+logger = logging.getLogger("app.db.read_routing")
+
+
+class ReadRouter:
+    def __init__(
+        self,
+        *,
+        sticky_seconds: float,
+        retry_seconds: float,
+        maxsize: int = 100_000,
+    ) -> None:
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self.maxsize = maxsize
+
+        # user_id -> monotonic-время последней записи
+        self._writes: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._replica_down_until = 0.0
+
+        # куда ушли чтения: replica / sticky / fallback / no_replica
+        self.reads: "Counter[str]" = Counter()
+        self.replica_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return registry.replica_session_maker is not None
+
+    # ---- read-your-writes ----
+
+    def mark_write(self, user_id: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._writes[user_id] = time.monotonic()
+            self._writes.move_to_end(user_id)
+            while len(self._writes) > self.maxsize:
+                self._writes.popitem(last=False)
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        written_at = self._writes.get(user_id)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at < self.sticky_seconds:
+            return True
+        with self._lock:
+            if self._writes.get(user_id) == written_at:
+                del self._writes[user_id]
+        return False
+
+    # ---- выбор сессии ----
+
+    async def open_replica_session(self, user_id: Optional[int]) -> Optional[AsyncSession]:
+        """
+        Сессия реплики, если с неё можно читать, иначе None — читаем
+        общей сессией запроса на primary (app/db/request_session.py).
+        Соединение с репликой берём сразу, чтобы при её недоступности
+        переключиться на primary до выполнения запросов сервиса.
+        """
+        if not self.enabled:
+            self.reads["no_replica"] += 1
+            return None
+
+        if self.is_sticky(user_id):
+            self.reads["sticky"] += 1
+            return None
+
+        if time.monotonic() < self._replica_down_until:
+            self.reads["fallback"] += 1
+            return None
+
+        session = registry.replica_session_maker()
+        try:
+            await session.connection()
+        except Exception as exc:
+            await session.close()
+            self.replica_errors += 1
+            self._replica_down_until = time.monotonic() + self.retry_seconds
+            logger.warning(
+                "Replica unavailable, reading from primary for %ss: %s",
+                self.retry_seconds,
+                exc,
+            )
+            self.reads["fallback"] += 1
+            return None
+
+        self.reads["replica"] += 1
+        return session
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sticky_seconds": self.sticky_seconds,
+            "replica_down": time.monotonic() < self._replica_down_until,
+            "replica_errors": self.replica_errors,
+            "reads": dict(self.reads),
+            "recent_writers": len(self._writes),
+        }
+
+
+read_router = ReadRouter(
+    sticky_seconds=settings.replica_sticky_seconds,
+    retry_seconds=settings.replica_retry_seconds,
+)
@@ -0,0 +1,72 @@
+# app/db/request_session.py
+"""
+Одна сессия primary на HTTP-запрос.
+
+Раньше запрос мог открыть несколько сессий: авторизация (загрузка / upsert
+пользователя), get_db эндпоинта, get_read_db без реплики — и каждая брала
+своё соединение из пула. Теперь UnitOfWorkMiddleware (app/core/middleware.py)
+кладёт в request.state.db ленивый RequestSession, а авторизация, get_db и
+get_read_db (когда чтение идёт на primary) пользуются одной и той же
+AsyncSession. Сама сессия создаётся при первом обращении, соединение она
+берёт при первом запросе к БД — запрос без БД пул не трогает вовсе, с БД —
+берёт одно соединение на транзакцию.
+
+Вне HTTP-запроса (джобы, скрипты, приложение без middleware)
+request_session() открывает обычную короткую сессию.
+"""
+
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import async_session_maker
+from app.db.unit_of_work import UnitOfWork
+
+
+class RequestSession:
+    """
+    Ленивая AsyncSession запроса; закрывает её middleware в конце запроса.
+    """
+
+    __slots__ = ("_uow", "_session")
+
+    def __init__(self, uow: Optional[UnitOfWork] = None) -> None:
+        self._uow = uow
+        self._session: Optional[AsyncSession] = None
+
+    def get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = async_session_maker()
+            if self._uow is not None:
+                self._uow.join(self._session)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@asynccontextmanager
+async def request_session(state: Optional[Dict[str, Any]]) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия запроса из state["db"], если она есть, иначе — своя короткая сессия.
+
+    Ошибка внутри блока откатывает общую сессию, чтобы следующий её
+    пользователь в том же запросе не наткнулся на прерванную транзакцию.
+    """
+    holder: Optional[RequestSession] = state.get("db") if state is not None else None
+    if holder is None:
+        async with async_session_maker() as db:
+            yield db
+        return
+
+    db = holder.get()
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
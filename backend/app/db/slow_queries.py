@@ -0,0 +1,240 @@
+# app/db/slow_queries.py
+"""
+Лог медленных запросов вместо INFO-лога каждого statement'а SQLAlchemy.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS пишутся в лог app.db.slow с длительностью,
+эндпоинтом и «формой» параметров (имена и типы, без значений). Повторы одного
+и того же SQL логируются не чаще раза в SLOW_QUERY_LOG_INTERVAL_SECONDS,
+дополнительно можно проредить SLOW_QUERY_SAMPLE_RATE.
+
+Последние медленные запросы лежат в кольцевом буфере (SLOW_QUERY_RING_SIZE),
+его отдаёт GET /api/v1/admin/metrics/slow-queries. При SLOW_QUERY_EXPLAIN=true
+для залогированных SELECT'ов в фоне снимается EXPLAIN (ANALYZE, BUFFERS)
+на отдельном соединении того же движка (primary или реплика), в транзакции
+READ ONLY, которая затем откатывается. ANALYZE выполняет запрос по-настоящему,
+поэтому SELECT ... FOR UPDATE/SHARE не трогаем, а запросы с побочными
+эффектами (nextval, pg_notify) в READ ONLY падают, ничего не сделав.
+
+Замер времени — в хуках app/db/query_stats.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import random
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import LogRateLimiter
+
+logger = logging.getLogger("app.db.slow")
+
+# Execution option, которым помечаются служебные запросы (EXPLAIN,
+# SET LOCAL statement_timeout): {INTERNAL_QUERY: True} — хуки счётчика
+# и лога медленных запросов их пропускают.
+INTERNAL_QUERY = "internal_query"
+
+# Блокировки строк EXPLAIN ANALYZE взял бы по-настоящему
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(NO\s+KEY\s+|KEY\s+)?(UPDATE|SHARE)\b", re.IGNORECASE)
+
+
+def params_shape(parameters: Any) -> Any:
+    """
+    Имена и типы параметров без значений: {"user_id_1": "int", "q": "str(12)"}.
+    """
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return f"{len(parameters)} x {params_shape(parameters[0])}"
+        return [_value_shape(v) for v in parameters]
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    return _value_shape(parameters)
+
+
+def _value_shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _one_line(statement: str, limit: int = 500) -> str:
+    return " ".join(statement.split())[:limit]
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        *,
+        threshold_ms: float,
+        sample_rate: float,
+        log_interval_seconds: float,
+        ring_size: int,
+        explain: bool,
+        explain_timeout_ms: int,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.explain_timeout_ms = explain_timeout_ms
+
+        self._limiter = LogRateLimiter(interval_seconds=log_interval_seconds, maxsize=1000)
+        self._ring: Deque[Dict[str, Any]] = deque(maxlen=ring_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # SQL, для которых EXPLAIN уже выполняется
+        self._explaining: set[str] = set()
+        # ссылки на фоновые задачи, чтобы их не собрал GC
+        self._tasks: set[asyncio.Task] = set()
+
+        self.slow = 0
+        self.sampled_out = 0
+        self.explained = 0
+        self.explain_errors = 0
+
+    def observe(
+        self,
+        statement: str,
+        parameters: Any,
+        duration_ms: float,
+        endpoint: Optional[str],
+        engine: Any = None,
+    ) -> None:
+        """
+        Вызывается из after_cursor_execute для каждого запроса;
+        engine — движок, на котором он выполнился (для EXPLAIN).
+        """
+        if self.threshold_ms <= 0 or duration_ms < self.threshold_ms:
+            return
+
+        self.slow += 1
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+
+        skipped = self._limiter.hit(statement)
+        if skipped is None:
+            return
+
+        shape = params_shape(parameters)
+        logger.warning(
+            "Slow query %.1f ms on %s (similar skipped: %d), params=%s: %s",
+            duration_ms,
+            endpoint or "-",
+            skipped,
+            shape,
+            _one_line(statement),
+        )
+
+        entry: Dict[str, Any] = {
+            "id": next(self._ids),
+            "at": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint,
+            "duration_ms": round(duration_ms, 2),
+            "statement": _one_line(statement, 2000),
+            "params": shape,
+            "plan": None,
+            "plan_error": None,
+        }
+        with self._lock:
+            self._ring.append(entry)
+
+        if self.explain:
+            self._schedule_explain(entry, statement, parameters, engine)
+
+    # ---- EXPLAIN ----
+
+    def _schedule_explain(self, entry: Dict[str, Any], statement: str, parameters: Any, engine: Any) -> None:
+        # ANALYZE выполняет запрос по-настоящему: только чтение и без блокировок
+        if statement.lstrip()[:6].upper() != "SELECT" or _LOCKING_CLAUSE.search(statement):
+            return
+        from app.db.session import registry
+
+        async_engine = registry.async_engine_for(engine)
+        if async_engine is None:
+            # синхронный движок (скрипты) — без плана
+            return
+        if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # синхронный движок вне event loop (скрипты) — без плана
+            return
+
+        with self._lock:
+            if statement in self._explaining:
+                return
+            self._explaining.add(statement)
+
+        task = loop.create_task(self._explain(entry, statement, parameters, async_engine))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, entry: Dict[str, Any], statement: str, parameters: Any, async_engine: Any) -> None:
+        try:
+            async with async_engine.connect() as conn:
+                conn = await conn.execution_options(**{INTERNAL_QUERY: True})
+                await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                await conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}"
+                )
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS) " + statement,
+                    parameters if parameters else None,
+                )
+                entry["plan"] = "\n".join(row[0] for row in result)
+                await conn.rollback()
+            self.explained += 1
+        except Exception as exc:
+            self.explain_errors += 1
+            entry["plan_error"] = f"{type(exc).__name__}: {exc}"[:500]
+            logger.warning("EXPLAIN for slow query #%s failed: %s", entry["id"], exc)
+        finally:
+            with self._lock:
+                self._explaining.discard(statement)
+
+    # ---- админка / метрики ----
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._ring))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ring.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "sample_rate": self.sample_rate,
+            "explain": self.explain,
+            "slow": self.slow,
+            "sampled_out": self.sampled_out,
+            "logged": self._limiter.emitted,
+            "suppressed": self._limiter.suppressed,
+            "explained": self.explained,
+            "explain_errors": self.explain_errors,
+            "buffered": len(self._ring),
+        }
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_threshold_ms,
+    sample_rate=settings.slow_query_sample_rate,
+    log_interval_seconds=settings.slow_query_log_interval_seconds,
+    ring_size=settings.slow_query_ring_size,
+    explain=settings.slow_query_explain,
+    explain_timeout_ms=settings.slow_query_explain_timeout_ms,
+)
@@ -0,0 +1,203 @@
+# app/db/unit_of_work.py
+"""
+Единица работы (unit of work) на HTTP-запрос: один COMMIT в конце запроса
+вместо COMMIT в каждом сервисе.
+
+Раньше каждый сервис сам делал commit() (а часто ещё и refresh()), поэтому
+одна админская операция — «закрыть долг и снять автобан», «сохранить
+настройку и записать аудит» — стоила нескольких транзакций и нескольких
+fsync'ов WAL. Теперь:
+
+- UnitOfWorkMiddleware (app/core/middleware.py) открывает UnitOfWork на запрос,
+  и к нему присоединяется общая сессия запроса (app/db/request_session.py);
+- сервисы вызывают commit(db): внутри единицы работы это только flush()
+  (INSERT/UPDATE уходят в БД, ошибки ограничений всплывают сразу, id и
+  серверные значения приходят через RETURNING), сама фиксация — одна,
+  перед отправкой ответа со статусом < 400; ответ с ошибкой — ROLLBACK;
+- побочные эффекты, которым нужна уже зафиксированная запись (сброс кэшей,
+  отзыв токенов), регистрируются через after_commit(db, fn) и выполняются
+  после COMMIT.
+
+Вне HTTP-запроса (джобы, скрипты) commit(db) — обычный commit(), а группу
+операций можно собрать в одну транзакцию явно:
+
+    async with UnitOfWork() as uow:
+        uow.join(db)
+        ...
+
+DB_DEFERRED_COMMIT=false возвращает старое поведение (commit в каждом сервисе).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("app.db.unit_of_work")
+
+# ключ в Session.info, под которым лежит единица работы сессии
+_INFO_KEY = "unit_of_work"
+
+
+class UnitOfWorkStats:
+    """
+    Счётчики процесса: сколько COMMIT'ов сервисов свернулось в один.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.units = 0
+        self.commits = 0
+        self.deferred = 0
+        self.saved = 0
+        self.rollbacks = 0
+        self.failures = 0
+        self.commit_ms = 0.0
+
+    def record(self, *, deferred: int, committed: bool, failed: bool = False, duration_ms: float = 0.0) -> None:
+        with self._lock:
+            self.units += 1
+            self.deferred += deferred
+            if failed:
+                self.failures += 1
+            elif committed:
+                self.commits += 1
+                # N commit() сервисов вместо N транзакций стали одной
+                self.saved += max(deferred - 1, 0)
+                self.commit_ms += duration_ms
+            else:
+                self.rollbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "units": self.units,
+                "commits": self.commits,
+                # commit() сервисов, выполненные как flush
+                "deferred_commits": self.deferred,
+                "saved_commits": self.saved,
+                "rollbacks": self.rollbacks,
+                "failures": self.failures,
+                "avg_commit_ms": round(self.commit_ms / self.commits, 3) if self.commits else 0.0,
+            }
+
+
+unit_of_work_stats = UnitOfWorkStats()
+
+
+class UnitOfWork:
+    """
+    Набор сессий, которые фиксируются вместе одним commit() на сессию.
+    """
+
+    def __init__(self) -> None:
+        self._sessions: List[AsyncSession] = []
+        self._after_commit: List[Callable[[], Any]] = []
+        # сколько раз сервисы попросили commit() внутри этой единицы
+        self.deferred = 0
+        self.done = False
+
+    def join(self, session: AsyncSession) -> AsyncSession:
+        session.info[_INFO_KEY] = self
+        self._sessions.append(session)
+        return session
+
+    def after_commit(self, fn: Callable[[], Any]) -> None:
+        self._after_commit.append(fn)
+
+    async def commit(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        if not self._sessions:
+            return
+
+        start = time.perf_counter()
+        try:
+            for session in self._sessions:
+                if session.in_transaction():
+                    await session.commit()
+        except Exception:
+            unit_of_work_stats.record(deferred=self.deferred, committed=False, failed=True)
+            await self._rollback_sessions()
+            raise
+        finally:
+            self._detach()
+
+        unit_of_work_stats.record(
+            deferred=self.deferred,
+            committed=True,
+            duration_ms=(time.perf_counter() - start) * 1000,
+        )
+        for fn in self._after_commit:
+            try:
+                fn()
+            except Exception:
+                logger.exception("after_commit hook failed")
+        self._after_commit.clear()
+
+    async def rollback(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        if not self._sessions:
+            return
+        try:
+            await self._rollback_sessions()
+        finally:
+            self._detach()
+        unit_of_work_stats.record(deferred=self.deferred, committed=False)
+        self._after_commit.clear()
+
+    async def _rollback_sessions(self) -> None:
+        for session in self._sessions:
+            try:
+                await session.rollback()
+            except Exception:
+                logger.exception("rollback failed")
+
+    def _detach(self) -> None:
+        for session in self._sessions:
+            session.info.pop(_INFO_KEY, None)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+
+def current_unit_of_work(db: AsyncSession) -> Optional[UnitOfWork]:
+    return db.info.get(_INFO_KEY)
+
+
+async def commit(db: AsyncSession) -> None:
+    """
+    Замена db.commit() в сервисах: внутри единицы работы — flush(),
+    иначе — настоящий commit().
+    """
+    uow = current_unit_of_work(db)
+    if uow is None:
+        await db.commit()
+        return
+    await db.flush()
+    uow.deferred += 1
+
+
+def after_commit(db: AsyncSession, fn: Callable[[], Any]) -> None:
+    """
+    Выполнить fn после фиксации изменений сессии: сразу, если сессия уже
+    закоммичена сервисом, или после COMMIT единицы работы.
+    """
+    uow = current_unit_of_work(db)
+    if uow is None:
+        fn()
+    else:
+        uow.after_commit(fn)
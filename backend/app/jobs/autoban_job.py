@@ -1,13 +1,16 @@
 # backend/app/jobs/autoban_job.py
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.unit_of_work import UnitOfWork
 from app.models.enrollment import Enrollment, EnrollmentStatus
 from app.models.training import Training
-from app.services.debt_service import create_open_debt_if_missing
+from app.services.debt_service import create_debt_for_training
 from app.services.ban_service import ensure_auto_debt_ban
 
 
@@ -16,41 +19,50 @@ from app.services.ban_service import ensure_auto_debt_ban
 AUTO_BAN_HOURS_BEFORE_TRAINING = 2
 
 
-def run_autoban_job(db: Session) -> int:
+async def run_autoban_job(db: AsyncSession) -> int:
     now = datetime.utcnow()
     border = now + timedelta(hours=AUTO_BAN_HOURS_BEFORE_TRAINING)
 
-    rows = (
-        db.query(Enrollment, Training)
+    result = await db.execute(
+        select(Enrollment, Training)
         .join(Training, Training.id == Enrollment.training_id)
-        .filter(
+        .where(
             Enrollment.status == EnrollmentStatus.ACTIVE,
             Enrollment.is_paid.is_(False),
             Training.is_cancelled.is_(False),
             Training.start_at > now,
             Training.start_at <= border,
         )
-        .all()
     )
+    rows = result.all()
 
     processed = 0
     for enrollment, training in rows:
-        debt = create_open_debt_if_missing(db, user_id=enrollment.user_id, training=training)
+        # долг и автобан — одна транзакция и один COMMIT на строку
+        async with UnitOfWork() as uow:
+            uow.join(db)
+            debt = await create_debt_for_training(
+                db,
+                user_id=enrollment.user_id,
+                training_id=training.id,
+                amount=training.price,
+            )
 
-        reason = f"Неоплата тренировки #{training.id} (долг #{debt.id}, сумма {float(training.price):.2f})"
-        ensure_auto_debt_ban(db, user_id=enrollment.user_id, reason=reason)
+            reason = f"Неоплата тренировки #{training.id} (долг #{debt.id}, сумма {float(training.price):.2f})"
+            await ensure_auto_debt_ban(db, user_id=enrollment.user_id, reason=reason)
 
         processed += 1
 
     return processed
 
 
+async def _main() -> None:
+    from app.db.session import async_session_maker
+
+    async with async_session_maker() as db:
+        count = await run_autoban_job(db)
+    print(f"autoban_job: processed={count}")
+
+
 if __name__ == "__main__":
-    from app.db.session import SessionLocal
-
-    db = SessionLocal()
-    try:
-        count = run_autoban_job(db)
-        print(f"autoban_job: processed={count}")
-    finally:
-        db.close()
+    asyncio.run(_main())
@@ -3,29 +3,87 @@
 from __future__ import annotations
 
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import api_router as api_v1_router
+from app.core.activity import activity_tracker
 from app.core.config import get_settings
 from app.core.exceptions import setup_exception_handlers
 from app.core.logger import configure_logging
-from app.core.middleware import TelegramAuthMiddleware, RequestLoggingMiddleware
+from app.core.schedule_cache import schedule_cache
+from app.db.session import registry
+from app.core.middleware import (
+    AdmissionControlMiddleware,
+    DeadlineMiddleware,
+    QueryStatsMiddleware,
+    RequestLoggingMiddleware,
+    TelegramAuthMiddleware,
+    UnitOfWorkMiddleware,
+)
 
 settings = get_settings()
 configure_logging()
 
 logger = logging.getLogger("app.main")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Фоновые задачи процесса: периодический сброс last_seen_at и LISTEN
+    версий расписания для кэша страниц.
+    На остановке — дописываем буфер и закрываем пулы соединений.
+    """
+    activity_tracker.start()
+    schedule_cache.start()
+    try:
+        yield
+    finally:
+        await schedule_cache.stop()
+        await activity_tracker.stop()
+        await registry.dispose()
+
+
 app = FastAPI(
     title="Volleyball MiniApp API",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
+# Middleware: последний добавленный — самый внешний. Снаружи внутрь:
+#   CORS > логирование > admission control > авторизация > счётчик запросов к БД
+#   > единица работы > дедлайн > приложение
+# Ответы, которые собирают сами middleware (503 admission/дедлайна, 500 при
+# сбое COMMIT), проходят через логирование и CORS: фронтенд видит статус
+# и Retry-After, а в логе — тот статус, который получил клиент.
+
+# Дедлайн на запрос по классу маршрута: statement_timeout в БД и отмена обработки
+# (внутри UnitOfWorkMiddleware: COMMIT перед ответом дедлайном не прерывается)
+app.add_middleware(DeadlineMiddleware)
+
+# Одна ленивая сессия БД и один COMMIT на запрос — перед отправкой ответа
+# (внутри QueryStatsMiddleware, чтобы время фиксации попадало в статистику запроса)
+app.add_middleware(UnitOfWorkMiddleware)
+
+# Число запросов к БД и время БД на запрос (X-DB-Queries, Server-Timing)
+app.add_middleware(QueryStatsMiddleware)
+
+# Авторизация через Telegram WebApp
+app.add_middleware(TelegramAuthMiddleware)
+
+# Admission control: при перегрузке пула отбрасываем низкоприоритетные
+# запросы до авторизации и БД
+app.add_middleware(AdmissionControlMiddleware)
+
+# Логирование запросов
+app.add_middleware(RequestLoggingMiddleware)
+
 # CORS — пока разрешаем всё для простоты разработки
 app.add_middleware(
     CORSMiddleware,
@@ -35,12 +93,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Логирование запросов
-app.add_middleware(RequestLoggingMiddleware)
-
-# Авторизация через Telegram WebApp
-app.add_middleware(TelegramAuthMiddleware)
-
 # Глобальные обработчики ошибок
 setup_exception_handlers(app)
 
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import Any
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -10,6 +10,12 @@ from .base import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # список в админке: ORDER BY id DESC с фильтрами (миграция a4d6f8b0c2e1)
+        Index("ix_audit_logs_user_recent", "user_id", "id"),
+        Index("ix_audit_logs_action_recent", "action", "id"),
+        Index("ix_audit_logs_entity_recent", "entity", "entity_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -4,7 +4,7 @@ import enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, Column, DateTime, Enum as SAEnum, ForeignKey, Integer, String, func, text
+from sqlalchemy import Boolean, Column, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -17,6 +17,10 @@ class BanType(str, enum.Enum):
 
 class Ban(Base):
     __tablename__ = "bans"
+    __table_args__ = (
+        # has_active_ban (миграция 9c3e5a7b1d24)
+        Index("ix_bans_user_active", "user_id", "until", postgresql_where=text("active IS true")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
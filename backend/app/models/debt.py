@@ -4,7 +4,7 @@ import enum
 from typing import Optional
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Integer, Numeric, func, text
+from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, Numeric, func, text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -17,6 +17,10 @@ class DebtStatus(str, enum.Enum):
 
 class Debt(Base):
     __tablename__ = "debts"
+    __table_args__ = (
+        # has_open_debts (миграция 9c3e5a7b1d24)
+        Index("ix_debts_user_status", "user_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -8,6 +8,7 @@ from sqlalchemy import (
     Boolean,
     Enum,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -28,6 +29,8 @@ class Enrollment(Base):
     __tablename__ = "enrollments"
     __table_args__ = (
         UniqueConstraint("user_id", "training_id", name="uq_enrollment_user_training"),
+        # состав и заполненность тренировки (миграция 9c3e5a7b1d24)
+        Index("ix_enrollments_training_status_reserve", "training_id", "status", "is_reserve", "created_at"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
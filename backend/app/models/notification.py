@@ -1,7 +1,7 @@
 # backend/app/models/notification.py
 from __future__ import annotations
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, func, text as sa_text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -9,6 +9,10 @@ from app.db.base import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # лента пользователя (миграция a4d6f8b0c2e1)
+        Index("ix_notifications_user_created", "user_id", sa_text("created_at DESC"), sa_text("id DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -6,6 +6,9 @@ from .base import Base
 
 class Setting(Base):
     __tablename__ = "settings"
+    # id/created_at/updated_at считает БД: забираем их через RETURNING
+    # в том же INSERT/UPDATE, без отдельного refresh() после commit
+    __mapper_args__ = {"eager_defaults": True}
 
     # key — PK как и раньше (это важно, чтобы ничего не сломать)
     key: Mapped[str] = mapped_column(String(150), primary_key=True)
@@ -7,7 +7,9 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
     Numeric,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -19,6 +21,16 @@ class Training(Base):
     Конкретная тренировка в расписании.
     """
     __tablename__ = "trainings"
+    __table_args__ = (
+        # расписание, keyset-пагинация по (start_at, id) (миграция 9c3e5a7b1d24)
+        Index(
+            "ix_trainings_start_at_id_active",
+            "start_at",
+            "id",
+            postgresql_where=text("is_cancelled IS false"),
+        ),
+        Index("ix_trainings_start_at_id", "start_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -10,8 +10,10 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -24,6 +26,16 @@ class User(Base):
     Пользователь / игрок волейбольной школы.
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # таблица лидеров (миграция a4d6f8b0c2e1)
+        Index(
+            "ix_users_leaderboard",
+            text("rating DESC"),
+            text("cups DESC"),
+            "id",
+            postgresql_where=text("is_active IS true"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -93,6 +105,13 @@ class User(Base):
         server_default="0",
     )
 
+    # Последняя активность (пишется пачками из app/core/activity.py)
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        index=True,
+    )
+
     # Служебные поля
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
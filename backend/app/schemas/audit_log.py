@@ -24,5 +24,6 @@ class AuditLogResponse(BaseModel):
 class AuditLogListResponse(BaseModel):
     items: List[AuditLogResponse]
     total: int
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int
     offset: int
@@ -23,6 +23,7 @@ class BanResponse(BaseModel):
 class BanListResponse(BaseModel):
     items: List[BanResponse]
     total: int = 0
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int = 50
     offset: int = 0
 
@@ -24,6 +24,7 @@ class DebtResponse(BaseModel):
 class DebtListResponse(BaseModel):
     items: List[DebtResponse]
     total: int = 0
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int = 50
     offset: int = 0
 
@@ -14,6 +14,8 @@ class AdminBroadcastNotificationIn(BaseModel):
     url: Optional[str] = None
     entity_type: Optional[str] = None
     entity_id: Optional[int] = None
+    # Только тем, кто заходил в приложение за последние N дней
+    active_within_days: Optional[int] = Field(default=None, ge=1)
 
 
 class AdminTrainingNotificationIn(BaseModel):
@@ -42,5 +44,6 @@ class NotificationOut(BaseModel):
 class NotificationListOut(BaseModel):
     items: List[NotificationOut]
     total: int
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int
     offset: int
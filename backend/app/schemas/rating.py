@@ -29,6 +29,7 @@ class RatingUserDTO(BaseModel):
 class RatingLeaderboardResponse(BaseModel):
     items: list[RatingUserDTO]
     total: int
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int
     offset: int
 
@@ -24,5 +24,6 @@ class SettingResponse(BaseModel):
 class SettingListResponse(BaseModel):
     items: List[SettingResponse]
     total: int = 0
+    total_mode: str = "exact"  # exact / cached / estimate (app/db/counts.py)
     limit: int = 50
     offset: int = 0
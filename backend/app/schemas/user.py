@@ -63,3 +63,13 @@ class UserProfileUpdate(BaseModel):
 
     # Запрещаем лишние поля в JSON
     model_config = ConfigDict(extra="forbid")
+
+
+class UserAdminFlagUpdate(BaseModel):
+    """
+    Тело PATCH /api/v1/admin/users/{user_id}/admin
+    """
+
+    is_admin: bool
+
+    model_config = ConfigDict(extra="forbid")
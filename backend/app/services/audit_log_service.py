@@ -6,6 +6,9 @@ from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db import unit_of_work
+from app.db.counts import mark_written, total_counter
+
 
 async def write_audit_log(
     db: AsyncSession,
@@ -38,9 +41,10 @@ async def write_audit_log(
             "user_agent": user_agent,
         },
     )
+    mark_written(db, "audit_logs")
 
     if commit:
-        await db.commit()
+        await unit_of_work.commit(db)
 
 
 async def list_audit_logs(
@@ -52,7 +56,11 @@ async def list_audit_logs(
     action: Optional[str] = None,
     entity: Optional[str] = None,
     entity_id: Optional[int] = None,
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], int, str]:
+    """
+    Страница журнала аудита: (items, total, total_mode).
+    Без фильтров total — оценка по reltuples, с фильтрами — кэш COUNT(*).
+    """
     where = []
     params = {"limit": limit, "offset": offset, "user_id": user_id, "action": action, "entity": entity, "entity_id": entity_id}
 
@@ -67,9 +75,13 @@ async def list_audit_logs(
 
     where_sql = ("WHERE " + " AND ".join(where)) if where else ""
 
-    total = await db.scalar(
+    total, total_mode = await total_counter.total(
+        db,
         text(f"SELECT COUNT(*) FROM audit_logs {where_sql}"),
-        params,
+        table="audit_logs",
+        mode="cached" if where else "estimate",
+        key=(user_id, action, entity, entity_id),
+        params=params,
     )
 
     rows = await db.execute(
@@ -86,4 +98,4 @@ async def list_audit_logs(
     )
 
     items = [dict(r._mapping) for r in rows.fetchall()]
-    return items, int(total or 0)
+    return items, total, total_mode
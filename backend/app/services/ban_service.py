@@ -1,11 +1,16 @@
 ﻿from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, lambda_stmt, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
+from app.core.identity_cache import identity_cache
+from app.core.session_tokens import revoke_user_tokens
+from app.db import unit_of_work
+from app.db.counts import total_counter
 from app.models.ban import Ban, BanType
 
 
@@ -18,18 +23,26 @@ def _active_until_filter(now: datetime):
     return (Ban.active.is_(True)) & (or_(Ban.until.is_(None), Ban.until >= now))
 
 
-def has_active_ban(db: Session, user_id: int) -> bool:
+def _active_ban_stmt(user_id: int, now: datetime) -> StatementLambdaElement:
+    # lambda_stmt: запрос строится и получает ключ кэша один раз,
+    # дальше подставляются только user_id и now
+    return lambda_stmt(
+        lambda: select(Ban.id)
+        .where(
+            Ban.user_id == user_id,
+            Ban.active.is_(True),
+            or_(Ban.until.is_(None), Ban.until >= now),
+        )
+        .limit(1)
+    )
+
+
+async def has_active_ban(db: AsyncSession, user_id: int) -> bool:
     """
     Имя ожидает enrollment_service.py
     """
-    now = _now_utc()
-    return (
-        db.query(Ban.id)
-        .filter(Ban.user_id == user_id)
-        .filter(_active_until_filter(now))
-        .first()
-        is not None
-    )
+    ban_id = await db.scalar(_active_ban_stmt(user_id, _now_utc()))
+    return ban_id is not None
 
 
 # ---- Backward-compatible aliases (на случай старых импортов) ----
@@ -37,8 +50,24 @@ user_has_active_ban = has_active_ban
 is_user_banned = has_active_ban
 
 
-def list_bans(
-    db: Session,
+def _ban_conditions(*, user_id: Optional[int], active: Optional[bool]) -> list:
+    conditions = []
+
+    if user_id is not None:
+        conditions.append(Ban.user_id == user_id)
+
+    if active is True:
+        conditions.append(_active_until_filter(_now_utc()))
+    elif active is False:
+        # "неактивные" = active=false OR until < now
+        now = _now_utc()
+        conditions.append(or_(Ban.active.is_(False), (Ban.until.is_not(None) & (Ban.until < now))))
+
+    return conditions
+
+
+async def list_bans(
+    db: AsyncSession,
     *,
     user_id: Optional[int] = None,
     active: Optional[bool] = None,
@@ -48,23 +77,42 @@ def list_bans(
     """
     Имя ожидает admin_billing.py
     """
-    q = db.query(Ban)
+    conditions = _ban_conditions(user_id=user_id, active=active)
+    result = await db.execute(select(Ban).where(*conditions).order_by(Ban.id.desc()).offset(offset).limit(limit))
+    return list(result.scalars().all())
 
-    if user_id is not None:
-        q = q.filter(Ban.user_id == user_id)
 
-    if active is True:
-        q = q.filter(_active_until_filter(_now_utc()))
-    elif active is False:
-        # "неактивные" = active=false OR until < now
-        now = _now_utc()
-        q = q.filter(or_(Ban.active.is_(False), (Ban.until.is_not(None) & (Ban.until < now))))
+async def count_bans(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int] = None,
+    active: Optional[bool] = None,
+) -> Tuple[int, str]:
+    """
+    total для админского списка банов: (total, total_mode), см. app/db/counts.py.
+    """
+    conditions = _ban_conditions(user_id=user_id, active=active)
+    return await total_counter.total(
+        db,
+        select(func.count()).select_from(Ban).where(*conditions),
+        table="bans",
+        mode="cached" if conditions else "estimate",
+        key=(user_id, active),
+    )
 
-    return q.order_by(Ban.id.desc()).offset(offset).limit(limit).all()
 
+def _forget_user(user_id: int, *, revoke_tokens: bool = False) -> None:
+    """
+    Сбросить закэшированного пользователя (и его токены) — после COMMIT,
+    иначе параллельный запрос успеет закэшировать старое состояние.
+    """
+    if revoke_tokens:
+        revoke_user_tokens(user_id)
+    identity_cache.invalidate_user_id(user_id)
 
-def _create_ban(
-    db: Session,
+
+async def _create_ban(
+    db: AsyncSession,
     *,
     user_id: int,
     ban_type: BanType,
@@ -80,77 +128,79 @@ def _create_ban(
         until=until,
     )
     db.add(ban)
-    db.commit()
-    db.refresh(ban)
+    # id приходит из INSERT ... RETURNING, остальное задали сами — refresh не нужен
+    await unit_of_work.commit(db)
+
+    # Забаненный должен заново пройти проверку initData
+    unit_of_work.after_commit(db, lambda: _forget_user(user_id, revoke_tokens=True))
     return ban
 
 
-def manual_ban_user(db: Session, *, user_id: int, reason: str, until: Optional[datetime] = None) -> Ban:
+async def manual_ban_user(db: AsyncSession, *, user_id: int, reason: str, until: Optional[datetime] = None) -> Ban:
     """
     Имя ожидает admin_billing.py
     """
-    return _create_ban(db, user_id=user_id, ban_type=BanType.MANUAL, reason=reason, until=until)
+    return await _create_ban(db, user_id=user_id, ban_type=BanType.MANUAL, reason=reason, until=until)
 
 
-def create_auto_debt_ban(db: Session, *, user_id: int, reason: str, until: Optional[datetime] = None) -> Ban:
+async def create_auto_debt_ban(db: AsyncSession, *, user_id: int, reason: str, until: Optional[datetime] = None) -> Ban:
     """
     Для autoban_job: создаём авто-бан за долг.
     """
-    return _create_ban(db, user_id=user_id, ban_type=BanType.AUTO_DEBT, reason=reason, until=until)
+    return await _create_ban(db, user_id=user_id, ban_type=BanType.AUTO_DEBT, reason=reason, until=until)
 
 
 # alias на случай другого имени в job
 ensure_auto_debt_ban = create_auto_debt_ban
 
 
-def deactivate_auto_debt_bans_if_any(db: Session, *, user_id: int) -> int:
+async def _deactivate_bans(db: AsyncSession, *conditions: Any) -> List[Ban]:
     """
-    Снимает ТОЛЬКО AUTO_DEBT баны.
-    Возвращает количество снятых банов.
+    Снимает активные баны по условиям: active=false, until=now.
     """
     now = _now_utc()
-    bans = (
-        db.query(Ban)
-        .filter(Ban.user_id == user_id, Ban.type == BanType.AUTO_DEBT)
-        .filter(_active_until_filter(now))
-        .all()
+    result = await db.execute(
+        select(Ban).where(*conditions, _active_until_filter(now))
     )
+    bans = list(result.scalars().all())
 
     for b in bans:
         b.active = False
         b.until = now
 
+    return bans
+
+
+async def deactivate_auto_debt_bans_if_any(db: AsyncSession, *, user_id: int) -> int:
+    """
+    Снимает ТОЛЬКО AUTO_DEBT баны.
+    Возвращает количество снятых банов.
+    """
+    bans = await _deactivate_bans(db, Ban.user_id == user_id, Ban.type == BanType.AUTO_DEBT)
+
     if bans:
-        db.commit()
+        await unit_of_work.commit(db)
+        unit_of_work.after_commit(db, lambda: _forget_user(user_id))
 
     return len(bans)
 
 
-def manual_unban_user(db: Session, *, user_id: int) -> int:
+async def manual_unban_user(db: AsyncSession, *, user_id: int) -> int:
     """
     ВОТ ЭТОГО ИМЕНИ ТЕБЕ НЕ ХВАТАЛО.
     admin_billing.py импортирует manual_unban_user.
     Снимает ТОЛЬКО MANUAL баны.
     """
-    now = _now_utc()
-    bans = (
-        db.query(Ban)
-        .filter(Ban.user_id == user_id, Ban.type == BanType.MANUAL)
-        .filter(_active_until_filter(now))
-        .all()
-    )
-
-    for b in bans:
-        b.active = False
-        b.until = now
+    bans = await _deactivate_bans(db, Ban.user_id == user_id, Ban.type == BanType.MANUAL)
 
     if bans:
-        db.commit()
+        await unit_of_work.commit(db)
+        unit_of_work.after_commit(db, lambda: _forget_user(user_id))
 
     return len(bans)
 
 
-def unban_user_if_no_open_debts(db: Session, *, user_id: int) -> int:
+async def unban_user_if_no_open_debts(db: AsyncSession, *, user_id: int) -> int:
     """
     Имя ожидает admin_billing.py:
     снимаем AUTO_DEBT бан, если нет открытых долгов.
@@ -161,30 +211,21 @@ def unban_user_if_no_open_debts(db: Session, *, user_id: int) -> int:
         # если debt_service недоступен  не ломаем приложение
         return 0
 
-    if has_open_debts(db, user_id):
+    if await has_open_debts(db, user_id):
         return 0
 
-    return deactivate_auto_debt_bans_if_any(db, user_id=user_id)
+    return await deactivate_auto_debt_bans_if_any(db, user_id=user_id)
 
 
 # Дополнительно (если где-то зовут так)
-def unban_user(db: Session, *, user_id: int) -> int:
+async def unban_user(db: AsyncSession, *, user_id: int) -> int:
     """
     Снимает ВСЕ активные баны (и MANUAL, и AUTO_DEBT).
     """
-    now = _now_utc()
-    bans = (
-        db.query(Ban)
-        .filter(Ban.user_id == user_id)
-        .filter(_active_until_filter(now))
-        .all()
-    )
-
-    for b in bans:
-        b.active = False
-        b.until = now
+    bans = await _deactivate_bans(db, Ban.user_id == user_id)
 
     if bans:
-        db.commit()
+        await unit_of_work.commit(db)
+        unit_of_work.after_commit(db, lambda: _forget_user(user_id))
 
     return len(bans)
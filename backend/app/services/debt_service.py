@@ -2,10 +2,14 @@
 
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
+from app.db import unit_of_work
+from app.db.counts import total_counter
 from app.models.debt import Debt, DebtStatus
 
 
@@ -13,17 +17,21 @@ def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def has_open_debts(db: Session, user_id: int) -> bool:
+def _open_debt_stmt(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Debt.id)
+        .where(Debt.user_id == user_id, Debt.status == DebtStatus.OPEN)
+        .limit(1)
+    )
+
+
+async def has_open_debts(db: AsyncSession, user_id: int) -> bool:
     """
     True если у пользователя есть хотя бы один OPEN-долг.
     Это имя ожидает enrollment_service.py
     """
-    return (
-        db.query(Debt.id)
-        .filter(Debt.user_id == user_id, Debt.status == DebtStatus.OPEN)
-        .first()
-        is not None
-    )
+    debt_id = await db.scalar(_open_debt_stmt(user_id))
+    return debt_id is not None
 
 
 # ---- Backward-compatible aliases (на случай старых импортов) ----
@@ -31,52 +39,83 @@ user_has_open_debts = has_open_debts
 has_debts = has_open_debts
 
 
-def list_debts(
-    db: Session,
+def _debt_conditions(
     *,
-    user_id: Optional[int] = None,
-    training_id: Optional[int] = None,
-    status: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
-) -> List[Debt]:
-    q = db.query(Debt)
+    user_id: Optional[int],
+    training_id: Optional[int],
+    status: Optional[str],
+) -> list:
+    conditions = []
     if user_id is not None:
-        q = q.filter(Debt.user_id == user_id)
+        conditions.append(Debt.user_id == user_id)
     if training_id is not None:
-        q = q.filter(Debt.training_id == training_id)
+        conditions.append(Debt.training_id == training_id)
     if status is not None:
         # status может прилететь строкой из API
         try:
             status_enum = DebtStatus(status)
-            q = q.filter(Debt.status == status_enum)
+            conditions.append(Debt.status == status_enum)
         except Exception:
-            q = q.filter(Debt.status == status)
-    return q.order_by(Debt.id.desc()).offset(offset).limit(limit).all()
+            conditions.append(Debt.status == status)
+    return conditions
+
+
+async def list_debts(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int] = None,
+    training_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[Debt]:
+    conditions = _debt_conditions(user_id=user_id, training_id=training_id, status=status)
+    result = await db.execute(select(Debt).where(*conditions).order_by(Debt.id.desc()).offset(offset).limit(limit))
+    return list(result.scalars().all())
 
 
-def get_debt(db: Session, debt_id: int) -> Optional[Debt]:
-    return db.query(Debt).filter(Debt.id == debt_id).first()
+async def count_debts(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int] = None,
+    training_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> Tuple[int, str]:
+    """
+    total для админского списка долгов: (total, total_mode), см. app/db/counts.py.
+    """
+    conditions = _debt_conditions(user_id=user_id, training_id=training_id, status=status)
+    return await total_counter.total(
+        db,
+        select(func.count()).select_from(Debt).where(*conditions),
+        table="debts",
+        mode="cached" if conditions else "estimate",
+        key=(user_id, training_id, status),
+    )
+
+
+async def get_debt(db: AsyncSession, debt_id: int) -> Optional[Debt]:
+    return await db.get(Debt, debt_id)
 
 
 get_debt_by_id = get_debt  # alias
 
 
-def get_open_debt_for_training(db: Session, *, user_id: int, training_id: int) -> Optional[Debt]:
-    return (
-        db.query(Debt)
-        .filter(
+async def get_open_debt_for_training(db: AsyncSession, *, user_id: int, training_id: int) -> Optional[Debt]:
+    return await db.scalar(
+        select(Debt)
+        .where(
             Debt.user_id == user_id,
             Debt.training_id == training_id,
             Debt.status == DebtStatus.OPEN,
         )
         .order_by(Debt.id.desc())
-        .first()
+        .limit(1)
     )
 
 
-def create_debt_for_training(
-    db: Session,
+async def create_debt_for_training(
+    db: AsyncSession,
     *,
     user_id: int,
     training_id: int,
@@ -85,7 +124,7 @@ def create_debt_for_training(
     """
     Идемпотентно: если уже есть OPEN-долг по этой тренировке  возвращаем его.
     """
-    existing = get_open_debt_for_training(db, user_id=user_id, training_id=training_id)
+    existing = await get_open_debt_for_training(db, user_id=user_id, training_id=training_id)
     if existing is not None:
         return existing
 
@@ -98,8 +137,8 @@ def create_debt_for_training(
         closed_at=None,
     )
     db.add(debt)
-    db.commit()
-    db.refresh(debt)
+    # id приходит из INSERT ... RETURNING — refresh не нужен
+    await unit_of_work.commit(db)
     return debt
 
 
@@ -108,36 +147,34 @@ ensure_debt_for_training = create_debt_for_training
 create_debt = create_debt_for_training
 
 
-def close_debt_for_training(db: Session, *, user_id: int, training_id: int) -> int:
+async def close_debt_for_training(db: AsyncSession, *, user_id: int, training_id: int) -> int:
     """
     Закрывает OPEN-долги по тренировке.
     Возвращает количество закрытых.
     """
     now = _now_utc()
-    debts = (
-        db.query(Debt)
-        .filter(
+    result = await db.execute(
+        select(Debt).where(
             Debt.user_id == user_id,
             Debt.training_id == training_id,
             Debt.status == DebtStatus.OPEN,
         )
-        .all()
     )
+    debts = list(result.scalars().all())
 
     for d in debts:
         d.status = DebtStatus.CLOSED
         d.closed_at = now
 
     if debts:
-        db.commit()
+        # закрытие долга и снятие автобана — одна транзакция (см. app/db/unit_of_work.py)
+        await unit_of_work.commit(db)
 
-        # если был автобан за долг  снимаем
-        try:
-            from app.services.ban_service import deactivate_auto_debt_bans_if_any
-            deactivate_auto_debt_bans_if_any(db, user_id=user_id)
-        except Exception:
-            # не роняем закрытие долга из-за проблем в бан-сервисе
-            pass
+        # если был автобан за долг  снимаем. Ошибку не глотаем: после
+        # неудачного flush сессия непригодна и общий COMMIT всё равно упадёт,
+        # а долг без снятого автобана — рассогласованное состояние
+        from app.services.ban_service import deactivate_auto_debt_bans_if_any
+        await deactivate_auto_debt_bans_if_any(db, user_id=user_id)
 
     return len(debts)
 
@@ -145,7 +182,7 @@ def close_debt_for_training(db: Session, *, user_id: int, training_id: int) -> i
 close_debt_by_training = close_debt_for_training  # alias
 
 
-def close_debt(db: Session, *args: Any, **kwargs: Any) -> int:
+async def close_debt(db: AsyncSession, *args: Any, **kwargs: Any) -> int:
     """
     ВАЖНО: это имя ожидает admin_billing.py (from debt_service import close_debt).
 
@@ -166,13 +203,13 @@ def close_debt(db: Session, *args: Any, **kwargs: Any) -> int:
         user_id, training_id = args[0], args[1]
 
     if debt_id is not None:
-        d = get_debt(db, int(debt_id))
+        d = await get_debt(db, int(debt_id))
         if d is None:
             return 0
         # Закрываем по связке user_id+training_id (на случай дублей)
-        return close_debt_for_training(db, user_id=d.user_id, training_id=d.training_id)
+        return await close_debt_for_training(db, user_id=d.user_id, training_id=d.training_id)
 
     if user_id is not None and training_id is not None:
-        return close_debt_for_training(db, user_id=int(user_id), training_id=int(training_id))
+        return await close_debt_for_training(db, user_id=int(user_id), training_id=int(training_id))
 
     raise TypeError("close_debt(): expected debt_id OR (user_id, training_id)")
@@ -4,12 +4,16 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Tuple, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
 from app.core.exceptions import AppException
+from app.core.identity_cache import UserSnapshot
+from app.db import unit_of_work
 from app.models.enrollment import Enrollment, EnrollmentStatus
 from app.models.training import Training
-from app.models.user import User
 from app.services.ban_service import has_active_ban
 from app.services.debt_service import has_open_debts
 
@@ -20,12 +24,8 @@ MIN_HOURS_BEFORE_ENROLL = 0
 MIN_HOURS_BEFORE_CANCEL = 0
 
 
-def _ensure_training_exists(db: Session, training_id: int) -> Training:
-    training = (
-        db.query(Training)
-        .filter(Training.id == training_id)
-        .one_or_none()
-    )
+async def _ensure_training_exists(db: AsyncSession, training_id: int) -> Training:
+    training = await db.get(Training, training_id)
     if training is None:
         raise AppException(
             error_code="NOT_FOUND",
@@ -49,10 +49,87 @@ def _check_time_before(start_at: datetime, min_hours: int, *, error_code: str, m
         raise AppException(error_code=error_code, message=message)
 
 
-def enroll_user_to_training(
-    db: Session,
+# Запросы горячего пути записи — через lambda_stmt: конструкция и ключ
+# кэша компиляции вычисляются один раз, на каждом вызове подставляются
+# только параметры.
+def _with_user_stmt(enrollment_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Enrollment)
+        .options(joinedload(Enrollment.user))
+        .where(Enrollment.id == enrollment_id)
+    )
+
+
+def _user_enrollment_stmt(user_id: int, training_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Enrollment).where(
+            Enrollment.user_id == user_id,
+            Enrollment.training_id == training_id,
+        )
+    )
+
+
+def _count_active_stmt(training_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(
+            func.count().filter(Enrollment.is_reserve.is_(False)),
+            func.count().filter(Enrollment.is_reserve.is_(True)),
+        ).where(
+            Enrollment.training_id == training_id,
+            Enrollment.status == EnrollmentStatus.ACTIVE,
+        )
+    )
+
+
+def _first_reserve_stmt(training_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Enrollment)
+        .where(
+            Enrollment.training_id == training_id,
+            Enrollment.is_reserve.is_(True),
+            Enrollment.status == EnrollmentStatus.ACTIVE,
+        )
+        .order_by(Enrollment.created_at.asc())
+        .limit(1)
+    )
+
+
+def _roster_stmt(training_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(Enrollment)
+        .options(selectinload(Enrollment.user))
+        .where(
+            Enrollment.training_id == training_id,
+            Enrollment.status == EnrollmentStatus.ACTIVE,
+        )
+        .order_by(Enrollment.created_at.asc())
+    )
+
+
+async def _load_with_user(db: AsyncSession, enrollment_id: int) -> Enrollment:
+    """
+    Перечитываем запись вместе с пользователем одним SELECT
+    (EnrollmentResponse отдаёт user, а ленивая загрузка в async недоступна).
+    """
+    result = await db.execute(
+        _with_user_stmt(enrollment_id),
+        execution_options={"populate_existing": True},
+    )
+    return result.scalar_one()
+
+
+async def _count_active(db: AsyncSession, training_id: int) -> Tuple[int, int]:
+    """
+    (основа, резерв) — число ACTIVE-записей одним запросом.
+    """
+    row = (await db.execute(_count_active_stmt(training_id))).one()
+    return row[0], row[1]
+
+
+async def enroll_user_to_training(
+    db: AsyncSession,
     *,
-    user: User,
+    user: UserSnapshot,
     training_id: int,
 ) -> Enrollment:
     """
@@ -66,13 +143,13 @@ def enroll_user_to_training(
     """
 
     # ЭТАП 8: запрет при активном бане или открытых долгах
-    if has_active_ban(db, user_id=user.id):
+    if await has_active_ban(db, user_id=user.id):
         raise AppException(error_code="FORBIDDEN", message="Запись недоступна: у вас активный бан")
 
-    if has_open_debts(db, user_id=user.id):
+    if await has_open_debts(db, user_id=user.id):
         raise AppException(error_code="FORBIDDEN", message="Запись недоступна: у вас есть неоплаченный долг")
 
-    training = _ensure_training_exists(db, training_id)
+    training = await _ensure_training_exists(db, training_id)
 
     _check_time_before(
         training.start_at,
@@ -82,14 +159,7 @@ def enroll_user_to_training(
     )
 
     # ВАЖНО: ищем ЛЮБУЮ запись (ACTIVE/CANCELLED), потому что в БД UNIQUE (user_id, training_id)
-    existing_any = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.user_id == user.id,
-            Enrollment.training_id == training.id,
-        )
-        .one_or_none()
-    )
+    existing_any = await db.scalar(_user_enrollment_stmt(user.id, training.id))
 
     if existing_any and existing_any.status == EnrollmentStatus.ACTIVE:
         # как раньше
@@ -99,25 +169,7 @@ def enroll_user_to_training(
         )
 
     # Считаем заполненность (только ACTIVE!)
-    main_count = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.training_id == training.id,
-            Enrollment.is_reserve.is_(False),
-            Enrollment.status == EnrollmentStatus.ACTIVE,
-        )
-        .count()
-    )
-
-    reserve_count = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.training_id == training.id,
-            Enrollment.is_reserve.is_(True),
-            Enrollment.status == EnrollmentStatus.ACTIVE,
-        )
-        .count()
-    )
+    main_count, reserve_count = await _count_active(db, training.id)
 
     if main_count < training.capacity_main:
         is_reserve = False
@@ -138,9 +190,8 @@ def enroll_user_to_training(
         existing_any.created_at = datetime.utcnow()
 
         db.add(existing_any)
-        db.commit()
-        db.refresh(existing_any)
-        return existing_any
+        await unit_of_work.commit(db)
+        return await _load_with_user(db, existing_any.id)
 
     # Если записи не было вообще — создаём новую
     enrollment = Enrollment(
@@ -151,29 +202,24 @@ def enroll_user_to_training(
         is_paid=False,
     )
     db.add(enrollment)
-    db.commit()
-    db.refresh(enrollment)
-    return enrollment
+    await unit_of_work.commit(db)
+    return await _load_with_user(db, enrollment.id)
 
 
-def cancel_enrollment_for_user(
-    db: Session,
+async def cancel_enrollment_for_user(
+    db: AsyncSession,
     *,
-    user: User,
+    user: UserSnapshot,
     enrollment_id: int,
 ) -> Enrollment:
-    enrollment = (
-        db.query(Enrollment)
-        .filter(Enrollment.id == enrollment_id)
-        .one_or_none()
-    )
+    enrollment = await db.get(Enrollment, enrollment_id, options=[joinedload(Enrollment.training)])
     if enrollment is None or enrollment.user_id != user.id:
         raise AppException(
             error_code="NOT_FOUND",
             message="Запись не найдена",
         )
 
-    training = enrollment.training or _ensure_training_exists(db, enrollment.training_id)
+    training = enrollment.training or await _ensure_training_exists(db, enrollment.training_id)
 
     if enrollment.status != EnrollmentStatus.ACTIVE:
         raise AppException(
@@ -191,52 +237,28 @@ def cancel_enrollment_for_user(
     enrollment.status = EnrollmentStatus.CANCELLED
 
     if not enrollment.is_reserve:
-        reserve = (
-            db.query(Enrollment)
-            .filter(
-                Enrollment.training_id == training.id,
-                Enrollment.is_reserve.is_(True),
-                Enrollment.status == EnrollmentStatus.ACTIVE,
-            )
-            .order_by(Enrollment.created_at.asc())
-            .first()
-        )
+        reserve = await db.scalar(_first_reserve_stmt(training.id))
         if reserve:
             reserve.is_reserve = False
             db.add(reserve)
 
     db.add(enrollment)
-    db.commit()
-    db.refresh(enrollment)
-    return enrollment
+    await unit_of_work.commit(db)
+    return await _load_with_user(db, enrollment.id)
 
 
-def get_training_roster(
-    db: Session,
+async def get_training_roster(
+    db: AsyncSession,
     training_id: int,
 ) -> Tuple[List[Enrollment], List[Enrollment]]:
-    _ensure_training_exists(db, training_id)
+    await _ensure_training_exists(db, training_id)
 
-    main = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.training_id == training_id,
-            Enrollment.status == EnrollmentStatus.ACTIVE,
-            Enrollment.is_reserve.is_(False),
-        )
-        .order_by(Enrollment.created_at.asc())
-        .all()
-    )
+    # Основа и резерв одним запросом (+ один selectin за пользователями)
+    result = await db.execute(_roster_stmt(training_id))
 
-    reserve = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.training_id == training_id,
-            Enrollment.status == EnrollmentStatus.ACTIVE,
-            Enrollment.is_reserve.is_(True),
-        )
-        .order_by(Enrollment.created_at.asc())
-        .all()
-    )
+    main: List[Enrollment] = []
+    reserve: List[Enrollment] = []
+    for enrollment in result.scalars():
+        (reserve if enrollment.is_reserve else main).append(enrollment)
 
     return main, reserve
@@ -1,20 +1,18 @@
 # app/services/level_service.py
 from __future__ import annotations
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.level import Level
 
 
-def get_all_levels(db: Session) -> list[Level]:
+async def get_all_levels(db: AsyncSession) -> list[Level]:
     """
     Возвращает список всех уровней.
 
     Сейчас сортируем по id, при желании можно сортировать по полю sort_order,
     если оно есть в модели Level.
     """
-    return (
-        db.query(Level)
-        .order_by(Level.id.asc())
-        .all()
-    )
+    result = await db.execute(select(Level).order_by(Level.id.asc()))
+    return list(result.scalars().all())
@@ -1,11 +1,15 @@
 # backend/app/services/notification_service.py
 from __future__ import annotations
 
+from datetime import timedelta
 from typing import Iterable, Optional, Sequence
 
-from sqlalchemy import func, select, text as sa_text, update
+from sqlalchemy import func, lambda_stmt, select, text as sa_text, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 
+from app.db import unit_of_work
+from app.db.counts import total_counter
 from app.models.notification import Notification
 from app.models.user import User
 
@@ -49,8 +53,8 @@ async def create_notification(
         is_read=False,
     )
     db.add(notif)
-    await db.commit()
-    await db.refresh(notif)
+    # id и created_at (server_default) приходят из INSERT ... RETURNING
+    await unit_of_work.commit(db)
     return notif
 
 
@@ -64,10 +68,19 @@ async def broadcast_notification(
     entity_type: Optional[str] = None,
     entity_id: Optional[int] = None,
     only_active: bool = True,
+    seen_within: Optional[timedelta] = None,
 ) -> int:
+    """
+    Рассылка всем пользователям.
+
+    seen_within — только тем, кто заходил в приложение за этот период
+    (по users.last_seen_at; никогда не заходившие не попадают).
+    """
     q = select(User.id)
     if only_active and hasattr(User, "is_active"):
         q = q.where(User.is_active.is_(True))
+    if seen_within is not None:
+        q = q.where(User.last_seen_at >= func.now() - seen_within)
 
     result = await db.execute(q)
     # result.scalars() -> user_ids
@@ -93,7 +106,7 @@ async def broadcast_notification(
     ]
 
     await db.execute(Notification.__table__.insert(), rows)
-    await db.commit()
+    await unit_of_work.commit(db)
     return len(rows)
 
 
@@ -135,28 +148,38 @@ async def create_notifications_for_training(
         for uid in user_ids
     ]
     await db.execute(Notification.__table__.insert(), rows)
-    await db.commit()
+    await unit_of_work.commit(db)
     return len(rows)
 
 
+def _user_notifications_stmts(
+    user_id: int, limit: int, offset: int
+) -> tuple[StatementLambdaElement, StatementLambdaElement]:
+    total = lambda_stmt(
+        lambda: select(func.count()).select_from(Notification).where(Notification.user_id == user_id)
+    )
+    page = lambda_stmt(
+        lambda: select(Notification)
+        .where(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return total, page
+
+
 async def list_user_notifications(
     db: AsyncSession,
     *,
     user_id: int,
     limit: int,
     offset: int,
-) -> tuple[list[Notification], int]:
-    total = await db.scalar(select(func.count()).select_from(Notification).where(Notification.user_id == user_id))
-    q = (
-        select(Notification)
-        .where(Notification.user_id == user_id)
-        .order_by(Notification.created_at.desc(), Notification.id.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    result = await db.execute(q)
+) -> tuple[list[Notification], int, str]:
+    total_stmt, page_stmt = _user_notifications_stmts(user_id, limit, offset)
+    total, total_mode = await total_counter.total(db, total_stmt, table="notifications", key=user_id)
+    result = await db.execute(page_stmt)
     items = list(result.scalars().all())
-    return items, int(total or 0)
+    return items, total, total_mode
 
 
 async def mark_notification_read(db: AsyncSession, *, user_id: int, notification_id: int) -> bool:
@@ -167,5 +190,5 @@ async def mark_notification_read(db: AsyncSession, *, user_id: int, notification
         .execution_options(synchronize_session=False)
     )
     result = await db.execute(q)
-    await db.commit()
+    await unit_of_work.commit(db)
     return (result.rowcount or 0) > 0
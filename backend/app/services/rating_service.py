@@ -1,46 +1,92 @@
 # app/services/rating_service.py
 from __future__ import annotations
 
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session
+from datetime import timedelta
+from typing import Optional
 
+from sqlalchemy import Interval, and_, func, lambda_stmt, or_, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.core.identity_cache import UserSnapshot
+from app.db import unit_of_work
+from app.db.counts import total_counter
 from app.models.user import User
 from app.models.enrollment import Enrollment, EnrollmentStatus
 from app.models.training import Training
 
 
-def get_leaderboard(
-    db: Session,
+# Запросы таблицы лидеров вызываются постоянно — через lambda_stmt,
+# чтобы не строить и не хэшировать одно и то же выражение на каждый вызов.
+def _leaderboard_stmts(
+    limit: int,
+    offset: int,
+    seen_within: Optional[timedelta],
+) -> tuple[StatementLambdaElement, StatementLambdaElement]:
+    total = lambda_stmt(lambda: select(func.count()).select_from(User).where(User.is_active.is_(True)))
+    page = lambda_stmt(lambda: select(User).where(User.is_active.is_(True)))
+
+    if seen_within is not None:
+        # без type_coerce параметр в lambda получил бы тип timestamp
+        total += lambda s: s.where(User.last_seen_at >= func.now() - type_coerce(seen_within, Interval))
+        page += lambda s: s.where(User.last_seen_at >= func.now() - type_coerce(seen_within, Interval))
+
+    page += lambda s: s.order_by(
+        User.rating.desc(),
+        User.cups.desc(),
+        User.id.asc(),  # детерминированный порядок при равных значениях
+    ).offset(offset).limit(limit)
+    return total, page
+
+
+def _ahead_count_stmt(rating: int, cups: int, user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(func.count())
+        .select_from(User)
+        .where(
+            User.is_active.is_(True),
+            or_(
+                User.rating > rating,
+                and_(User.rating == rating, User.cups > cups),
+                and_(
+                    User.rating == rating,
+                    User.cups == cups,
+                    User.id < user_id,
+                ),
+            ),
+        )
+    )
+
+
+async def get_leaderboard(
+    db: AsyncSession,
     *,
     limit: int = 100,
     offset: int = 0,
-) -> tuple[list[User], int]:
-    """
-    Возвращает пользователей, отсортированных по рейтингу (таблица лидеров)
-    и общее количество активных пользователей.
+    seen_within: Optional[timedelta] = None,
+) -> tuple[list[User], int, str]:
     """
-    base_q = db.query(User).filter(User.is_active.is_(True))
+    Возвращает пользователей, отсортированных по рейтингу (таблица лидеров),
+    общее количество активных пользователей (из кэша COUNT(*), app/db/counts.py)
+    и режим, которым оно получено.
 
-    total = base_q.count()
+    seen_within — только игроки, заходившие в приложение за этот период.
+    """
+    total_stmt, page_stmt = _leaderboard_stmts(limit, offset, seen_within)
 
-    users = (
-        base_q
-        .order_by(
-            User.rating.desc(),
-            User.cups.desc(),
-            User.id.asc(),  # детерминированный порядок при равных значениях
-        )
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    total, total_mode = await total_counter.total(db, total_stmt, table="users", key=("leaderboard", seen_within))
+    result = await db.execute(page_stmt)
+    users = list(result.scalars().all())
 
-    return users, total
+    return users, total, total_mode
 
 
-def get_user_position(db: Session, user: User) -> int:
+async def get_user_position(db: AsyncSession, user: UserSnapshot | User) -> int:
     """
     Вычисляем место пользователя в рейтинге.
+    user — снимок текущего пользователя (/ratings/me) или загруженный
+    User (/ratings/user/{id}): читаем только id, rating, cups, is_active.
     Пользователь A считается выше B, если:
     - rating больше, или
     - rating равен, но cups больше, или
@@ -51,35 +97,23 @@ def get_user_position(db: Session, user: User) -> int:
         # но для простоты считаем место как будто он участвует.
         pass
 
-    ahead_count = (
-        db.query(User)
-        .filter(
-            User.is_active.is_(True),
-            or_(
-                User.rating > user.rating,
-                and_(User.rating == user.rating, User.cups > user.cups),
-                and_(
-                    User.rating == user.rating,
-                    User.cups == user.cups,
-                    User.id < user.id,
-                ),
-            ),
-        )
-        .count()
-    )
+    ahead_count = await db.scalar(_ahead_count_stmt(user.rating, user.cups, user.id))
 
-    return ahead_count + 1
+    return (ahead_count or 0) + 1
 
 
-def get_total_active_users(db: Session) -> int:
+async def get_total_active_users(db: AsyncSession) -> int:
     """
     Общее количество активных пользователей.
     """
-    return db.query(User).filter(User.is_active.is_(True)).count()
+    count = await db.scalar(
+        lambda_stmt(lambda: select(func.count()).select_from(User).where(User.is_active.is_(True)))
+    )
+    return count or 0
 
 
-def recalc_ratings_for_training(
-    db: Session,
+async def recalc_ratings_for_training(
+    db: AsyncSession,
     training: Training,
 ) -> None:
     """
@@ -94,16 +128,17 @@ def recalc_ratings_for_training(
     Эту функцию можно вызывать из админских сценариев,
     когда тренировка завершена и статусы участников зафиксированы.
     """
-    enrollments = (
-        db.query(Enrollment)
-        .filter(
+    result = await db.execute(
+        select(Enrollment)
+        .options(selectinload(Enrollment.user))
+        .where(
             Enrollment.training_id == training.id,
             Enrollment.status.in_(
                 [EnrollmentStatus.ACTIVE, EnrollmentStatus.NO_SHOW]
             ),
         )
-        .all()
     )
+    enrollments = result.scalars().all()
 
     for e in enrollments:
         # На всякий случай проверим, что у юзера есть rating
@@ -115,4 +150,4 @@ def recalc_ratings_for_training(
         elif e.status == EnrollmentStatus.NO_SHOW:
             e.user.rating -= 10
 
-    db.commit()
+    await unit_of_work.commit(db)
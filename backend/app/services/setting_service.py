@@ -5,15 +5,23 @@ from typing import Tuple, List, Optional
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db import unit_of_work
+from app.db.counts import total_counter
 from app.models.setting import Setting
 
 
-async def list_settings(db: AsyncSession, *, limit: int, offset: int) -> Tuple[List[Setting], int]:
-    total = await db.scalar(select(func.count()).select_from(Setting))
+async def list_settings(db: AsyncSession, *, limit: int, offset: int) -> Tuple[List[Setting], int, str]:
+    # список без фильтров: оценка по reltuples, маленькая таблица — кэш COUNT(*)
+    total, total_mode = await total_counter.total(
+        db,
+        select(func.count()).select_from(Setting),
+        table="settings",
+        mode="estimate",
+    )
     q = select(Setting).order_by(Setting.key.asc()).limit(limit).offset(offset)
     res = await db.execute(q)
     items = list(res.scalars().all())
-    return items, int(total or 0)
+    return items, total, total_mode
 
 
 async def get_setting(db: AsyncSession, *, key: str) -> Optional[Setting]:
@@ -33,8 +41,8 @@ async def upsert_setting(db, key: str, value: str, description: str | None):
         s.value = value
         s.description = description
 
-    await db.commit()
-    await db.refresh(s)
+    # id и updated_at приходят через RETURNING (eager_defaults в модели)
+    await unit_of_work.commit(db)
     return s
 
 
@@ -43,5 +51,5 @@ async def delete_setting(db: AsyncSession, *, key: str) -> bool:
     if obj is None:
         return False
     await db.delete(obj)
-    await db.commit()
+    await unit_of_work.commit(db)
     return True
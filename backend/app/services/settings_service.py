@@ -35,8 +35,8 @@ class SettingsService:
             if description is not None:
                 row.description = description
 
+        # серверные поля приходят через RETURNING (eager_defaults у Setting)
         db.commit()
-        db.refresh(row)
         return row
 
     @staticmethod
@@ -4,15 +4,20 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional, Tuple, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.exceptions import AppException
+from app.core.pagination import decode_cursor, encode_cursor, invalid_cursor
+from app.core.schedule_cache import schedule_cache
+from app.db.counts import total_counter
+from app.db import unit_of_work
 from app.models.training import Training
 from app.schemas.training import TrainingCreate, TrainingUpdate
 
 
-def get_training_or_404(db: Session, training_id: int) -> Training:
-    training = db.query(Training).filter(Training.id == training_id).one_or_none()
+async def get_training_or_404(db: AsyncSession, training_id: int) -> Training:
+    training = await db.get(Training, training_id)
     if training is None:
         raise AppException(
             error_code="NOT_FOUND",
@@ -21,7 +26,18 @@ def get_training_or_404(db: Session, training_id: int) -> Training:
     return training
 
 
-def create_training(db: Session, data: TrainingCreate) -> Training:
+async def _commit_schedule_change(db: AsyncSession) -> None:
+    """
+    unit_of_work.commit() для изменений расписания: в той же транзакции —
+    новая версия расписания (и NOTIFY другим воркерам), после COMMIT —
+    сброс кэша страниц этого воркера (app/core/schedule_cache.py).
+    """
+    version = await schedule_cache.bump(db)
+    await unit_of_work.commit(db)
+    unit_of_work.after_commit(db, lambda: schedule_cache.advance(version))
+
+
+async def create_training(db: AsyncSession, data: TrainingCreate) -> Training:
     training = Training(
         title=data.title,
         description=data.description,
@@ -38,12 +54,12 @@ def create_training(db: Session, data: TrainingCreate) -> Training:
         location_id=data.location_id,
     )
     db.add(training)
-    db.commit()
-    db.refresh(training)
+    # id приходит из INSERT ... RETURNING, серверных значений у тренировки нет
+    await _commit_schedule_change(db)
     return training
 
 
-def update_training(db: Session, training: Training, data: TrainingUpdate) -> Training:
+async def update_training(db: AsyncSession, training: Training, data: TrainingUpdate) -> Training:
     """
     Частичное обновление тренировки: только те поля, которые реально пришли в запросе.
     """
@@ -55,25 +71,74 @@ def update_training(db: Session, training: Training, data: TrainingUpdate) -> Tr
             continue
         setattr(training, field, value)
 
-    db.commit()
-    db.refresh(training)
+    # expire_on_commit=False: объект уже актуален, refresh не нужен
+    await _commit_schedule_change(db)
     return training
 
 
-def delete_training(db: Session, training: Training) -> None:
-    db.delete(training)
-    db.commit()
+async def delete_training(db: AsyncSession, training: Training) -> None:
+    await db.delete(training)
+    await _commit_schedule_change(db)
 
 
-def cancel_training(db: Session, training: Training) -> Training:
+async def cancel_training(db: AsyncSession, training: Training) -> Training:
     training.is_cancelled = True
-    db.commit()
-    db.refresh(training)
+    await _commit_schedule_change(db)
     return training
 
 
-def list_trainings(
-    db: Session,
+def _training_conditions(
+    *,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    location_id: Optional[int],
+    coach_name: Optional[str],
+    min_level_name: Optional[str],
+    max_level_name: Optional[str],
+    include_cancelled: bool,
+) -> list:
+    conditions = []
+
+    if date_from is not None:
+        conditions.append(Training.start_at >= date_from)
+    if date_to is not None:
+        conditions.append(Training.start_at <= date_to)
+
+    if location_id is not None:
+        conditions.append(Training.location_id == location_id)
+
+    if coach_name:
+        # регистронезависимый поиск по имени тренера
+        conditions.append(Training.coach_name.ilike(f"%{coach_name}%"))
+
+    if min_level_name:
+        conditions.append(Training.min_level_name == min_level_name)
+    if max_level_name:
+        conditions.append(Training.max_level_name == max_level_name)
+
+    if not include_cancelled:
+        conditions.append(Training.is_cancelled.is_(False))
+
+    return conditions
+
+
+def training_cursor(training: Training) -> str:
+    return encode_cursor([training.start_at, training.id])
+
+
+def _parse_training_cursor(cursor: str) -> Tuple[datetime, int]:
+    start_at, training_id = decode_cursor(cursor, 2)
+    try:
+        start_at = datetime.fromisoformat(start_at)
+    except (TypeError, ValueError):
+        raise invalid_cursor() from None
+    if not isinstance(training_id, int) or isinstance(training_id, bool):
+        raise invalid_cursor()
+    return start_at, training_id
+
+
+async def list_trainings(
+    db: AsyncSession,
     *,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
@@ -84,40 +149,88 @@ def list_trainings(
     include_cancelled: bool = False,
     limit: int = 20,
     offset: int = 0,
-) -> Tuple[List[Training], int]:
+) -> Tuple[List[Training], int, str]:
     """
     Список тренировок с фильтрами и пагинацией.
-    Возвращает (items, total).
+    Возвращает (items, total, total_mode): total — из кэша по набору
+    фильтров, для полного списка без фильтров — оценка по reltuples.
     """
-    query = db.query(Training)
-
-    if date_from is not None:
-        query = query.filter(Training.start_at >= date_from)
-    if date_to is not None:
-        query = query.filter(Training.start_at <= date_to)
+    conditions = _training_conditions(
+        date_from=date_from,
+        date_to=date_to,
+        location_id=location_id,
+        coach_name=coach_name,
+        min_level_name=min_level_name,
+        max_level_name=max_level_name,
+        include_cancelled=include_cancelled,
+    )
 
-    if location_id is not None:
-        query = query.filter(Training.location_id == location_id)
+    total, total_mode = await total_counter.total(
+        db,
+        select(func.count()).select_from(Training).where(*conditions),
+        table="trainings",
+        mode="cached" if conditions else "estimate",
+        key=(date_from, date_to, location_id, coach_name, min_level_name, max_level_name, include_cancelled),
+    )
 
-    if coach_name:
-        # регистронезависимый поиск по имени тренера
-        query = query.filter(Training.coach_name.ilike(f"%{coach_name}%"))
+    # id — для стабильного порядка тренировок с одинаковым start_at
+    # (и того же порядка, что у курсорного режима)
+    result = await db.execute(
+        select(Training)
+        .where(*conditions)
+        .order_by(Training.start_at.asc(), Training.id.asc())
+        .offset(offset)
+        .limit(limit)
+    )
+    items = list(result.scalars().all())
 
-    if min_level_name:
-        query = query.filter(Training.min_level_name == min_level_name)
-    if max_level_name:
-        query = query.filter(Training.max_level_name == max_level_name)
+    return items, total, total_mode
 
-    if not include_cancelled:
-        query = query.filter(Training.is_cancelled.is_(False))
 
-    total = query.count()
+async def list_trainings_after(
+    db: AsyncSession,
+    *,
+    cursor: Optional[str],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    location_id: Optional[int] = None,
+    coach_name: Optional[str] = None,
+    min_level_name: Optional[str] = None,
+    max_level_name: Optional[str] = None,
+    include_cancelled: bool = False,
+    limit: int = 20,
+) -> Tuple[List[Training], Optional[str], bool]:
+    """
+    Keyset-пагинация расписания по (start_at, id).
+    Возвращает (items, next_cursor, has_more).
 
-    items = (
-        query.order_by(Training.start_at.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    Страница после курсора читается по индексу (start_at, id) с того места,
+    где закончилась предыдущая, — одинаково быстро на любой глубине;
+    total не считается, о следующей странице говорит лишняя (limit + 1) строка.
+    cursor=None — первая страница.
+    """
+    conditions = _training_conditions(
+        date_from=date_from,
+        date_to=date_to,
+        location_id=location_id,
+        coach_name=coach_name,
+        min_level_name=min_level_name,
+        max_level_name=max_level_name,
+        include_cancelled=include_cancelled,
+    )
+    if cursor is not None:
+        start_at, training_id = _parse_training_cursor(cursor)
+        conditions.append(tuple_(Training.start_at, Training.id) > tuple_(start_at, training_id))
+
+    result = await db.execute(
+        select(Training)
+        .where(*conditions)
+        .order_by(Training.start_at.asc(), Training.id.asc())
+        .limit(limit + 1)
     )
+    items = list(result.scalars().all())
 
-    return items, total
+    has_more = len(items) > limit
+    del items[limit:]
+    next_cursor = training_cursor(items[-1]) if has_more else None
+    return items, next_cursor, has_more
@@ -3,9 +3,15 @@ from __future__ import annotations
 
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, false, func, or_, select, true, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.core.exceptions import AppException
+from app.core.identity_cache import UserSnapshot, identity_cache
+from app.core.session_tokens import revoke_user_tokens
+from app.db import unit_of_work
 from app.models.user import User
 from app.schemas.user import UserProfileUpdate
 
@@ -43,133 +49,216 @@ def normalize_phone(raw_phone: str) -> str:
 
 
 # --------- Создание/обновление пользователя из Telegram --------- #
-def get_or_create_user_from_telegram(
-    db: Session,
+# Поля, которые при логине заполняем из Telegram, только если они пустые
+_TELEGRAM_FILL_FIELDS = ("username", "first_name", "last_name")
+
+
+async def upsert_user_from_telegram(
+    db: AsyncSession,
     *,
     telegram_id: int | str,
     username: Optional[str],
     first_name: Optional[str],
     last_name: Optional[str],
-    phone: Optional[str] = None,
 ) -> User:
     """
-    Создаёт или обновляет пользователя по данным из Telegram.
-    Вызывается из middleware после успешной валидации initData.
+    Создаёт или обновляет пользователя по данным из Telegram (вызывается
+    из авторизации после успешной валидации initData).
+
+    Один SQL-запрос: INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING.
+    UPDATE срабатывает только если есть пустое поле, которое Telegram может заполнить
+    (как и раньше — вручную изменённый профиль не перезатираем).
+    Если ничего не поменялось, строка берётся обычным SELECT в том же запросе,
+    и COMMIT не выполняется вовсе. Проигравший гонку первого логина (та же
+    строка вставлена параллельным запросом) дочитывает её отдельным SELECT.
+
+    Запись фиксируется сразу, в обход единицы работы запроса: пользователь
+    уходит в identity cache и должен остаться в БД, даже если сам запрос
+    закончится ошибкой и его изменения откатятся.
     """
     telegram_id_int = int(telegram_id)
+    users = User.__table__
 
-    user = (
-        db.query(User)
-        .filter(User.telegram_id == telegram_id_int)
-        .one_or_none()
+    ins = pg_insert(users).values(
+        telegram_id=telegram_id_int,
+        username=username,
+        first_name=first_name,
+        last_name=last_name,
+        is_active=True,
     )
+    excluded = ins.excluded
 
-    normalized_phone: Optional[str] = None
-    if phone:
-        normalized_phone = normalize_phone(phone)
-
-    if user is None:
-        # новый пользователь – заполняем всё, что пришло из Telegram
-        user = User(
-            telegram_id=telegram_id_int,
-            username=username,
-            first_name=first_name,
-            last_name=last_name,
-            phone=normalized_phone,
-            is_active=True,
+    set_ = {
+        # NULL / '' в БД -> берём непустое значение из Telegram
+        name: func.coalesce(
+            func.nullif(users.c[name], ""),
+            func.nullif(excluded[name], ""),
+            users.c[name],
         )
-        db.add(user)
-    else:
-        # существующий пользователь:
-        # НЕ перезатираем вручную изменённый профиль данными из Telegram
-        if username is not None and not user.username:
-            user.username = username or user.username
-
-        if first_name is not None and not user.first_name:
-            user.first_name = first_name or user.first_name
-
-        if last_name is not None and not user.last_name:
-            user.last_name = last_name or user.last_name
-
-        # телефон из Telegram используем только если у пользователя ещё нет телефона
-        if normalized_phone and not user.phone:
-            other = (
-                db.query(User)
-                .filter(
-                    User.phone == normalized_phone,
-                    User.id != user.id,
-                )
-                .one_or_none()
+        for name in _TELEGRAM_FILL_FIELDS
+    }
+    # onupdate для ON CONFLICT не срабатывает — выставляем руками
+    set_["updated_at"] = func.now()
+
+    needs_fill = or_(
+        *[
+            and_(
+                func.coalesce(users.c[name], "") == "",
+                func.coalesce(excluded[name], "") != "",
             )
-            if not other:
-                user.phone = normalized_phone
+            for name in _TELEGRAM_FILL_FIELDS
+        ]
+    )
+
+    upserted = (
+        ins.on_conflict_do_update(
+            index_elements=[users.c.telegram_id],
+            set_=set_,
+            where=needs_fill,
+        )
+        .returning(*users.c, true().label("written"))
+        .cte("upserted")
+    )
+
+    # Если INSERT/UPDATE ничего не вернул — пользователь уже есть и менять нечего
+    unchanged = select(*users.c, false().label("written")).where(
+        users.c.telegram_id == telegram_id_int,
+        ~exists(select(upserted.c.id)),
+    )
+
+    rows = union_all(
+        select(*[upserted.c[col.name] for col in users.c], upserted.c.written),
+        unchanged,
+    ).subquery("u")
+
+    result = await db.execute(select(aliased(User, rows), rows.c.written))
+    row = result.one_or_none()
+    if row is None:
+        # Параллельный первый логин: INSERT упёрся в строку, которую только что
+        # вставил другой запрос, заполнять нечего, а SELECT выше видит снимок
+        # до его COMMIT. Новый запрос (READ COMMITTED) строку уже видит.
+        user = (await db.execute(select(User).where(User.telegram_id == telegram_id_int))).scalar_one()
+        return user
+
+    user, written = row
+    if written:
+        await db.commit()
 
-    db.commit()
-    db.refresh(user)
     return user
 
 
 # --------- Обновление профиля пользователя через API --------- #
-def update_user_profile(
-    db: Session,
-    user: User,
+async def update_user_profile(
+    db: AsyncSession,
+    user: UserSnapshot,
     data: UserProfileUpdate,
-) -> User:
+) -> UserSnapshot:
     """
     Обновляет профиль (имя, телефон, пол, дата рождения, уровень и т.п.).
-    ВАЖНО: current_user приходит из другой сессии (из middleware),
-    поэтому сначала "прикрепляем" его к текущей сессии через merge().
-    """
 
-    # Гарантируем, что объект user прикреплён к сессии db
-    user = db.merge(user)
+    current_user — неизменяемый снимок из identity cache, к сессии его не
+    прикрепляем: делаем один UPDATE ... RETURNING по id (без merge() и
+    лишнего SELECT), а свежий снимок сразу кладём обратно в кэш.
+    """
+    values: dict = {}
 
     # Имя / фамилия / username
     if data.first_name is not None:
-        user.first_name = data.first_name.strip() or None
+        values["first_name"] = data.first_name.strip() or None
 
     if data.last_name is not None:
-        user.last_name = data.last_name.strip() or None
+        values["last_name"] = data.last_name.strip() or None
 
     if data.username is not None:
-        user.username = data.username.strip() or None
+        values["username"] = data.username.strip() or None
 
     # Телефон
     if data.phone is not None:
         normalized_phone = normalize_phone(data.phone)
 
-        other = (
-            db.query(User)
-            .filter(
+        other = await db.scalar(
+            select(User.id)
+            .where(
                 User.phone == normalized_phone,
                 User.id != user.id,
             )
-            .one_or_none()
+            .limit(1)
         )
-        if other:
+        if other is not None:
             raise AppException(
                 error_code="BAD_REQUEST",
                 message="Этот телефон уже используется другим пользователем",
             )
 
-        user.phone = normalized_phone
+        values["phone"] = normalized_phone
 
     # Пол
     if data.gender is not None:
-        user.gender = data.gender
+        values["gender"] = data.gender
 
     # Дата рождения
     if data.birth_date is not None:
-        user.birth_date = data.birth_date
+        values["birth_date"] = data.birth_date
 
     # Уровень
     if data.level_id is not None:
-        user.level_id = data.level_id
+        values["level_id"] = data.level_id
 
     # Флаг видимости Telegram
     if data.is_telegram_public is not None:
-        user.is_telegram_public = data.is_telegram_public
+        values["is_telegram_public"] = data.is_telegram_public
+
+    if not values:
+        return user
+
+    updated = (await db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(**values)
+        .returning(User)
+    )).scalar_one_or_none()
+    if updated is None:
+        raise AppException(
+            error_code="NOT_FOUND",
+            message="Пользователь не найден",
+        )
+
+    snapshot = UserSnapshot.from_user(updated)
+    await unit_of_work.commit(db)
+
+    # write-through: в кэше сразу актуальная версия (после COMMIT)
+    unit_of_work.after_commit(db, lambda: identity_cache.put(snapshot))
+    return snapshot
+
+
+# --------- Флаг администратора --------- #
+async def set_user_admin_flag(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    is_admin: bool,
+) -> Optional[User]:
+    """
+    Выдаёт / снимает права администратора.
+    Выпущенные ранее сессионные токены содержат is_admin, поэтому отзываем их,
+    а закэшированного пользователя сбрасываем.
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_admin=is_admin)
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
+    if user is None:
+        # UPDATE ничего не изменил; откатывать общую сессию запроса незачем
+        return None
+
+    await unit_of_work.commit(db)
+
+    def _forget() -> None:
+        revoke_user_tokens(user.id)
+        identity_cache.invalidate(user.telegram_id)
 
-    db.commit()
-    db.refresh(user)
+    unit_of_work.after_commit(db, _forget)
     return user
@@ -0,0 +1,63 @@
+# migrations/concurrent_indexes.py
+"""
+Общие помощники миграций для индексов, которые строятся CONCURRENTLY.
+
+Индекс описывается кортежем (имя, таблица, колонки, условие частичного
+индекса или None). CREATE/DROP INDEX CONCURRENTLY нельзя выполнять в
+транзакции, поэтому помощники сами открывают autocommit_block.
+Повторный запуск безопасен: валидный индекс пропускается, невалидный
+(остался после прерванного CONCURRENTLY) пересоздаётся.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+IndexSpec = Tuple[str, str, List[Union[str, sa.TextClause]], Optional[str]]
+
+
+def index_valid(bind, index_name: str) -> Optional[bool]:
+    """
+    None — индекса нет; False — остался невалидным после прерванного CONCURRENTLY.
+    """
+    return bind.execute(
+        sa.text(
+            """
+            SELECT i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name
+            """
+        ),
+        {"name": index_name},
+    ).scalar()
+
+
+def create_indexes(indexes: Sequence[IndexSpec]) -> None:
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in indexes:
+            valid = index_valid(bind, name)
+            if valid:
+                continue
+            if valid is False:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def drop_indexes(indexes: Iterable[IndexSpec]) -> None:
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in indexes:
+            if index_valid(bind, name) is not None:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
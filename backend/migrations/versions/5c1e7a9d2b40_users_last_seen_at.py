@@ -0,0 +1,56 @@
+"""users.last_seen_at
+
+Revision ID: 5c1e7a9d2b40
+Revises: 188cb79f8ead
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1e7a9d2b40"
+down_revision: Union[str, Sequence[str], None] = "188cb79f8ead"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _col_exists(insp, table_name: str, col_name: str) -> bool:
+    cols = {c["name"] for c in insp.get_columns(table_name)}
+    return col_name in cols
+
+
+def _index_exists(insp, table_name: str, index_name: str) -> bool:
+    idx = {i["name"] for i in insp.get_indexes(table_name)}
+    return index_name in idx
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = inspect(bind)
+
+    # Колонка без default: у существующих пользователей активность неизвестна (NULL)
+    if not _col_exists(insp, "users", "last_seen_at"):
+        op.add_column(
+            "users",
+            sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True),
+        )
+
+    if not _index_exists(insp, "users", "ix_users_last_seen_at"):
+        op.create_index("ix_users_last_seen_at", "users", ["last_seen_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = inspect(bind)
+
+    if _index_exists(insp, "users", "ix_users_last_seen_at"):
+        op.drop_index("ix_users_last_seen_at", table_name="users")
+
+    if _col_exists(insp, "users", "last_seen_at"):
+        op.drop_column("users", "last_seen_at")
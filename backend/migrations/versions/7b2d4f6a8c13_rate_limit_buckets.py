@@ -0,0 +1,37 @@
+"""rate_limit_buckets
+
+Revision ID: 7b2d4f6a8c13
+Revises: 5c1e7a9d2b40
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2d4f6a8c13"
+down_revision: Union[str, Sequence[str], None] = "5c1e7a9d2b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Общие вёдра лимитера (RATE_LIMIT_BACKEND=postgres).
+    # UNLOGGED: данные эфемерные, WAL на каждую попытку запроса не нужен;
+    # после аварийного рестарта таблица просто окажется пустой.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+            key text PRIMARY KEY,
+            tokens double precision NOT NULL,
+            updated_at timestamptz NOT NULL DEFAULT clock_timestamp()
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS rate_limit_buckets")
@@ -0,0 +1,53 @@
+"""hot path indexes: enrollments, trainings, bans, debts
+
+Revision ID: 9c3e5a7b1d24
+Revises: 7b2d4f6a8c13
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from migrations.concurrent_indexes import create_indexes, drop_indexes
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3e5a7b1d24"
+down_revision: Union[str, Sequence[str], None] = "7b2d4f6a8c13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+#
+# Статусы-enum в запросах приходят параметром (status = $1), а по параметру
+# планировщик не может доказать условие частичного индекса в generic-плане
+# (psycopg готовит запрос на сервере после prepare_threshold выполнений) —
+# поэтому они в ключе индекса. Частичные условия — только там, где в SQL
+# литерал: is_cancelled IS false, active IS true.
+INDEXES = [
+    # состав, заполненность, первый в резерве: training_id + status + is_reserve, по created_at
+    (
+        "ix_enrollments_training_status_reserve",
+        "enrollments",
+        ["training_id", "status", "is_reserve", "created_at"],
+        None,
+    ),
+    # публичное расписание: только неотменённые, по (start_at, id) — порядок
+    # страницы и условие курсора (start_at, id) > (:start_at, :id)
+    ("ix_trainings_start_at_id_active", "trainings", ["start_at", "id"], "is_cancelled IS false"),
+    # админский список (с отменёнными) и фильтры по датам
+    ("ix_trainings_start_at_id", "trainings", ["start_at", "id"], None),
+    # has_active_ban: user_id + active IS true + until
+    ("ix_bans_user_active", "bans", ["user_id", "until"], "active IS true"),
+    # has_open_debts: user_id + status
+    ("ix_debts_user_status", "debts", ["user_id", "status"], None),
+]
+
+
+def upgrade() -> None:
+    create_indexes(INDEXES)
+
+
+def downgrade() -> None:
+    drop_indexes(reversed(INDEXES))
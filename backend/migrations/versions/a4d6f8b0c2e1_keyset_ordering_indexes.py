@@ -0,0 +1,53 @@
+"""ordering indexes: leaderboard, notifications, audit logs
+
+Revision ID: a4d6f8b0c2e1
+Revises: 9c3e5a7b1d24
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from migrations.concurrent_indexes import create_indexes, drop_indexes
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d6f8b0c2e1"
+down_revision: Union[str, Sequence[str], None] = "9c3e5a7b1d24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+# Порядок колонок совпадает с ORDER BY запросов: страница читается из индекса
+# сразу в нужном порядке и обрывается на LIMIT, без сортировки всей выборки.
+INDEXES = [
+    # get_leaderboard: WHERE is_active ORDER BY rating DESC, cups DESC, id
+    (
+        "ix_users_leaderboard",
+        "users",
+        [sa.text("rating DESC"), sa.text("cups DESC"), "id"],
+        "is_active IS true",
+    ),
+    # list_user_notifications: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    (
+        "ix_notifications_user_created",
+        "notifications",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        None,
+    ),
+    # list_audit_logs: ORDER BY id DESC с фильтрами (без фильтров хватает PK)
+    ("ix_audit_logs_user_recent", "audit_logs", ["user_id", "id"], None),
+    ("ix_audit_logs_action_recent", "audit_logs", ["action", "id"], None),
+    ("ix_audit_logs_entity_recent", "audit_logs", ["entity", "entity_id", "id"], None),
+]
+
+
+def upgrade() -> None:
+    create_indexes(INDEXES)
+
+
+def downgrade() -> None:
+    drop_indexes(reversed(INDEXES))
@@ -0,0 +1,29 @@
+"""schedule version sequence for the schedule page cache
+
+Revision ID: c6e8a0b2d4f6
+Revises: a4d6f8b0c2e1
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6e8a0b2d4f6"
+down_revision: Union[str, Sequence[str], None] = "a4d6f8b0c2e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Версия расписания (app/core/schedule_cache.py): create/update/cancel/
+    # delete_training берут nextval и рассылают его через NOTIFY; воркер,
+    # пропустивший уведомления, догоняет версию по last_value
+    op.execute("CREATE SEQUENCE IF NOT EXISTS schedule_version_seq")
+
+
+def downgrade() -> None:
+    op.execute("DROP SEQUENCE IF EXISTS schedule_version_seq")
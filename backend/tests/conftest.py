@@ -0,0 +1,159 @@
+# tests/conftest.py
+"""
+Общие фикстуры тестов.
+
+Тесты идут против настоящего Postgres из DATABASE_URL с применёнными
+миграциями (alembic upgrade head) — как и tools/. Если БД недоступна,
+тесты, которым она нужна, пропускаются.
+
+Всё, что тест заводит (пользователи, тренировки), живёт под отдельными
+telegram_id / coach_name и удаляется в teardown фикстур (записи, долги и
+баны уходят каскадом).
+
+Запуск (из каталога backend):
+    python -m pytest -q
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List
+from urllib.parse import quote
+
+# Настройки читаются при импорте app — задаём обязательные до него
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:TESTTOKEN")
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.telegram_auth import _compute_hash
+from app.db.session import SQLALCHEMY_DATABASE_URL
+
+# telegram_id тестовых пользователей: вне диапазона настоящих и tools/
+TEST_TELEGRAM_ID_BASE = 8_800_000_000
+_telegram_ids = itertools.count(TEST_TELEGRAM_ID_BASE + (os.getpid() % 1000) * 10_000)
+
+
+def make_init_data(telegram_id: int, **user_fields: str) -> str:
+    """
+    Подписанная строка initData Telegram WebApp для telegram_id
+    (как tools/generate_init_data.py).
+    """
+    user = {"id": telegram_id, "first_name": "Test", "username": f"test_{telegram_id}", **user_fields}
+    data = {
+        "user": json.dumps(user, ensure_ascii=False, separators=(",", ":")),
+        "auth_date": str(int(time.time())),
+        "query_id": "TEST_QUERY_ID",
+    }
+    hash_value = _compute_hash(data, settings.telegram_bot_token)
+    return "&".join(f"{k}={quote(v, safe='')}" for k, v in data.items()) + f"&hash={hash_value}"
+
+
+@pytest.fixture(scope="session")
+def db_engine() -> Iterator[Engine]:
+    """
+    Синхронный движок для подготовки и уборки данных (NullPool: соединения
+    не держатся между тестами и не пересекаются с пулами приложения).
+    """
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1 FROM alembic_version"))
+    except Exception as exc:
+        engine.dispose()
+        pytest.skip(f"Postgres from DATABASE_URL is unavailable or not migrated: {exc}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(db_engine: Engine) -> Iterator[TestClient]:
+    """
+    Клиент на всю сессию: lifespan (LISTEN кэша расписания, activity
+    tracker) запускается один раз, пулы живут в одном event loop.
+    """
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(db_engine: Engine) -> Iterator[Callable[..., Dict[str, str]]]:
+    """
+    Фабрика тестовых пользователей: возвращает заголовки авторизации.
+    Пользователь создаётся первым запросом (upsert при авторизации) или
+    заранее, если нужны флаги (is_admin=True).
+    """
+    created: List[int] = []
+
+    def _make(*, is_admin: bool = False) -> Dict[str, str]:
+        telegram_id = next(_telegram_ids)
+        created.append(telegram_id)
+        if is_admin:
+            with db_engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO users (telegram_id, username, first_name, is_admin) "
+                        "VALUES (:tg, :username, 'Test', true)"
+                    ),
+                    {"tg": telegram_id, "username": f"test_{telegram_id}"},
+                )
+        return {"X-Telegram-Init-Data": make_init_data(telegram_id)}
+
+    yield _make
+
+    if created:
+        with db_engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE telegram_id = ANY(:ids)"), {"ids": created})
+
+
+@pytest.fixture
+def coach_name(db_engine: Engine) -> Iterator[str]:
+    """
+    Уникальный coach_name теста: фильтр расписания по нему видит только
+    тренировки этого теста. В teardown они удаляются.
+    """
+    name = f"pytest-{uuid.uuid4().hex[:12]}"
+    yield name
+    with db_engine.begin() as conn:
+        conn.execute(text("DELETE FROM trainings WHERE coach_name = :coach"), {"coach": name})
+
+
+@pytest.fixture
+def make_trainings(db_engine: Engine, coach_name: str) -> Callable[..., List[int]]:
+    """
+    Наливает тренировки напрямую SQL (без версии расписания — кэш страниц
+    об этом не узнает, ключи тестов различаются coach_name).
+    starts — смещения начала от «сейчас + 1 день»; cancelled — индексы
+    отменённых. Возвращает id в порядке starts.
+    """
+
+    def _make(starts: List[timedelta], *, cancelled: tuple = ()) -> List[int]:
+        base = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+        ids: List[int] = []
+        with db_engine.begin() as conn:
+            for i, delta in enumerate(starts):
+                ids.append(
+                    conn.execute(
+                        text(
+                            "INSERT INTO trainings (title, start_at, duration_minutes, price, "
+                            "capacity_main, capacity_reserve, is_cancelled, coach_name) "
+                            "VALUES ('pytest', :start_at, 90, 0, 12, 4, :cancelled, :coach) RETURNING id"
+                        ),
+                        {"start_at": base + delta, "cancelled": i in cancelled, "coach": coach_name},
+                    ).scalar_one()
+                )
+        return ids
+
+    return _make
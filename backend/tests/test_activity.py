@@ -0,0 +1,119 @@
+# tests/test_activity.py
+"""
+Сброс last_seen_at (app/core/activity.py): пачка отметок не теряется ни при
+ошибке, ни при отмене посреди UPDATE, ни при остановке воркера.
+
+Сессия БД подменяется: важно, когда именно сброс прерывается.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+import app.core.activity as activity_module
+from app.core.activity import ActivityTracker
+
+
+class _FakeSession:
+    def __init__(self, db: "_FakeDB") -> None:
+        self.db = db
+        self.rows = 0
+
+    async def __aenter__(self) -> "_FakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        return False
+
+    async def execute(self, statement) -> None:
+        self.db.started.set()
+        if self.db.fail is not None:
+            raise self.db.fail
+        await self.db.gate.wait()
+        self.rows += len(statement.compile().params) // 2
+
+    async def commit(self) -> None:
+        self.db.committed.append(self.rows)
+
+
+class _FakeDB:
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+        self.started = asyncio.Event()
+        self.committed: List[int] = []
+        self.fail: Optional[Exception] = None
+
+    def __call__(self) -> _FakeSession:
+        return _FakeSession(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def _install() -> _FakeDB:
+        db = _FakeDB()
+        monkeypatch.setattr(activity_module, "async_session_maker", db)
+        return db
+
+    return _install
+
+
+def test_failed_flush_keeps_batch(fake_db):
+    async def scenario():
+        db = fake_db()
+        db.fail = RuntimeError("db down")
+        tracker = ActivityTracker(flush_interval_seconds=0)
+        tracker.touch(1, seen_at=100.0)
+
+        assert await tracker.flush() == 0
+        return tracker
+
+    tracker = asyncio.run(scenario())
+    assert tracker._pending == {1: 100.0}
+    assert tracker.failures == 1
+
+
+def test_cancelled_flush_keeps_batch(fake_db):
+    async def scenario():
+        db = fake_db()
+        tracker = ActivityTracker(flush_interval_seconds=0)
+        tracker.touch(1, seen_at=100.0)
+        tracker.touch(2, seen_at=100.0)
+
+        flushing = asyncio.create_task(tracker.flush())
+        await db.started.wait()
+        # пока UPDATE в полёте, пришла более свежая отметка
+        tracker.touch(1, seen_at=200.0)
+        flushing.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flushing
+        return tracker, db
+
+    tracker, db = asyncio.run(scenario())
+    assert db.committed == []
+    assert tracker._pending == {1: 200.0, 2: 100.0}
+
+
+def test_stop_waits_for_flush_in_progress(fake_db):
+    async def scenario():
+        db = fake_db()
+        tracker = ActivityTracker(flush_interval_seconds=3600, max_pending=2)
+        tracker.start()
+        tracker.touch(1, seen_at=100.0)
+        tracker.touch(2, seen_at=100.0)  # буфер полон — фоновый сброс досрочно
+        await db.started.wait()
+
+        stopping = asyncio.create_task(tracker.stop())
+        await asyncio.sleep(0.05)
+        tracker.touch(3, seen_at=100.0)
+        db.gate.set()
+        await asyncio.wait_for(stopping, timeout=5)
+        return tracker, db
+
+    tracker, db = asyncio.run(scenario())
+    # начатая пачка дописана, отметка во время остановки — финальным сбросом
+    assert db.committed == [2, 1]
+    assert tracker._pending == {}
+    assert tracker._task is None
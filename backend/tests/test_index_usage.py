@@ -0,0 +1,33 @@
+# tests/test_index_usage.py
+"""
+Горячие запросы сервисов идут по индексам (tools/check_index_usage.py).
+
+Тот же прогон, что и у скрипта: синтетические данные в откатываемой
+транзакции, EXPLAIN с обычным и generic-планом. Медленный (~20 с на
+объёме по умолчанию — на меньшем часть проверок теряет смысл).
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.session import ASYNC_SQLALCHEMY_DATABASE_URL
+from tools.check_index_usage import DEFAULT_TRAININGS, DEFAULT_USERS, run_checks
+
+
+def test_hot_queries_use_indexes(db_engine):
+    async def checks():
+        engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+        try:
+            return await run_checks(engine, users=DEFAULT_USERS, trainings=DEFAULT_TRAININGS)
+        finally:
+            await engine.dispose()
+
+    results = asyncio.run(checks())
+
+    assert results
+    failed = [str(result) for result in results if not result.ok]
+    assert not failed, "\n".join(failed)
@@ -0,0 +1,94 @@
+# tests/test_query_budgets.py
+"""
+Бюджеты запросов к БД на горячих эндпоинтах (QUERY_BUDGETS, app/db/query_stats.py).
+
+Каждый эндпоинт из QUERY_BUDGETS вызывается по-настоящему, и проверяется
+заголовок X-DB-Queries: число запросов не больше бюджета, а X-DB-Query-Budget
+(превышение) не выставлен. Новый бюджет без проверки здесь роняет
+test_every_budget_is_exercised.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Dict, Set
+
+import pytest
+
+from app.core.config import settings
+from app.db.query_stats import QUERY_BUDGETS
+
+_checked: Set[str] = set()
+
+
+def _assert_budget(response, endpoint: str) -> None:
+    assert response.status_code == 200, response.text
+    used = int(response.headers["X-DB-Queries"])
+    budget = QUERY_BUDGETS[endpoint]
+    assert used <= budget, f"{endpoint}: {used} queries, budget {budget}"
+    assert "X-DB-Query-Budget" not in response.headers
+    _checked.add(endpoint)
+
+
+@pytest.fixture
+def user(make_user) -> Dict[str, str]:
+    return make_user()
+
+
+@pytest.fixture
+def training_id(make_trainings) -> int:
+    return make_trainings([timedelta(hours=2)])[0]
+
+
+@pytest.mark.parametrize("warm", [False, True], ids=["first-request", "repeat"])
+def test_read_endpoints_within_budget(client, user, training_id, coach_name, monkeypatch, warm):
+    # Бюджет — на путь с БД: попадание в кэш страниц расписания его не проверяет
+    monkeypatch.setattr(settings, "schedule_cache", False)
+    if warm:
+        client.get("/api/v1/profile/me", headers=user)
+
+    _assert_budget(client.get("/api/v1/profile/me", headers=user), "GET /api/v1/profile/me")
+    _assert_budget(
+        client.get("/api/v1/trainings", params={"coach_name": coach_name}, headers=user),
+        "GET /api/v1/trainings",
+    )
+    _assert_budget(
+        client.get(f"/api/v1/trainings/{training_id}", headers=user),
+        "GET /api/v1/trainings/{training_id}",
+    )
+    _assert_budget(
+        client.get("/api/v1/ratings/leaderboard", headers=user),
+        "GET /api/v1/ratings/leaderboard",
+    )
+    _assert_budget(client.get("/api/v1/ratings/me", headers=user), "GET /api/v1/ratings/me")
+    _assert_budget(
+        client.get(f"/api/v1/enrollments/training/{training_id}", headers=user),
+        "GET /api/v1/enrollments/training/{training_id}",
+    )
+
+
+def test_write_endpoints_within_budget(client, user, training_id):
+    _assert_budget(
+        client.patch("/api/v1/profile/me", json={"first_name": "Budget"}, headers=user),
+        "PATCH /api/v1/profile/me",
+    )
+
+    response = client.post("/api/v1/enrollments", json={"training_id": training_id}, headers=user)
+    _assert_budget(response, "POST /api/v1/enrollments")
+    enrollment_id = response.json()["result"]["id"]
+
+    _assert_budget(
+        client.get(f"/api/v1/enrollments/training/{training_id}", headers=user),
+        "GET /api/v1/enrollments/training/{training_id}",
+    )
+    _assert_budget(
+        client.post(f"/api/v1/enrollments/{enrollment_id}/cancel", headers=user),
+        "POST /api/v1/enrollments/{enrollment_id}/cancel",
+    )
+
+
+def test_every_budget_is_exercised():
+    # Запускается после остальных тестов модуля (порядок объявления)
+    if not _checked:
+        pytest.skip("budget tests did not run")
+    assert set(QUERY_BUDGETS) <= _checked, sorted(set(QUERY_BUDGETS) - _checked)
@@ -0,0 +1,181 @@
+# tests/test_rate_limit.py
+"""
+Token bucket ограничителя частоты (app/core/rate_limit.py).
+
+Время вёдер в памяти подменяется (monotonic модуля); вёдра в Postgres
+считаются по clock_timestamp(), поэтому там короткий период и настоящее
+ожидание.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.core.rate_limit as rate_limit_module
+from app.core.rate_limit import (
+    MemoryBuckets,
+    PostgresBuckets,
+    RateLimit,
+    RateLimiter,
+    parse_limits,
+    rate_limiter,
+)
+from app.db.session import ASYNC_SQLALCHEMY_DATABASE_URL
+from tests.conftest import make_init_data
+
+# 3 запроса подряд, ведро наполняется за 3 с — один токен в секунду
+LIMIT = RateLimit(capacity=3, period_seconds=3)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _acquire(buckets, telegram_id: int = 1, limit: RateLimit = LIMIT) -> float:
+    return asyncio.run(buckets.acquire("route", telegram_id, limit))
+
+
+# ---- вёдра в памяти ----
+
+
+def test_memory_bucket_burst_then_reject(clock):
+    buckets = MemoryBuckets()
+    assert [_acquire(buckets) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert _acquire(buckets) == pytest.approx(1.0)
+
+
+def test_memory_bucket_refills_over_time(clock):
+    buckets = MemoryBuckets()
+    for _ in range(3):
+        _acquire(buckets)
+
+    clock[0] += 0.5
+    assert _acquire(buckets) == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert _acquire(buckets) == 0.0
+    assert _acquire(buckets) == pytest.approx(1.0)
+
+
+def test_memory_bucket_refill_is_capped_at_capacity(clock):
+    buckets = MemoryBuckets()
+    _acquire(buckets)
+
+    clock[0] += 3600
+    assert [_acquire(buckets) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert _acquire(buckets) > 0
+
+
+def test_memory_buckets_are_per_user_and_bounded(clock):
+    buckets = MemoryBuckets(maxsize=2)
+    for _ in range(3):
+        _acquire(buckets, telegram_id=1)
+    assert _acquire(buckets, telegram_id=2) == 0.0
+
+    _acquire(buckets, telegram_id=3)  # вытесняет самое старое ведро (1)
+    assert buckets.size() == 2
+    assert _acquire(buckets, telegram_id=1) == 0.0
+
+
+# ---- лимитер ----
+
+
+def test_parse_limits():
+    assert parse_limits(" a=5/10, b=off ,") == {"a": RateLimit(5, 10), "b": None}
+    for raw in ("a", "a=5", "a=0/10", "a=x/1", "=5/10"):
+        with pytest.raises(ValueError):
+            parse_limits(raw)
+
+
+def test_limiter_skips_unlimited_routes_and_fails_open():
+    class Broken:
+        name = "broken"
+
+        async def acquire(self, *args):
+            raise RuntimeError("backend down")
+
+        def size(self):
+            return None
+
+    limiter = RateLimiter(limits={"limited": LIMIT, "off": None}, backend=Broken())
+    assert asyncio.run(limiter.check("off", 1)) == 0.0
+    assert asyncio.run(limiter.check("limited", 1)) == 0.0
+    assert limiter.backend_errors == 1
+    assert limiter.retry_after_header(0.2) == "1"
+
+
+# ---- вёдра в Postgres ----
+
+
+def test_postgres_bucket_refills_and_leaves_session_clean(db_engine):
+    route = f"pytest.{uuid.uuid4().hex[:12]}"
+    # 2 подряд, токен каждые 0,1 с
+    limit = RateLimit(capacity=2, period_seconds=0.2)
+    buckets = PostgresBuckets()
+
+    async def scenario():
+        engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as db:
+                results = [await buckets.acquire(route, 1, limit, db) for _ in range(3)]
+                # и разрешённая попытка, и отказ возвращают сессию без открытой транзакции
+                assert not db.in_transaction()
+                await asyncio.sleep(results[-1] + 0.05)
+                results.append(await buckets.acquire(route, 1, limit, db))
+                return results
+        finally:
+            await engine.dispose()
+
+    try:
+        allowed_1, allowed_2, rejected, refilled = asyncio.run(scenario())
+        assert (allowed_1, allowed_2) == (0.0, 0.0)
+        assert 0 < rejected <= 0.1
+        assert refilled == 0.0
+        # списания зафиксированы — видны из другого соединения
+        with db_engine.connect() as conn:
+            assert conn.execute(
+                text("SELECT count(*) FROM rate_limit_buckets WHERE key = :key"), {"key": f"{route}:1"}
+            ).scalar_one() == 1
+    finally:
+        with db_engine.begin() as conn:
+            conn.execute(text("DELETE FROM rate_limit_buckets WHERE key LIKE :prefix"), {"prefix": f"{route}:%"})
+
+
+# ---- через API ----
+
+
+def test_enrollment_rejected_before_user_upsert(client, db_engine, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backend", MemoryBuckets())
+    telegram_id = 8_899_000_000 + uuid.uuid4().int % 1_000_000
+    limit = rate_limiter.limit_for("enrollments.create")
+    for _ in range(limit.capacity):
+        asyncio.run(rate_limiter.backend.acquire("enrollments.create", telegram_id, limit))
+
+    response = client.post(
+        "/api/v1/enrollments",
+        json={"training_id": 1},
+        headers={"X-Telegram-Init-Data": make_init_data(telegram_id)},
+    )
+
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "RATE_LIMITED"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["X-DB-Queries"] == "0"
+    with db_engine.connect() as conn:
+        assert conn.execute(
+            text("SELECT count(*) FROM users WHERE telegram_id = :tg"), {"tg": telegram_id}
+        ).scalar_one() == 0
+
+
+def test_enrollment_without_auth_is_401(client):
+    response = client.post("/api/v1/enrollments", json={"training_id": 1})
+    assert response.status_code == 401
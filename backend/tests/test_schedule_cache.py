@@ -0,0 +1,166 @@
+# tests/test_schedule_cache.py
+"""
+Кэш страниц расписания (app/core/schedule_cache.py).
+
+Проверяем, что повторная страница отдаётся без БД, а любая смена версии —
+своим воркером после COMMIT или чужим через NOTIFY — сразу сбрасывает кэш,
+и следующая страница уже видит изменение.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+import app.core.schedule_cache as schedule_cache_module
+from app.core.config import settings
+from app.core.schedule_cache import _BUMP_SQL, ScheduleCache, schedule_cache
+
+
+@pytest.fixture
+def cache(monkeypatch) -> ScheduleCache:
+    monkeypatch.setattr(settings, "schedule_cache", True)
+    return ScheduleCache(ttl_seconds=60, maxsize=2)
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _page_ids(response):
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["result"]["items"]]
+
+
+# ---- ScheduleCache без БД ----
+
+
+def test_put_get_and_local_advance(cache):
+    cache.put("page", cache.token(), b"body")
+    assert cache.get("page") == b"body"
+
+    cache.advance(1, "local")
+    assert cache.get("page") is None
+    assert cache.version == 1
+
+
+def test_page_read_before_invalidation_is_not_stored(cache):
+    token = cache.token()
+    cache.advance(1, "local")  # изменение зафиксировали, пока страница читалась
+    cache.put("page", token, b"stale")
+
+    assert cache.get("page") is None
+    assert cache.stats()["skipped"] == {"invalidated": 1}
+
+
+def test_own_notification_does_not_invalidate_twice(cache):
+    cache.advance(7, "local")
+    cache.put("page", cache.token(), b"body")
+
+    cache.advance(7, "notify")  # своё же уведомление вернулось по LISTEN
+    assert cache.get("page") == b"body"
+    assert cache.stats()["invalidations"] == {"local": 1}
+
+
+def test_out_of_order_versions_still_invalidate(cache):
+    cache.advance(10, "notify")
+    cache.put("page", cache.token(), b"body")
+
+    # транзакция с меньшим nextval зафиксировалась позже
+    cache.advance(9, "notify")
+    assert cache.get("page") is None
+    assert cache.version == 10
+
+
+def test_resync_invalidates_only_on_newer_version(cache):
+    cache.advance(5, "local")
+    cache.put("page", cache.token(), b"body")
+
+    cache.advance(5, "resync")
+    assert cache.get("page") == b"body"
+    cache.advance(6, "resync")
+    assert cache.get("page") is None
+
+    cache.put("page", cache.token(), b"body")
+    cache.advance(6, "reconnect")  # после обрыва LISTEN — всегда
+    assert cache.get("page") is None
+
+
+def test_ttl_and_lru_eviction(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(schedule_cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    for key in ("a", "b", "c"):
+        cache.put(key, cache.token(), key.encode())
+    assert cache.get("a") is None  # maxsize=2: вытеснена самая старая
+    assert cache.get("c") == b"c"
+
+    now[0] += 60
+    assert cache.get("c") is None
+
+
+# ---- через API ----
+
+
+def test_repeat_page_is_served_without_db(client, make_user, make_trainings, coach_name):
+    user = make_user()
+    make_trainings([timedelta(hours=1)])
+    params = {"coach_name": coach_name}
+
+    first = client.get("/api/v1/trainings", params=params, headers=user)
+    hits = schedule_cache.hits
+    second = client.get("/api/v1/trainings", params=params, headers=user)
+
+    assert second.content == first.content
+    assert second.headers["X-DB-Queries"] == "0"
+    assert schedule_cache.hits == hits + 1
+
+
+def test_admin_change_invalidates_this_worker_at_once(client, make_user, make_trainings, coach_name):
+    admin = make_user(is_admin=True)
+    [existing] = make_trainings([timedelta(hours=1)])
+    params = {"coach_name": coach_name}
+    assert _page_ids(client.get("/api/v1/trainings", params=params, headers=admin)) == [existing]
+
+    start_at = datetime.now(timezone.utc) + timedelta(days=1, hours=2)
+    created = client.post(
+        "/api/v1/trainings",
+        json={"title": "pytest", "start_at": start_at.isoformat(), "coach_name": coach_name},
+        headers=admin,
+    )
+    assert created.status_code == 200, created.text
+    new_id = created.json()["result"]["id"]
+    assert _page_ids(client.get("/api/v1/trainings", params=params, headers=admin)) == [existing, new_id]
+
+    cancelled = client.post(f"/api/v1/trainings/{existing}/cancel", headers=admin)
+    assert cancelled.status_code == 200, cancelled.text
+    assert _page_ids(client.get("/api/v1/trainings", params=params, headers=admin)) == [new_id]
+
+
+def test_other_worker_change_arrives_by_notify(client, db_engine, make_user, make_trainings, coach_name):
+    if not _wait_for(lambda: schedule_cache.listening):
+        pytest.skip("schedule cache LISTEN is not running")
+    user = make_user()
+    [existing] = make_trainings([timedelta(hours=1)])
+    params = {"coach_name": coach_name}
+    assert _page_ids(client.get("/api/v1/trainings", params=params, headers=user)) == [existing]
+
+    # Другой воркер: изменение и версия в одной транзакции, NOTIFY — на COMMIT
+    with db_engine.begin() as conn:
+        conn.execute(
+            text("UPDATE trainings SET is_cancelled = true WHERE id = :id"),
+            {"id": existing},
+        )
+        version = conn.execute(_BUMP_SQL).scalar_one()
+
+    assert _wait_for(lambda: schedule_cache.version >= version), "notification was not received"
+    assert _page_ids(client.get("/api/v1/trainings", params=params, headers=user)) == []
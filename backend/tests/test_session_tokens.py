@@ -0,0 +1,168 @@
+# tests/test_session_tokens.py
+"""
+Сессионные токены (app/core/session_tokens.py): подпись, формат, срок
+действия и отзыв. Часы модуля подменяются — секунды выпуска и отзыва
+задаются явно.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+import app.core.session_tokens as session_tokens
+from app.core.config import settings
+from app.core.session_tokens import (
+    RevocationSet,
+    SessionTokenError,
+    _b64decode,
+    _b64encode,
+    _sign,
+    extract_bearer_token,
+    issue_session_token,
+    revoke_user_tokens,
+    verify_session_token,
+)
+
+TTL = 900
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_800_000_000.25]
+    monkeypatch.setattr(session_tokens, "time", SimpleNamespace(time=lambda: now[0]))
+    monkeypatch.setattr(session_tokens, "revoked_sessions", RevocationSet(ttl_seconds=TTL))
+    return now
+
+
+def _issue(user_id: int = 7, is_admin: bool = False) -> str:
+    token, _ = issue_session_token(user_id=user_id, telegram_id=1000 + user_id, is_admin=is_admin, ttl_seconds=TTL)
+    return token
+
+
+def _rejected(token: str, reason: str) -> None:
+    with pytest.raises(SessionTokenError, match=reason):
+        verify_session_token(token)
+
+
+def test_round_trip(clock):
+    token, claims = issue_session_token(user_id=7, telegram_id=1007, is_admin=True, ttl_seconds=TTL)
+
+    assert verify_session_token(token) == claims
+    assert (claims.issued_at, claims.expires_at) == (1_800_000_000, 1_800_000_000 + TTL)
+
+
+def test_tampered_payload_is_rejected(clock):
+    version, payload_b64, signature = _issue(is_admin=False).split(".")
+    # повышаем себе права, подпись оставляем старой
+    payload = _b64decode(payload_b64).decode("ascii").split(":")
+    payload[2] = "1"
+    forged = _b64encode(":".join(payload).encode("ascii"))
+
+    _rejected(f"{version}.{forged}.{signature}", "Подпись")
+
+
+def test_tampered_signature_is_rejected(clock):
+    version, payload_b64, signature = _issue().split(".")
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+
+    _rejected(f"{version}.{payload_b64}.{flipped}", "Подпись")
+    _rejected(f"{version}.{payload_b64}.", "Подпись")
+
+
+def test_token_signed_with_another_key_is_rejected(clock, monkeypatch):
+    token = _issue()
+    monkeypatch.setattr(settings, "session_token_secret", "another-secret")
+
+    _rejected(token, "Подпись")
+
+
+def test_wrong_version_and_format_are_rejected(clock):
+    _, payload_b64, signature = _issue().split(".")
+
+    _rejected(f"v2.{payload_b64}.{signature}", "версия")
+    _rejected(f"{payload_b64}.{signature}", "формат")
+    _rejected(f"v1.{payload_b64}.{signature}.extra", "формат")
+
+
+def test_signed_garbage_payload_is_rejected(clock):
+    for payload in ("7:1007:0:1800000000", "x:1007:0:1800000000:1800000900"):
+        payload_b64 = _b64encode(payload.encode("ascii"))
+        _rejected(f"v1.{payload_b64}.{_sign(payload_b64)}", "содержимое")
+
+
+def test_expiry(clock):
+    token = _issue()
+
+    clock[0] += TTL - 1
+    verify_session_token(token)
+    clock[0] += 1
+    _rejected(token, "истёк")
+
+
+def test_revocation_rejects_earlier_tokens_only(clock):
+    before = _issue()
+    same_second_before = _issue()
+    other_user = _issue(user_id=8)
+
+    clock[0] += 0.5  # отзыв в ту же секунду, что и выпуск
+    revoke_user_tokens(7)
+    _rejected(before, "отозван")
+    _rejected(same_second_before, "отозван")
+    verify_session_token(other_user)
+
+    # повторный вход сразу после отзыва (та же секунда) — токен действует
+    clock[0] += 0.1
+    after = _issue()
+    verify_session_token(after)
+
+    clock[0] += 5
+    verify_session_token(_issue())
+
+
+def test_revocation_entries_expire_with_token_ttl(clock):
+    revoke_user_tokens(7)
+    clock[0] += TTL + 1
+    revoke_user_tokens(8)  # чистка — при отзыве
+
+    assert len(session_tokens.revoked_sessions) == 1
+    assert session_tokens.revoked_sessions.revoked_at(7) is None
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("Bearer abc", "abc"),
+        ("bearer  abc ", "abc"),
+        ("Basic abc", None),
+        ("Bearer", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_extract_bearer_token(header, expected):
+    assert extract_bearer_token(header) == expected
+
+
+def test_session_token_through_api(client, make_user):
+    headers = make_user()
+    response = client.post("/api/v1/auth/session", headers=headers)
+    assert response.status_code == 200, response.text
+    token = response.json()["result"]["token"]
+
+    me = client.get("/api/v1/profile/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["result"] == client.get("/api/v1/profile/me", headers=headers).json()["result"]
+
+    # токен нельзя продлить токеном
+    renew = client.post("/api/v1/auth/session", headers={"Authorization": f"Bearer {token}"})
+    assert renew.status_code == 401
+
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    rejected = client.get("/api/v1/profile/me", headers={"Authorization": f"Bearer {tampered}"})
+    assert rejected.status_code == 401
+
+    revoke_user_tokens(me.json()["result"]["id"])
+    revoked = client.get("/api/v1/profile/me", headers={"Authorization": f"Bearer {token}"})
+    assert revoked.status_code == 401
@@ -0,0 +1,157 @@
+# tests/test_telegram_login.py
+"""
+Логин через Telegram: upsert_user_from_telegram (app/services/user_service.py).
+
+- повторный логин без изменений — один запрос, без записи и без COMMIT;
+- из Telegram заполняются только пустые поля, правки профиля остаются;
+- одновременные первые логины одного пользователя оба проходят.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.identity_cache import identity_cache
+from app.db.session import ASYNC_SQLALCHEMY_DATABASE_URL
+from app.services.user_service import upsert_user_from_telegram
+from tests.conftest import make_init_data
+
+
+@pytest.fixture
+def telegram_id(db_engine) -> Iterator[int]:
+    value = 8_898_000_000 + uuid.uuid4().int % 1_000_000
+    yield value
+    with db_engine.begin() as conn:
+        conn.execute(text("DELETE FROM users WHERE telegram_id = :tg"), {"tg": value})
+
+
+def _user_row(db_engine, telegram_id: int):
+    with db_engine.connect() as conn:
+        return conn.execute(
+            text("SELECT username, first_name, updated_at FROM users WHERE telegram_id = :tg"),
+            {"tg": telegram_id},
+        ).one()
+
+
+def _relogin(client, telegram_id: int):
+    # Снимок из identity cache скрыл бы upsert — логинимся «заново»
+    identity_cache.invalidate(telegram_id)
+    response = client.get("/api/v1/profile/me", headers={"X-Telegram-Init-Data": make_init_data(telegram_id)})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_unchanged_relogin_does_not_write(client, db_engine, telegram_id):
+    _relogin(client, telegram_id)
+    before = _user_row(db_engine, telegram_id)
+
+    response = _relogin(client, telegram_id)
+
+    # только сам upsert, UPDATE не сработал
+    assert response.headers["X-DB-Queries"] == "1"
+    assert _user_row(db_engine, telegram_id).updated_at == before.updated_at
+
+
+def test_unchanged_login_does_not_commit(db_engine, telegram_id):
+    """
+    Вне единицы работы запроса: upsert сам делает COMMIT, только если писал.
+    """
+
+    async def scenario():
+        engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+        commits: List[int] = []
+        event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+        try:
+            async with AsyncSession(engine) as db:
+                kwargs = dict(telegram_id=telegram_id, username="u", first_name="Test", last_name=None)
+                await upsert_user_from_telegram(db, **kwargs)
+                created = len(commits)
+                await db.rollback()
+                await upsert_user_from_telegram(db, **kwargs)
+                return created, len(commits) - created
+        finally:
+            await engine.dispose()
+
+    created, repeated = asyncio.run(scenario())
+    assert (created, repeated) == (1, 0)
+
+
+def test_relogin_fills_only_empty_fields(client, db_engine, telegram_id):
+    _relogin(client, telegram_id)
+    with db_engine.begin() as conn:
+        conn.execute(
+            text("UPDATE users SET first_name = 'Edited', username = NULL WHERE telegram_id = :tg"),
+            {"tg": telegram_id},
+        )
+
+    profile = _relogin(client, telegram_id).json()["result"]
+
+    # ручная правка осталась, пустое поле заполнено из Telegram
+    assert profile["first_name"] == "Edited"
+    assert profile["username"] == f"test_{telegram_id}"
+    row = _user_row(db_engine, telegram_id)
+    assert (row.first_name, row.username) == ("Edited", f"test_{telegram_id}")
+
+
+def test_concurrent_first_logins(db_engine, telegram_id):
+    """
+    Второй первый логин ждёт INSERT первого, упирается в конфликт, а
+    заполнять нечего: строку он должен получить, а не NoResultFound.
+    """
+
+    async def scenario():
+        engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as first, AsyncSession(engine) as second:
+                # первый логин: строка вставлена, COMMIT ещё не сделан
+                await first.execute(
+                    text(
+                        "INSERT INTO users (telegram_id, username, first_name, is_active) "
+                        "VALUES (:tg, :username, 'Test', true)"
+                    ),
+                    {"tg": telegram_id, "username": f"test_{telegram_id}"},
+                )
+                racing = asyncio.create_task(
+                    upsert_user_from_telegram(
+                        second,
+                        telegram_id=telegram_id,
+                        username=f"test_{telegram_id}",
+                        first_name="Test",
+                        last_name=None,
+                    )
+                )
+                # второй логин встал на блокировке строки первого
+                await asyncio.sleep(0.2)
+                assert not racing.done()
+                await first.commit()
+                return await asyncio.wait_for(racing, timeout=5)
+        finally:
+            await engine.dispose()
+
+    user = asyncio.run(scenario())
+    assert user.telegram_id == telegram_id
+    assert user.first_name == "Test"
+
+
+def test_parallel_logins_through_api(client, telegram_id):
+    init_data = make_init_data(telegram_id)
+
+    async def login():
+        # TestClient синхронный — параллельность даёт пул потоков
+        return await asyncio.to_thread(
+            client.get, "/api/v1/profile/me", headers={"X-Telegram-Init-Data": init_data}
+        )
+
+    async def logins():
+        return await asyncio.gather(login(), login(), login())
+
+    responses = asyncio.run(logins())
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert len({r.json()["result"]["id"] for r in responses}) == 1
@@ -0,0 +1,132 @@
+# tests/test_training_pagination.py
+"""
+Курсорная пагинация расписания (app/core/pagination.py, list_trainings_after).
+
+Листание по next_cursor должно отдать ровно те же тренировки и в том же
+порядке (start_at, id), что и один большой запрос: без пропусков и повторов,
+в том числе когда у нескольких тренировок одинаковый start_at.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import pytest
+
+from app.core.exceptions import AppException
+from app.core.pagination import decode_cursor, encode_cursor
+
+# 7 тренировок: по две на одно время (курсор различает их по id), одна отменена
+_STARTS = [
+    timedelta(hours=5),
+    timedelta(hours=1),
+    timedelta(hours=1),
+    timedelta(hours=3),
+    timedelta(hours=3),
+    timedelta(hours=2),
+    timedelta(hours=4),
+]
+_CANCELLED = (5,)
+
+
+@pytest.fixture
+def trainings(make_trainings) -> List[Tuple[timedelta, int, bool]]:
+    ids = make_trainings(_STARTS, cancelled=_CANCELLED)
+    return sorted((start, training_id, i in _CANCELLED) for i, (start, training_id) in enumerate(zip(_STARTS, ids)))
+
+
+def _walk(client, path: str, params: Dict, headers: Dict[str, str]) -> List[Dict]:
+    """
+    Все страницы по next_cursor; проверяет has_more / next_cursor каждой.
+    """
+    pages: List[Dict] = []
+    cursor = None
+    while True:
+        query = dict(params, cursor=cursor) if cursor is not None else params
+        response = client.get(path, params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()["result"]
+        pages.append(page)
+        assert page["has_more"] == (page["next_cursor"] is not None)
+        if not page["has_more"]:
+            return pages
+        assert len(page["items"]) == params["limit"]
+        cursor = page["next_cursor"]
+        assert len(pages) < 20, "cursor does not advance"
+
+
+def test_cursor_encoding_round_trip():
+    start_at = datetime(2030, 5, 1, 18, 30, tzinfo=timezone.utc)
+    values = decode_cursor(encode_cursor([start_at, 42]), 2)
+    assert values == [start_at.isoformat(), 42]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor([1]), "x" * 600])
+def test_broken_cursor_is_rejected(cursor):
+    with pytest.raises(AppException) as exc_info:
+        decode_cursor(cursor, 2)
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 6, 10])
+def test_public_schedule_cursor_walk(client, make_user, coach_name, trainings, limit):
+    user = make_user()
+    expected = [training_id for _, training_id, cancelled in trainings if not cancelled]
+
+    pages = _walk(client, "/api/v1/trainings", {"coach_name": coach_name, "limit": limit}, user)
+
+    assert [item["id"] for page in pages for item in page["items"]] == expected
+    # последняя страница — всегда без курсора, даже если заполнена целиком
+    assert pages[-1]["next_cursor"] is None
+    assert len(pages) == max(1, -(-len(expected) // limit))
+
+
+def test_admin_schedule_cursor_walk_includes_cancelled(client, make_user, coach_name, trainings):
+    admin = make_user(is_admin=True)
+    expected = [training_id for _, training_id, _ in trainings]
+
+    pages = _walk(client, "/api/v1/trainings/admin", {"coach_name": coach_name, "limit": 2}, admin)
+
+    assert [item["id"] for page in pages for item in page["items"]] == expected
+
+
+def test_offset_page_continues_by_cursor(client, make_user, coach_name, trainings):
+    user = make_user()
+    expected = [training_id for _, training_id, cancelled in trainings if not cancelled]
+
+    first = client.get("/api/v1/trainings", params={"coach_name": coach_name, "limit": 4}, headers=user)
+    page = first.json()["result"]
+    assert page["total"] == len(expected)
+    assert page["has_more"] is True
+
+    rest = _walk(
+        client,
+        "/api/v1/trainings",
+        {"coach_name": coach_name, "limit": 4, "cursor": page["next_cursor"]},
+        user,
+    )
+    ids = [item["id"] for item in page["items"]] + [item["id"] for p in rest for item in p["items"]]
+    assert ids == expected
+
+
+def test_last_offset_page_has_no_cursor(client, make_user, coach_name, trainings):
+    user = make_user()
+    response = client.get(
+        "/api/v1/trainings", params={"coach_name": coach_name, "limit": 3, "offset": 3}, headers=user
+    )
+    page = response.json()["result"]
+    assert len(page["items"]) == 3
+    assert page["has_more"] is False
+    assert page["next_cursor"] is None
+
+
+def test_cursor_with_offset_or_garbage_is_422(client, make_user, coach_name, trainings):
+    user = make_user()
+    first = client.get("/api/v1/trainings", params={"coach_name": coach_name, "limit": 2}, headers=user)
+    cursor = first.json()["result"]["next_cursor"]
+
+    both = client.get("/api/v1/trainings", params={"cursor": cursor, "offset": 2}, headers=user)
+    assert both.status_code == 422
+    garbage = client.get("/api/v1/trainings", params={"cursor": "garbage"}, headers=user)
+    assert garbage.status_code == 422
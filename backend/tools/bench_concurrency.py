@@ -0,0 +1,168 @@
+"""
+Бенчмарк пропускной способности одного воркера в зависимости от числа
+одновременных клиентов.
+
+Два сценария:
+  * blocking vs async — одинаковый запрос к БД (+ pg_sleep, имитирующий
+    сетевую задержку до удалённой БД) в async-обработчике:
+      - blocking: через синхронную Session, как раньше работали тренировки,
+        записи, рейтинг, профиль и биллинг — каждый запрос стопорит event loop;
+      - async: через AsyncSession на async_engine, как сейчас.
+    У blocking пропускная способность не растёт с числом клиентов,
+    у async растёт почти линейно до размера пула соединений.
+  * endpoint — реальный эндпоинт приложения (по умолчанию GET /api/v1/trainings).
+
+Запросы гоняем напрямую через ASGI-интерфейс (без сети и HTTP-клиента).
+Нужна доступная БД из DATABASE_URL.
+
+Запуск (из каталога backend):
+    python -m tools.bench_concurrency --concurrency 1,2,4,8,16 --requests 400 --db-latency-ms 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.db.session import SessionLocal, async_session_maker
+
+_QUERY = text(
+    "SELECT id, rating, cups FROM users WHERE is_active "
+    "ORDER BY rating DESC, cups DESC, id LIMIT 20"
+)
+_SLEEP = text("SELECT pg_sleep(:seconds)")
+
+
+def _build_scenario_app(latency_seconds: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/blocking")
+    async def blocking():
+        # Прежний паттерн: async def + синхронная сессия
+        db = SessionLocal()
+        try:
+            if latency_seconds > 0:
+                db.execute(_SLEEP, {"seconds": latency_seconds})
+            rows = db.execute(_QUERY).all()
+        finally:
+            db.close()
+        return {"count": len(rows)}
+
+    @app.get("/async")
+    async def non_blocking():
+        async with async_session_maker() as db:
+            if latency_seconds > 0:
+                await db.execute(_SLEEP, {"seconds": latency_seconds})
+            rows = (await db.execute(_QUERY)).all()
+        return {"count": len(rows)}
+
+    return app
+
+
+async def _call(app, path: str, query: str = "") -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _run_level(app, path: str, query: str, concurrency: int, total: int) -> tuple[float, int]:
+    """
+    total запросов, concurrency «клиентов» шлют их параллельно.
+    Возвращает (req/s, число ответов не 200).
+    """
+    remaining = total
+    errors = 0
+
+    async def client() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            if await _call(app, path, query) != 200:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return total / (time.perf_counter() - t0), errors
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    levels = [int(x) for x in args.concurrency.split(",")]
+
+    targets = []
+    if args.scenario in ("compare", "all"):
+        scenario_app = _build_scenario_app(args.db_latency_ms / 1000)
+        targets += [
+            ("blocking (sync Session)", scenario_app, "/blocking", ""),
+            ("async (AsyncSession)", scenario_app, "/async", ""),
+        ]
+    if args.scenario in ("endpoint", "all"):
+        from app.main import app as real_app
+
+        # app.main настраивает логирование заново — снова глушим лог запросов
+        logging.getLogger("app").setLevel(logging.WARNING)
+        path, _, query = args.path.partition("?")
+        targets.append((f"endpoint {args.path}", real_app, path, query))
+
+    for title, app, path, query in targets:
+        # прогрев: соединения в пуле, кэши планов
+        await _run_level(app, path, query, max(levels), max(levels) * 2)
+
+        print(title)
+        base = None
+        for level in levels:
+            rps, errors = await _run_level(app, path, query, level, args.requests)
+            base = base or rps
+            suffix = f"  errors={errors}" if errors else ""
+            print(f"  clients={level:3d}  {rps:8.1f} req/s  x{rps / base:5.2f}{suffix}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=("compare", "endpoint", "all"), default="all")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--requests", type=int, default=400, help="запросов на каждый уровень")
+    parser.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=5.0,
+        help="задержка pg_sleep в сценарии compare (имитация удалённой БД)",
+    )
+    parser.add_argument("--path", default="/api/v1/trainings?limit=20")
+    args = parser.parse_args()
+
+    # Лог каждого запроса исказил бы замеры
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Микро-бенчмарк накладных расходов middleware на запрос.
+
+Сравниваем две сборки одного и того же приложения на /health и /api/v1/ping:
+  * before — прежние BaseHTTPMiddleware (логика та же, что была в app/core/middleware.py);
+  * after  — текущие чистые ASGI-middleware.
+
+Запросы гоняем напрямую через ASGI-интерфейс (без сети и HTTP-клиента),
+поэтому разница — это именно стоимость слоя middleware.
+
+Запуск (из каталога backend):
+    python -m tools.bench_middleware --requests 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.v1 import api_router
+from app.core.middleware import RequestLoggingMiddleware, TelegramAuthMiddleware
+
+logger = logging.getLogger("app.middleware")
+
+
+# --------- «До»: реализация на BaseHTTPMiddleware --------- #
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:  # type: ignore[override]
+        start = time.perf_counter()
+        response = await call_next(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            "%s %s -> %s (%.2f ms)",
+            request.method,
+            request.url.path,
+            response.status_code,
+            duration_ms,
+        )
+        return response
+
+
+class LegacyTelegramAuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:  # type: ignore[override]
+        # На /health и /api/v1/ping прежняя версия только обнуляла user
+        request.state.user = None
+        return await call_next(request)
+
+
+def _build_app(logging_mw, auth_mw) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(logging_mw)
+    app.add_middleware(auth_mw)
+    app.include_router(api_router, prefix="/api/v1")
+
+    @app.get("/health")
+    async def healthcheck():
+        return {"status": "ok"}
+
+    return app
+
+
+async def _call(app, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        return None
+
+    await app(scope, receive, send)
+
+
+async def _measure(app, path: str, n: int) -> list[float]:
+    # прогрев
+    for _ in range(min(500, n)):
+        await _call(app, path)
+
+    samples: list[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await _call(app, path)
+        samples.append((time.perf_counter() - t0) * 1_000_000)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    return f"mean={statistics.fmean(samples):8.1f}us  p50={p50:8.1f}us  p99={p99:8.1f}us"
+
+
+async def main_async(n: int) -> None:
+    before = _build_app(LegacyRequestLoggingMiddleware, LegacyTelegramAuthMiddleware)
+    after = _build_app(RequestLoggingMiddleware, TelegramAuthMiddleware)
+
+    for path in ("/health", "/api/v1/ping"):
+        b = await _measure(before, path, n)
+        a = await _measure(after, path, n)
+        print(f"{path}")
+        print(f"  before (BaseHTTPMiddleware): {_summary(b)}")
+        print(f"  after  (pure ASGI):          {_summary(a)}")
+        print(f"  mean speedup: x{statistics.fmean(b) / statistics.fmean(a):.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--with-logging",
+        action="store_true",
+        help="не глушить INFO-лог middleware (по умолчанию меряем без I/O логов)",
+    )
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logger.setLevel(logging.WARNING)
+
+    asyncio.run(main_async(args.requests))
+
+
+if __name__ == "__main__":
+    main()
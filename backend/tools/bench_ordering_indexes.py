@@ -0,0 +1,225 @@
+"""
+Бенчмарк индексов под сортировки (миграция a4d6f8b0c2e1):
+таблица лидеров, лента уведомлений, журнал аудита.
+
+В одной транзакции:
+  1. наливает синтетику: --users пользователей, --notifications уведомлений
+     (1% пользователей получает треть всех уведомлений — как подписчики
+     рассылок), --audit-logs записей аудита; ANALYZE;
+  2. удаляет индексы миграции (внутри транзакции) и замеряет запросы;
+  3. создаёт их заново и замеряет ещё раз;
+  4. откатывает транзакцию.
+
+Замеряются настоящие функции сервисов (get_leaderboard,
+list_user_notifications, list_audit_logs) — медиана по --repeat вызовам.
+Отдельно — сам запрос страницы (тот, что с ORDER BY ... LIMIT): сервисы ещё
+считают total через COUNT(*), и на больших выборках он заметен в общем времени,
+а индексы миграции ускоряют именно страницу.
+
+DROP/CREATE INDEX в транзакции держат эксклюзивные блокировки на таблицах —
+запускать только на dev-базе. Нужна БД из DATABASE_URL с миграциями.
+
+Запуск (из каталога backend):
+    python -m tools.bench_ordering_indexes --users 100000 --notifications 5000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db.counts import total_counter
+from app.db.session import async_engine
+from app.services.audit_log_service import list_audit_logs
+from app.services.notification_service import list_user_notifications
+from app.services.rating_service import get_leaderboard
+
+# (имя, DDL) — те же индексы, что в миграции a4d6f8b0c2e1
+INDEXES = [
+    (
+        "ix_users_leaderboard",
+        "CREATE INDEX ix_users_leaderboard ON users (rating DESC, cups DESC, id) WHERE is_active IS true",
+    ),
+    (
+        "ix_notifications_user_created",
+        "CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at DESC, id DESC)",
+    ),
+    ("ix_audit_logs_user_recent", "CREATE INDEX ix_audit_logs_user_recent ON audit_logs (user_id, id)"),
+    ("ix_audit_logs_action_recent", "CREATE INDEX ix_audit_logs_action_recent ON audit_logs (action, id)"),
+    (
+        "ix_audit_logs_entity_recent",
+        "CREATE INDEX ix_audit_logs_entity_recent ON audit_logs (entity, entity_id, id)",
+    ),
+]
+
+_SEED = [
+    """
+    CREATE TEMP TABLE bench_users ON COMMIT DROP AS
+    WITH ins AS (
+        INSERT INTO users (telegram_id, username, first_name, rating, cups, is_active)
+        SELECT 8000000000 + g, 'bench_' || g, 'Bench', (g * 7919) % 3000, (g * 31) % 100, g % 20 <> 0
+        FROM generate_series(1, :users) AS g
+        RETURNING id
+    )
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM ins
+    """,
+    # 1% «тяжёлых» пользователей получают треть уведомлений, остальное — поровну
+    """
+    INSERT INTO notifications (user_id, type, title, body, text, is_read, created_at)
+    SELECT u.id, 'INFO', 'Bench', 'bench', 'bench', g % 3 = 0,
+           now() - (g % 1000000) * interval '1 minute'
+    FROM generate_series(1, :notifications) AS g
+    JOIN bench_users u ON u.n = CASE
+        WHEN g % 3 = 0 THEN (g % greatest(:users / 100, 1)) + 1
+        ELSE (g % :users) + 1
+    END
+    """,
+    """
+    INSERT INTO audit_logs (user_id, action, entity, entity_id, data, created_at, updated_at)
+    SELECT u.id, (ARRAY['training.update', 'user.ban', 'debt.close', 'training.create'])[g % 4 + 1],
+           'training', g % 5000, 'null'::jsonb, now(), now()
+    FROM generate_series(1, :audit_logs) AS g
+    JOIN bench_users u ON u.n = (g % 200) + 1
+    """,
+    "ANALYZE users, notifications, audit_logs",
+]
+
+Scenario = Tuple[str, Callable[[AsyncSession, Dict[str, int]], Awaitable[Any]]]
+
+
+def _scenarios() -> List[Scenario]:
+    return [
+        ("leaderboard top 100", lambda db, ids: get_leaderboard(db, limit=100, offset=0)),
+        ("leaderboard page @5000", lambda db, ids: get_leaderboard(db, limit=100, offset=5000)),
+        (
+            "notifications heavy user",
+            lambda db, ids: list_user_notifications(db, user_id=ids["heavy_user"], limit=50, offset=0),
+        ),
+        (
+            "notifications heavy @1000",
+            lambda db, ids: list_user_notifications(db, user_id=ids["heavy_user"], limit=50, offset=1000),
+        ),
+        (
+            "notifications typical user",
+            lambda db, ids: list_user_notifications(db, user_id=ids["typical_user"], limit=50, offset=0),
+        ),
+        ("audit logs by user", lambda db, ids: list_audit_logs(db, limit=50, offset=0, user_id=ids["heavy_user"])),
+        ("audit logs by action", lambda db, ids: list_audit_logs(db, limit=50, offset=0, action="user.ban")),
+        (
+            "audit logs by entity",
+            lambda db, ids: list_audit_logs(db, limit=50, offset=0, entity="training", entity_id=42),
+        ),
+    ]
+
+
+def _median_ms(timings: List[float]) -> float:
+    return statistics.median(timings) * 1000
+
+
+async def _measure(conn: AsyncConnection, ids: Dict[str, int], repeat: int) -> Dict[str, Tuple[float, float]]:
+    """
+    {сценарий: (вызов сервиса, запрос страницы)} — медианы в мс.
+    """
+    session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+    results: Dict[str, Tuple[float, float]] = {}
+    for name, run in _scenarios():
+        captured: List[Tuple[str, Any]] = []
+
+        def _capture(_conn, _cursor, statement, parameters, _context, _executemany):
+            if "ORDER BY" in statement:
+                captured.append((statement, parameters))
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _capture)
+        try:
+            await run(session, ids)  # прогрев буферов + SQL страницы
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", _capture)
+        session.expunge_all()
+
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            await run(session, ids)
+            timings.append(time.perf_counter() - t0)
+            session.expunge_all()
+
+        statement, parameters = captured[-1]
+        page_timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            await conn.exec_driver_sql(statement, parameters or None)
+            page_timings.append(time.perf_counter() - t0)
+
+        results[name] = (_median_ms(timings), _median_ms(page_timings))
+    await session.close()
+    return results
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    params = {"users": args.users, "notifications": args.notifications, "audit_logs": args.audit_logs}
+
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            t0 = time.perf_counter()
+            for sql in _SEED:
+                await conn.execute(text(sql), params)
+            print(
+                f"seeded {args.users} users, {args.notifications} notifications, "
+                f"{args.audit_logs} audit logs in {time.perf_counter() - t0:.1f}s"
+            )
+
+            row = (await conn.execute(text("SELECT min(id), max(id) FROM bench_users"))).one()
+            ids = {"heavy_user": row[0], "typical_user": row[1]}
+
+            for name, _ddl in INDEXES:
+                await conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+            await conn.exec_driver_sql("ANALYZE users, notifications, audit_logs")
+            before = await _measure(conn, ids, args.repeat)
+
+            t0 = time.perf_counter()
+            for _name, ddl in INDEXES:
+                await conn.exec_driver_sql(ddl)
+            await conn.exec_driver_sql("ANALYZE users, notifications, audit_logs")
+            print(f"indexes built in {time.perf_counter() - t0:.1f}s")
+            after = await _measure(conn, ids, args.repeat)
+        finally:
+            await trans.rollback()
+
+    await async_engine.dispose()
+
+    print(f"\n{'query':28s} {'call, no index':>15s} {'call, index':>12s} {'page, no index':>15s} {'page, index':>12s}")
+    for name, _run in _scenarios():
+        (call_before, page_before), (call_after, page_after) = before[name], after[name]
+        print(
+            f"{name:28s} {call_before:15.2f} {call_after:12.2f} {page_before:15.2f} {page_after:12.2f}"
+            f"   page x{page_before / page_after:.1f}"
+        )
+    print(f"(median ms over {args.repeat} runs; call = service function incl. COUNT(*), page = ORDER BY ... LIMIT only)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--notifications", type=int, default=5_000_000)
+    parser.add_argument("--audit-logs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # лог медленных запросов зашумил бы вывод (наливка данных — медленная by design)
+    logging.getLogger("app").setLevel(logging.ERROR)
+    # меряем план страницы вместе с COUNT(*), а не попадания в кэш total
+    total_counter.force_exact = True
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
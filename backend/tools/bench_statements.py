@@ -0,0 +1,244 @@
+"""
+Бенчмарк построения SQL-запросов горячего пути: select(), собираемый на
+каждый вызов (как было), против lambda_stmt из сервисов (как сейчас).
+
+Перед выполнением SQLAlchemy строит выражение и считает его ключ кэша,
+по ключу ищет готовый SQL в кэше компиляции движка. Для lambda_stmt
+выражение и ключ вычисляются один раз на место в коде, на вызове только
+извлекаются параметры. Колонки:
+  select()   — построение выражения + ключ кэша, как было;
+  lambda     — то же для lambda_stmt;
+  compile    — полная компиляция (цена промаха кэша, т.е. без кэша вообще).
+
+С --db те же запросы ещё и выполняются через AsyncSession (нужна БД из
+DATABASE_URL); в конце — попадания в кэш компиляции по счётчикам query_stats.
+
+Запуск (из каталога backend):
+    python -m tools.bench_statements --iterations 20000
+    python -m tools.bench_statements --db --iterations 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models.ban import Ban
+from app.models.debt import Debt, DebtStatus
+from app.models.enrollment import Enrollment, EnrollmentStatus
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.ban_service import _active_ban_stmt
+from app.services.debt_service import _open_debt_stmt
+from app.services.enrollment_service import (
+    _count_active_stmt,
+    _roster_stmt,
+    _user_enrollment_stmt,
+    _with_user_stmt,
+)
+from app.services.notification_service import _user_notifications_stmts
+from app.services.rating_service import _ahead_count_stmt, _leaderboard_stmts
+
+
+# --------- Как запросы строились раньше --------- #
+def _old_active_ban(user_id: int, now: datetime):
+    return (
+        select(Ban.id)
+        .where(Ban.user_id == user_id, Ban.active.is_(True) & or_(Ban.until.is_(None), Ban.until >= now))
+        .limit(1)
+    )
+
+
+def _old_open_debt(user_id: int):
+    return select(Debt.id).where(Debt.user_id == user_id, Debt.status == DebtStatus.OPEN).limit(1)
+
+
+def _old_user_enrollment(user_id: int, training_id: int):
+    return select(Enrollment).where(Enrollment.user_id == user_id, Enrollment.training_id == training_id)
+
+
+def _old_count_active(training_id: int, is_reserve: bool):
+    return (
+        select(func.count())
+        .select_from(Enrollment)
+        .where(
+            Enrollment.training_id == training_id,
+            Enrollment.is_reserve.is_(is_reserve),
+            Enrollment.status == EnrollmentStatus.ACTIVE,
+        )
+    )
+
+
+def _old_with_user(enrollment_id: int):
+    return (
+        select(Enrollment)
+        .options(joinedload(Enrollment.user))
+        .where(Enrollment.id == enrollment_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+def _old_leaderboard_page(limit: int, offset: int):
+    return (
+        select(User)
+        .where(User.is_active.is_(True))
+        .order_by(User.rating.desc(), User.cups.desc(), User.id.asc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def _old_ahead_count(rating: int, cups: int, user_id: int):
+    return (
+        select(func.count())
+        .select_from(User)
+        .where(
+            User.is_active.is_(True),
+            or_(
+                User.rating > rating,
+                and_(User.rating == rating, User.cups > cups),
+                and_(User.rating == rating, User.cups == cups, User.id < user_id),
+            ),
+        )
+    )
+
+
+def _old_notifications_page(user_id: int, limit: int, offset: int):
+    return (
+        select(Notification)
+        .where(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def _old_roster(training_id: int, is_reserve: bool):
+    return (
+        select(Enrollment)
+        .options(selectinload(Enrollment.user))
+        .where(
+            Enrollment.training_id == training_id,
+            Enrollment.status == EnrollmentStatus.ACTIVE,
+            Enrollment.is_reserve.is_(is_reserve),
+        )
+        .order_by(Enrollment.created_at.asc())
+    )
+
+
+Case = Tuple[str, Callable[[int], Any], Callable[[int], Any]]
+
+
+def _cases() -> List[Case]:
+    now = datetime.now(timezone.utc)
+    return [
+        ("has_active_ban", lambda i: _old_active_ban(i, now), lambda i: _active_ban_stmt(i, now)),
+        ("has_open_debts", _old_open_debt, _open_debt_stmt),
+        ("enrollment lookup", lambda i: _old_user_enrollment(i, 1), lambda i: _user_enrollment_stmt(i, 1)),
+        (
+            "capacity counts",
+            # раньше — два count() (основа и резерв), теперь — один с FILTER
+            lambda i: (_old_count_active(i, False), _old_count_active(i, True)),
+            _count_active_stmt,
+        ),
+        ("reload with user", _old_with_user, _with_user_stmt),
+        ("leaderboard page", lambda i: _old_leaderboard_page(20, i), lambda i: _leaderboard_stmts(20, i, None)[1]),
+        ("rating position", lambda i: _old_ahead_count(i, 3, i), lambda i: _ahead_count_stmt(i, 3, i)),
+        (
+            "notifications page",
+            lambda i: _old_notifications_page(i, 50, 0),
+            lambda i: _user_notifications_stmts(i, 50, 0)[1],
+        ),
+        (
+            "roster",
+            lambda i: (_old_roster(i, False), _old_roster(i, True)),
+            _roster_stmt,
+        ),
+    ]
+
+
+def _as_list(value: Any) -> list:
+    return list(value) if isinstance(value, tuple) else [value]
+
+
+def _per_call_us(fn: Callable[[int], Any], iterations: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        for stmt in _as_list(fn(i)):
+            stmt._generate_cache_key()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def _compile_us(fn: Callable[[int], Any], iterations: int) -> float:
+    dialect = postgresql.psycopg.dialect()
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        for stmt in _as_list(fn(i)):
+            stmt.compile(dialect=dialect)
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def run_build(iterations: int) -> None:
+    print(f"{'statement':22s} {'select()':>10s} {'lambda':>10s} {'compile':>10s}   (us per call)")
+    totals = [0.0, 0.0, 0.0]
+    for name, old, new in _cases():
+        # прогрев: кэши lambda и аннотаций ORM
+        _per_call_us(old, 100)
+        _per_call_us(new, 100)
+
+        old_us = _per_call_us(old, iterations)
+        new_us = _per_call_us(new, iterations)
+        compile_us = _compile_us(old, max(iterations // 20, 50))
+        totals[0] += old_us
+        totals[1] += new_us
+        totals[2] += compile_us
+        print(f"{name:22s} {old_us:10.1f} {new_us:10.1f} {compile_us:10.1f}")
+    print(f"{'total':22s} {totals[0]:10.1f} {totals[1]:10.1f} {totals[2]:10.1f}")
+
+
+async def run_db(iterations: int) -> None:
+    from app.db.query_stats import query_stats_monitor
+    from app.db.session import async_engine, async_session_maker
+
+    query_stats_monitor.compiled_cache.clear()
+    async with async_session_maker() as db:
+        for name, old, new in _cases():
+            timings = []
+            for fn in (old, new):
+                for i in range(20):  # прогрев
+                    for stmt in _as_list(fn(i)):
+                        await db.execute(stmt)
+                t0 = time.perf_counter()
+                for i in range(iterations):
+                    for stmt in _as_list(fn(i)):
+                        await db.execute(stmt)
+                timings.append((time.perf_counter() - t0) / iterations * 1e6)
+                db.expunge_all()
+            print(f"{name:22s} select() {timings[0]:8.1f} us   lambda {timings[1]:8.1f} us")
+        await db.rollback()
+
+    print("compiled cache:", query_stats_monitor.stats()["compiled_cache"])
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="ещё и выполнить запросы в БД")
+    args = parser.parse_args()
+
+    run_build(args.iterations)
+    if args.db:
+        print()
+        asyncio.run(run_db(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Бенчмарк пагинации расписания: OFFSET/LIMIT + COUNT(*) (list_trainings)
+против курсора по (start_at, id) (list_trainings_after).
+
+В одной транзакции наливает --trainings тренировок (каждая 20-я отменена,
+по нескольку на один start_at — курсор должен различать их по id), ANALYZE,
+и для каждой глубины --depths замеряет страницу публичного расписания
+обоими способами — медиана по --repeat вызовам. Курсор для глубины N —
+тот, что пришёл бы клиенту вместе с предыдущей страницей. Затем откатывает
+транзакцию.
+
+Нужна БД из DATABASE_URL с миграциями (индексы (start_at, id) из 9c3e5a7b1d24).
+
+Запуск (из каталога backend):
+    python -m tools.bench_training_pagination --trainings 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Any, Awaitable, Callable, List
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.counts import total_counter
+from app.db.session import async_engine
+from app.models.training import Training
+from app.services.training_service import list_trainings, list_trainings_after, training_cursor
+
+_SEED = [
+    """
+    INSERT INTO trainings (title, start_at, duration_minutes, price, capacity_main, capacity_reserve, is_cancelled)
+    SELECT 'bench-page', now() + interval '1 day' + (g / 4) * interval '30 minutes', 90, 500, 12, 4, g % 20 = 0
+    FROM generate_series(1, :trainings) AS g
+    """,
+    "ANALYZE trainings",
+]
+
+
+async def _median_ms(session: AsyncSession, run: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    await run()  # прогрев
+    session.expunge_all()
+    timings: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - t0)
+        session.expunge_all()
+    return statistics.median(timings) * 1000
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            t0 = time.perf_counter()
+            for sql in _SEED:
+                await conn.execute(text(sql), {"trainings": args.trainings})
+            print(f"seeded {args.trainings} trainings in {time.perf_counter() - t0:.1f}s\n")
+
+            session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+            print(f"{'depth':>8s} {'offset + count':>15s} {'cursor':>10s}")
+            for depth in args.depths:
+                previous = (
+                    await session.execute(
+                        select(Training)
+                        .where(Training.is_cancelled.is_(False))
+                        .order_by(Training.start_at, Training.id)
+                        .offset(depth - 1)
+                        .limit(1)
+                    )
+                ).scalar_one_or_none() if depth else None
+                if depth and previous is None:
+                    print(f"{depth:8d}  (beyond the seeded data)")
+                    continue
+                cursor = training_cursor(previous) if previous is not None else None
+
+                offset_ms = await _median_ms(
+                    session,
+                    lambda: list_trainings(session, limit=args.limit, offset=depth),
+                    args.repeat,
+                )
+                cursor_ms = await _median_ms(
+                    session,
+                    lambda: list_trainings_after(session, cursor=cursor, limit=args.limit),
+                    args.repeat,
+                )
+                print(f"{depth:8d} {offset_ms:15.2f} {cursor_ms:10.2f}   x{offset_ms / cursor_ms:.1f}")
+            await session.close()
+        finally:
+            await trans.rollback()
+
+    await async_engine.dispose()
+    print(f"\n(median ms over {args.repeat} runs, page of {args.limit})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trainings", type=int, default=200_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1_000, 10_000, 100_000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    # OFFSET-режим сравниваем вместе с его COUNT(*), без кэша total
+    total_counter.force_exact = True
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Бенчмарк единицы работы (app/db/unit_of_work.py): админские операции
+с COMMIT в каждом сервисе (как было) против одного COMMIT на операцию.
+
+Операции — те же вызовы сервисов, что делают админские эндпоинты:
+  ban            POST  /admin/bans/{user_id}/ban      manual_ban_user
+  close debt     POST  /admin/debts/{debt_id}/close   close_debt (+ снятие автобана)
+  setting        POST  /admin/settings                upsert_setting + write_audit_log
+  admin flag     PATCH /admin/users/{user_id}/admin   set_user_admin_flag + write_audit_log
+
+Для каждой — медиана времени, COMMIT'ы и SQL-запросы на операцию
+(подготовка данных для close debt в замер не входит).
+
+Пользователи, тренировка и настройка bench.* создаются перед замером и
+удаляются в конце. Нужна БД из DATABASE_URL с миграциями; сколько стоит
+COMMIT, зависит от диска и synchronous_commit сервера.
+
+Запуск (из каталога backend):
+    python -m tools.bench_unit_of_work --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.query_stats import count_queries
+from app.db.session import async_engine, async_session_maker
+from app.db.unit_of_work import UnitOfWork
+from app.services.audit_log_service import write_audit_log
+from app.services.ban_service import create_auto_debt_ban, manual_ban_user
+from app.services.debt_service import close_debt, create_debt_for_training
+from app.services.setting_service import upsert_setting
+from app.services.user_service import set_user_admin_flag
+
+Step = Callable[[AsyncSession, Dict[str, int], int], Awaitable[Any]]
+
+
+# --------- Операции --------- #
+async def _ban(db: AsyncSession, ids: Dict[str, int], i: int) -> None:
+    await manual_ban_user(db, user_id=ids["target"], reason=f"bench #{i}")
+
+
+async def _prepare_debt(db: AsyncSession, ids: Dict[str, int], i: int) -> None:
+    debt = await create_debt_for_training(db, user_id=ids["target"], training_id=ids["training"], amount=Decimal("500"))
+    await create_auto_debt_ban(db, user_id=ids["target"], reason=f"bench debt #{debt.id}")
+    ids["debt"] = debt.id
+
+
+async def _close_debt(db: AsyncSession, ids: Dict[str, int], i: int) -> None:
+    await close_debt(db, debt_id=ids["debt"])
+
+
+async def _setting(db: AsyncSession, ids: Dict[str, int], i: int) -> None:
+    await upsert_setting(db, key="bench.unit_of_work", value=str(i), description="bench")
+    await write_audit_log(
+        db,
+        user_id=ids["admin"],
+        action="ADMIN_SETTING_UPSERT",
+        entity="setting",
+        data={"key": "bench.unit_of_work", "value": str(i)},
+        commit=True,
+    )
+
+
+async def _admin_flag(db: AsyncSession, ids: Dict[str, int], i: int) -> None:
+    await set_user_admin_flag(db, user_id=ids["target"], is_admin=i % 2 == 0)
+    await write_audit_log(
+        db,
+        user_id=ids["admin"],
+        action="ADMIN_USER_SET_ADMIN",
+        entity="user",
+        entity_id=ids["target"],
+        data={"is_admin": i % 2 == 0},
+        commit=True,
+    )
+
+
+# (имя, подготовка вне замера, операция)
+OPERATIONS: List[Tuple[str, Optional[Step], Step]] = [
+    ("ban", None, _ban),
+    ("close debt", _prepare_debt, _close_debt),
+    ("setting", None, _setting),
+    ("admin flag", None, _admin_flag),
+]
+
+
+# --------- Данные --------- #
+async def _seed() -> Dict[str, int]:
+    async with async_engine.begin() as conn:
+        users = (
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO users (telegram_id, username, first_name, is_active)
+                    VALUES (7000000001, 'bench_uow_admin', 'Bench', true),
+                           (7000000002, 'bench_uow_target', 'Bench', true)
+                    RETURNING id
+                    """
+                )
+            )
+        ).scalars().all()
+        training = (
+            await conn.execute(
+                text(
+                    """
+                    INSERT INTO trainings (title, start_at, duration_minutes, price, capacity_main, capacity_reserve, is_cancelled)
+                    VALUES ('bench-uow', now() + interval '1 day', 90, 500, 12, 4, false)
+                    RETURNING id
+                    """
+                )
+            )
+        ).scalar_one()
+    return {"admin": users[0], "target": users[1], "training": training}
+
+
+async def _cleanup(ids: Dict[str, int]) -> None:
+    async with async_engine.begin() as conn:
+        params = {"admin": ids["admin"], "target": ids["target"], "training": ids["training"]}
+        await conn.execute(text("DELETE FROM audit_logs WHERE user_id IN (:admin, :target)"), params)
+        await conn.execute(text("DELETE FROM settings WHERE key = 'bench.unit_of_work'"))
+        # баны и долги удаляются каскадом
+        await conn.execute(text("DELETE FROM users WHERE id IN (:admin, :target)"), params)
+        await conn.execute(text("DELETE FROM trainings WHERE id = :training"), params)
+
+
+# --------- Замер --------- #
+_commits = [0]
+
+
+def _on_commit(_conn) -> None:
+    _commits[0] += 1
+
+
+async def _run_once(setup: Optional[Step], step: Step, ids: Dict[str, int], i: int, deferred: bool) -> Tuple[float, int, int]:
+    async with async_session_maker() as db:
+        if setup is not None:
+            await setup(db, ids, i)
+            await db.commit()
+
+        _commits[0] = 0
+        with count_queries() as q:
+            t0 = time.perf_counter()
+            if deferred:
+                async with UnitOfWork() as uow:
+                    uow.join(db)
+                    await step(db, ids, i)
+            else:
+                await step(db, ids, i)
+            elapsed = time.perf_counter() - t0
+        return elapsed * 1000, _commits[0], q.count
+
+
+async def _measure(setup: Optional[Step], step: Step, ids: Dict[str, int], repeat: int, deferred: bool) -> Tuple[float, int, int]:
+    for i in range(10):  # прогрев: пул, кэш компиляции, prepared statements
+        await _run_once(setup, step, ids, i, deferred)
+
+    timings = []
+    commits = queries = 0
+    for i in range(repeat):
+        ms, commits, queries = await _run_once(setup, step, ids, i, deferred)
+        timings.append(ms)
+    return statistics.median(timings), commits, queries
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    event.listen(async_engine.sync_engine, "commit", _on_commit)
+    ids = await _seed()
+    try:
+        async with async_engine.connect() as conn:
+            sync_commit = (await conn.exec_driver_sql("SHOW synchronous_commit")).scalar()
+        print(f"synchronous_commit={sync_commit}, {args.repeat} runs per operation\n")
+        print(f"{'operation':12s} {'per-service commit':>24s} {'unit of work':>24s}   saved")
+
+        for name, setup, step in OPERATIONS:
+            before = await _measure(setup, step, ids, args.repeat, deferred=False)
+            after = await _measure(setup, step, ids, args.repeat, deferred=True)
+            print(
+                f"{name:12s} {before[0]:8.2f} ms {before[1]} commit {before[2]:2d} q"
+                f" {after[0]:8.2f} ms {after[1]} commit {after[2]:2d} q"
+                f"   {before[0] - after[0]:5.2f} ms ({(1 - after[0] / before[0]) * 100:.0f}%)"
+            )
+    finally:
+        await _cleanup(ids)
+        event.remove(async_engine.sync_engine, "commit", _on_commit)
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Проверка, что горячие запросы сервисов идут по индексам (миграция 9c3e5a7b1d24).
+
+Скрипт в одной транзакции:
+  1. наливает синтетические данные (пользователи, тренировки за несколько лет,
+     записи, баны, долги) и делает ANALYZE;
+  2. вызывает настоящие функции enrollment_service / training_service /
+     ban_service / debt_service, перехватывая их SQL с параметрами;
+  3. для каждого SELECT делает EXPLAIN (FORMAT JSON) — с обычным планом и
+     с plan_cache_mode = force_generic_plan (так psycopg выполняет запрос
+     после prepare_threshold повторов) — и проверяет, что нет Seq Scan по
+     большим таблицам и используется ожидаемый индекс;
+  4. откатывает транзакцию — в БД ничего не остаётся.
+
+Нужна БД из DATABASE_URL с применёнными миграциями.
+Код возврата 1, если какой-то запрос не попал в индекс; те же проверки
+(run_checks) выполняет тест tests/test_index_usage.py.
+
+Запуск (из каталога backend):
+    python -m tools.check_index_usage --users 20000 --trainings 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.db.session import async_engine
+from app.services.ban_service import has_active_ban
+from app.services.debt_service import has_open_debts
+from app.services.enrollment_service import (
+    _count_active,
+    _first_reserve_stmt,
+    _user_enrollment_stmt,
+    get_training_roster,
+)
+from app.services.training_service import list_trainings
+
+# Объём по умолчанию: на меньшем числе тренировок COUNT(*) админ-списка
+# законно выбирает Seq Scan
+DEFAULT_USERS = 20_000
+DEFAULT_TRAININGS = 20_000
+
+# Seq Scan по этим таблицам на синтетическом объёме — провал
+LARGE_TABLES = {"users", "trainings", "enrollments", "bans", "debts"}
+
+_SEED = [
+    # пользователи
+    """
+    INSERT INTO users (telegram_id, username, first_name, rating, cups, is_active)
+    SELECT 9000000000 + g, 'ix_check_' || g, 'IX', (g * 7919) % 2000, (g * 31) % 50, g % 10 <> 0
+    FROM generate_series(1, :users) AS g
+    """,
+    # тренировки: история за ~3 года и две недели вперёд, 10% отменены
+    """
+    INSERT INTO trainings (title, start_at, duration_minutes, price, capacity_main, capacity_reserve, is_cancelled)
+    SELECT 'ix-check', now() + interval '14 days' - (g * interval '1 hour') * (26280.0 / :trainings),
+           90, 500, 12, 4, g % 10 = 0
+    FROM generate_series(1, :trainings) AS g
+    """,
+    # по 16 записей на тренировку: 12 в основе, 4 в резерве, часть отменена
+    """
+    INSERT INTO enrollments (user_id, training_id, is_reserve, status, is_paid, created_at)
+    SELECT u.id, t.id, k > 12,
+           (CASE WHEN (t.id + k) % 7 = 0 THEN 'CANCELLED' ELSE 'ACTIVE' END)::enrollmentstatus,
+           k % 2 = 0, t.start_at - interval '3 days' + k * interval '1 minute'
+    FROM (SELECT id, start_at, row_number() OVER (ORDER BY id) AS n FROM trainings WHERE title = 'ix-check') AS t
+    CROSS JOIN generate_series(1, 16) AS k
+    JOIN (SELECT id, row_number() OVER (ORDER BY id) AS n FROM users WHERE username LIKE 'ix\\_check\\_%') AS u
+      ON u.n = ((t.n * 16 + k) % :users) + 1
+    ON CONFLICT DO NOTHING
+    """,
+    # баны: почти все уже сняты
+    """
+    INSERT INTO bans (user_id, type, reason, active, until, created_at)
+    SELECT u.id, 'MANUAL', 'ix-check', u.n % 50 = 0, now() + interval '7 days', now()
+    FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM users WHERE username LIKE 'ix\\_check\\_%') AS u
+    """,
+    # долги: по два на пользователя, открыт каждый двадцатый
+    """
+    INSERT INTO debts (user_id, training_id, amount, status)
+    SELECT u.id, (SELECT min(id) FROM trainings WHERE title = 'ix-check'), 500,
+           (CASE WHEN (u.n + k) % 20 = 0 THEN 'OPEN' ELSE 'CLOSED' END)::debtstatus
+    FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM users WHERE username LIKE 'ix\\_check\\_%') AS u
+    CROSS JOIN generate_series(1, 2) AS k
+    """,
+]
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[AsyncSession, Dict[str, int]], Awaitable[Any]]
+    # индекс, который должен встретиться в плане основного запроса
+    expected_index: str
+
+
+def _cases() -> List[Case]:
+    async def roster(db, ids):
+        await get_training_roster(db, ids["training_id"])
+
+    async def capacity(db, ids):
+        await _count_active(db, ids["training_id"])
+
+    async def first_reserve(db, ids):
+        await db.scalar(_first_reserve_stmt(ids["training_id"]))
+
+    async def user_enrollment(db, ids):
+        await db.scalar(_user_enrollment_stmt(ids["user_id"], ids["training_id"]))
+
+    async def schedule(db, ids):
+        now = datetime.now(timezone.utc)
+        await list_trainings(db, date_from=now, date_to=now + timedelta(days=7), limit=20)
+
+    async def schedule_page(db, ids):
+        await list_trainings(db, date_from=datetime.now(timezone.utc), limit=20)
+
+    async def admin_schedule(db, ids):
+        now = datetime.now(timezone.utc)
+        await list_trainings(db, date_from=now - timedelta(days=30), include_cancelled=True, limit=50)
+
+    async def active_ban(db, ids):
+        await has_active_ban(db, user_id=ids["user_id"])
+
+    async def open_debts(db, ids):
+        await has_open_debts(db, user_id=ids["user_id"])
+
+    return [
+        Case("enrollment: roster", roster, "ix_enrollments_training_status_reserve"),
+        Case("enrollment: capacity counts", capacity, "ix_enrollments_training_status_reserve"),
+        Case("enrollment: first reserve", first_reserve, "ix_enrollments_training_status_reserve"),
+        Case("enrollment: user lookup", user_enrollment, "uq_enrollment_user_training"),
+        Case("training: schedule week", schedule, "ix_trainings_start_at_id_active"),
+        Case("training: schedule page", schedule_page, "ix_trainings_start_at_id_active"),
+        Case("training: admin list", admin_schedule, "ix_trainings_start_at_id"),
+        Case("ban: has_active_ban", active_ban, "ix_bans_user_active"),
+        Case("debt: has_open_debts", open_debts, "ix_debts_user_status"),
+    ]
+
+
+def _walk(plan: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    nodes = [(plan.get("Node Type", ""), plan.get("Relation Name", ""), plan.get("Index Name", ""))]
+    for child in plan.get("Plans", []):
+        nodes.extend(_walk(child))
+    return nodes
+
+
+async def _explain(conn: AsyncConnection, statement: str, parameters: Any, generic: bool) -> List[Tuple[str, str, str]]:
+    await conn.exec_driver_sql(
+        "SET LOCAL plan_cache_mode = " + ("force_generic_plan" if generic else "auto")
+    )
+    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters or None)
+    raw = result.scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    return _walk(plan)
+
+
+@dataclass
+class CheckResult:
+    case: str
+    # план с plan_cache_mode = force_generic_plan
+    generic: bool
+    ok: bool
+    detail: str
+
+    def __str__(self) -> str:
+        mode = "generic" if self.generic else "custom "
+        return f"{'OK  ' if self.ok else 'FAIL'} {mode} {self.case:30s} {self.detail}"
+
+
+async def run_checks(engine: AsyncEngine, *, users: int, trainings: int) -> List[CheckResult]:
+    """
+    Наливает данные, проверяет планы всех Case и откатывает транзакцию.
+    Используется и скриптом, и тестом tests/test_index_usage.py.
+    """
+    results: List[CheckResult] = []
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            for sql in _SEED:
+                await conn.execute(text(sql), {"users": users, "trainings": trainings})
+            await conn.exec_driver_sql("ANALYZE users, trainings, enrollments, bans, debts")
+
+            # тренировка из ближайших, пользователь с записями и открытым долгом
+            row = (
+                await conn.execute(
+                    text(
+                        """
+                        SELECT e.training_id, e.user_id
+                        FROM enrollments e JOIN trainings t ON t.id = e.training_id
+                        WHERE t.title = 'ix-check' AND t.start_at > now()
+                        ORDER BY t.start_at LIMIT 1
+                        """
+                    )
+                )
+            ).one()
+            ids = {"training_id": row.training_id, "user_id": row.user_id}
+
+            captured: List[Tuple[str, Any]] = []
+
+            def _capture(_conn, _cursor, statement, parameters, _context, _executemany):
+                if statement.lstrip()[:6].upper() == "SELECT":
+                    captured.append((statement, parameters))
+
+            session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+            for case in _cases():
+                captured.clear()
+                event.listen(engine.sync_engine, "before_cursor_execute", _capture)
+                try:
+                    await case.run(session, ids)
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", _capture)
+                session.expunge_all()
+
+                for generic in (False, True):
+                    seq_scans: Set[str] = set()
+                    indexes: Set[str] = set()
+                    for statement, parameters in captured:
+                        for node_type, relation, index in await _explain(conn, statement, parameters, generic):
+                            if node_type == "Seq Scan" and relation in LARGE_TABLES:
+                                seq_scans.add(relation)
+                            if index:
+                                indexes.add(index)
+
+                    ok = not seq_scans and case.expected_index in indexes
+                    detail = f"seq scan on {', '.join(sorted(seq_scans))}" if seq_scans else ", ".join(sorted(indexes))
+                    results.append(CheckResult(case.name, generic, ok, detail))
+            await session.close()
+        finally:
+            await trans.rollback()
+
+    return results
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    print("seeding synthetic data...")
+    results = await run_checks(async_engine, users=args.users, trainings=args.trainings)
+    await async_engine.dispose()
+
+    for result in results:
+        print(result)
+    failures = sum(not result.ok for result in results)
+    print("all hot queries use indexes" if not failures else f"{failures} check(s) failed")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--trainings", type=int, default=DEFAULT_TRAININGS)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
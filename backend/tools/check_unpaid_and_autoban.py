@@ -5,26 +5,18 @@ from collections.abc import AsyncGenerator
 from typing import TYPE_CHECKING
 
 from fastapi import Request
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import engine  # используем уже настроенный engine
+from app.db.session import async_session_maker  # общий async-пул из реестра движков
 
 if TYPE_CHECKING:
     from app.models.user import User
 
-# Фабрика сессий поверх существующего engine
-_async_session_factory = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
-
-
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency для FastAPI: даёт асинхронную сессию БД.
     """
-    async with _async_session_factory() as session:
+    async with async_session_maker() as session:
         yield session
 
 